@@ -0,0 +1,16 @@
+import json
+import os
+
+
+def write_json_atomic(path, data):
+    """Write ``data`` as JSON to ``path`` so that a crash leaves either the old file or the new one.
+
+    The data goes to a temporary file that is flushed to disk before it
+    replaces ``path``.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
@@ -0,0 +1,351 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import capabilities
+import pixel_formats
+
+
+class CaptureBackend:
+    """Where frames come from: lists devices, opens them and reports their modes.
+
+    open() returns a cv2.VideoCapture or an object with the same read/get/set/
+    isOpened/release methods, so the rest of the app doesn't care which backend
+    is in use.
+    """
+
+    name = "base"
+    cache_modes = True  # Whether detected modes are worth persisting in the capability cache
+    listed = ()  # Names from the last list_devices(), so device_key() needn't list them again
+
+    def list_devices(self):
+        """Names of the devices this backend can open, in dropdown order."""
+        raise NotImplementedError
+
+    def open(self, index):
+        raise NotImplementedError
+
+    def supported_modes(self, index, cancel=None):
+        """Supported (width, height, fps) modes, or None if ``cancel`` was set."""
+        raise NotImplementedError
+
+    def device_key(self, index):
+        """Identity of a device for the capability cache."""
+        return f"{(self.listed or self.list_devices())[index]}|{self.name}"
+
+
+class OpenCVBackend(CaptureBackend):
+    """Cameras opened by index through OpenCV's default API, modes found by probing."""
+
+    name = "opencv"
+    api = cv2.CAP_ANY
+    MAX_DEVICES = 4  # Indices tried when the platform can't list cameras
+
+    def list_devices(self):
+        names = []
+        for index in range(self.MAX_DEVICES):
+            cap = cv2.VideoCapture(index, self.api)
+            if cap.isOpened():
+                names.append(f"Camera {index}")
+            cap.release()
+        self.listed = names
+        return names
+
+    def open(self, index):
+        return cv2.VideoCapture(index, self.api)
+
+    def supported_modes(self, index, cancel=None):
+        return capabilities.probe_modes(index, cancel)
+
+
+class AVFoundationBackend(OpenCVBackend):
+    """macOS cameras, named through AVFoundation."""
+
+    name = "avfoundation"
+    api = cv2.CAP_AVFOUNDATION
+
+    def list_devices(self):
+        """Retrieve names of connected webcams using AVFoundation."""
+        from AVFoundation import AVCaptureDevice
+
+        devices = AVCaptureDevice.devicesWithMediaType_("vide")
+        self.listed = [device.localizedName() for device in devices]
+        return self.listed
+
+
+class V4L2Backend(CaptureBackend):
+    """Linux cameras through V4L2, asking for compressed MJPEG by default.
+
+    Over USB most webcams only reach full frame rate at 1080p when they send
+    MJPEG; OpenCV decodes it back to BGR.
+    """
+
+    name = "v4l2"
+
+    def __init__(self, mjpeg=True):
+        self.mjpeg = mjpeg
+        self.devices = []  # /dev/video numbers, in the order of list_devices()
+
+    def list_devices(self):
+        names = []
+        self.devices = []
+        numbers = sorted(int(path[len("/dev/video"):]) for path in glob.glob("/dev/video*") if path[len("/dev/video"):].isdigit())
+        for number in numbers:
+            path = f"/dev/video{number}"
+            modes = capabilities.enumerate_v4l2_modes(number)
+            if not modes:
+                continue  # Metadata and output nodes have no capture formats
+            info = capabilities.v4l2_device_info(number)
+            names.append(info[1] if info else path)
+            self.devices.append(number)
+        return names
+
+    def open(self, index):
+        cap = cv2.VideoCapture(self.devices[index], cv2.CAP_V4L2)
+        if self.mjpeg and cap.isOpened():
+            # Must be set before the frame size for the driver to pick an MJPEG mode
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        return cap
+
+    def supported_modes(self, index, cancel=None):
+        modes = capabilities.enumerate_v4l2_modes(self.devices[index])
+        if not modes:
+            return capabilities.probe_modes(self.devices[index], cancel)
+        if self.mjpeg and "MJPG" in modes:
+            return modes["MJPG"]
+        return capabilities.sort_modes(mode for found in modes.values() for mode in found)
+
+    def device_key(self, index):
+        key = capabilities.device_key(self.devices[index], "")
+        return f"{key}|{'MJPG' if self.mjpeg else 'raw'}"
+
+
+class PacedSource:
+    """Base for file and synthetic sources: hands out frames at the source's frame rate."""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.next_time = None
+        self.opened = True
+
+    def _pace(self):
+        now = time.monotonic()
+        if self.next_time is None or now - self.next_time > 1.0:
+            self.next_time = now  # First frame, or we fell far behind: don't try to catch up
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time += 1.0 / self.fps
+
+    def isOpened(self):
+        return self.opened
+
+    def release(self):
+        self.opened = False
+
+
+class VideoFileSource(PacedSource):
+    """Plays a video file in real time, looping at the end, as if it were a camera."""
+
+    def __init__(self, path, loop=True):
+        self.capture = cv2.VideoCapture(path)
+        super().__init__(self.capture.get(cv2.CAP_PROP_FPS) or 30)
+        self.loop = loop
+        self.opened = self.capture.isOpened()
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+    def set(self, prop, value):
+        return False  # A file's mode is fixed
+
+    def read(self, image=None):
+        self._pace()
+        ret, frame = self.capture.read(image)
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read(image)
+        return ret, frame
+
+    def release(self):
+        super().release()
+        self.capture.release()
+
+
+class VideoFileBackend(CaptureBackend):
+    """Video files standing in for cameras."""
+
+    name = "file"
+    cache_modes = False
+
+    def __init__(self, paths, loop=True):
+        self.paths = list(paths)
+        self.loop = loop
+
+    def list_devices(self):
+        return [os.path.basename(path) for path in self.paths]
+
+    def open(self, index):
+        return VideoFileSource(self.paths[index], self.loop)
+
+    def supported_modes(self, index, cancel=None):
+        cap = cv2.VideoCapture(self.paths[index])
+        try:
+            return [(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                     int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                     int(round(cap.get(cv2.CAP_PROP_FPS) or 30)))]
+        finally:
+            cap.release()
+
+
+class SyntheticSource(PacedSource):
+    """Generates a test pattern: a gradient with a moving bar and a frame counter.
+
+    Like a V4L2 camera, it delivers raw YUYV, NV12 or I420 (as one flat row of
+    bytes) once asked for that FOURCC with CAP_PROP_CONVERT_RGB turned off.
+    """
+
+    def __init__(self, width, height, fps):
+        super().__init__(fps)
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.fourcc = "BGR3"
+        self.convert_rgb = True
+        self.canvas = None  # BGR drawing buffer for raw output
+        self._build_background()
+
+    def _build_background(self):
+        x = np.linspace(0, 255, self.width, dtype=np.float32)
+        y = np.linspace(0, 255, self.height, dtype=np.float32)
+        self.background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.background[..., 0] = x[None, :]
+        self.background[..., 1] = y[:, None]
+        self.background[..., 2] = 128
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*self.fourcc),
+            cv2.CAP_PROP_CONVERT_RGB: int(self.convert_rgb),
+        }.get(prop, 0)
+
+    @property
+    def pixel_format(self):
+        """The raw format frames are delivered in, or None for BGR."""
+        if self.convert_rgb:
+            return None
+        return next((f for f in pixel_formats.PIXEL_FORMATS.values() if self.fourcc in f.fourccs), None)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+            return True
+        elif prop == cv2.CAP_PROP_FOURCC:
+            name = pixel_formats.fourcc_name(value)
+            if not any(name in f.fourccs for f in pixel_formats.PIXEL_FORMATS.values()):
+                return False
+            self.fourcc = name
+            return True
+        elif prop == cv2.CAP_PROP_CONVERT_RGB:
+            self.convert_rgb = bool(value)
+            return True
+        else:
+            return False
+        self._build_background()
+        return True
+
+    def read(self, image=None):
+        self._pace()
+        pixel_format = self.pixel_format
+        output = image
+        if pixel_format is not None:
+            image = self.canvas  # Drawn in BGR, then converted into the caller's buffer
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        if pixel_format is not None:
+            self.canvas = image
+        np.copyto(image, self.background)
+
+        # A bar sweeping across once a second makes dropped or repeated frames visible
+        bar = max(1, self.width // 40)
+        x = int((self.count % self.fps) / self.fps * (self.width - bar))
+        image[:, x:x + bar] = 255
+        cv2.putText(image, str(self.count), (10, max(30, self.height // 10)), cv2.FONT_HERSHEY_SIMPLEX,
+                    max(1, self.height // 240), (255, 255, 255), 2)
+        self.count += 1
+        if pixel_format is not None:
+            raw = pixel_format.from_bgr(image).reshape(1, -1)
+            if output is None or output.shape != raw.shape:
+                return True, raw
+            np.copyto(output, raw)
+            return True, output
+        return True, image
+
+
+class SyntheticBackend(CaptureBackend):
+    """A fake camera with configurable resolution and frame rate, for load tests without hardware."""
+
+    name = "synthetic"
+    cache_modes = False
+
+    def __init__(self, width=1280, height=720, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+
+    def list_devices(self):
+        return [f"Synthetic {self.width}x{self.height}@{self.fps}"]
+
+    def open(self, index):
+        return SyntheticSource(self.width, self.height, self.fps)
+
+    def supported_modes(self, index, cancel=None):
+        modes = [(w, h, fps) for w, h in capabilities.PROBE_RESOLUTIONS for fps in (15, 30, 60)]
+        return capabilities.sort_modes(modes + [(self.width, self.height, self.fps)])
+
+
+def default_backend():
+    """The camera backend for this platform."""
+    if sys.platform == "darwin":
+        return AVFoundationBackend()
+    if sys.platform.startswith("linux"):
+        return V4L2Backend()
+    return OpenCVBackend()
+
+
+def backend_from_spec(spec):
+    """Build a backend from a command-line spec.
+
+    ``synthetic[:WxH@FPS]``, ``file:PATH[,PATH...]``, ``v4l2``, ``v4l2-raw``
+    (no MJPEG), ``avfoundation``, ``opencv``; empty for the platform default.
+    """
+    if not spec:
+        return default_backend()
+    kind, _, argument = spec.partition(":")
+    if kind == "synthetic":
+        if not argument:
+            return SyntheticBackend()
+        size, _, fps = argument.partition("@")
+        width, _, height = size.partition("x")
+        return SyntheticBackend(int(width), int(height), int(fps or 30))
+    if kind == "file":
+        return VideoFileBackend(argument.split(","))
+    if kind == "v4l2":
+        return V4L2Backend()
+    if kind == "v4l2-raw":
+        return V4L2Backend(mjpeg=False)
+    if kind == "avfoundation":
+        return AVFoundationBackend()
+    if kind == "opencv":
+        return OpenCVBackend()
+    raise ValueError(f"Unknown capture source: {spec}")
@@ -0,0 +1,572 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+import cv2
+
+from backends import SyntheticBackend, backend_from_spec
+from export import CODECS, ExportEngine, ExportJob
+from instrumentation import Instrumentation
+from multicam import CameraGroup
+from motion import MotionDetector
+from pixel_formats import PIXEL_FORMATS, negotiated_format, request_raw_format
+from preview import Preview
+from replay import ReplayPipeline
+from streaming import STREAM_QUALITIES, StreamServer, StreamViewer
+from taps import DelayTap
+from upload_queue import FakeDriveService, UploadQueue
+
+
+DISPLAY_INTERVAL = 0.005  # Same polling rate as the app's Tk display loop
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it can't be measured."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_benchmark(backend, mode=None, delay=2.0, save_length=5, duration=None, codec="mp4v", preset="balanced",
+                  stats=None, preview=None, detect=False, native_yuv=None, **pipeline_options):
+    """Run the capture → delay → save pipeline without Tk and measure it.
+
+    Frames are "displayed" by polling the pipeline and rendering them through
+    ``preview`` like the app does, but never drawn. After ``duration`` seconds (by default long enough to fill the delay
+    and the save window) the save window is exported once. If ``stats`` (an
+    Instrumentation) is enabled, its per-stage summary is included. With
+    ``detect`` the motion detector runs alongside and its cost is reported.
+    ``native_yuv`` (a pixel_formats name) buffers the source's raw frames in
+    that format instead of BGR.
+    Returns a dict of results.
+    """
+    if duration is None:
+        duration = delay + save_length + 5
+
+    capture = backend.open(0)
+    if not capture.isOpened():
+        raise RuntimeError(f"Unable to open {backend.list_devices()[0]}")
+    if native_yuv:
+        request_raw_format(capture, PIXEL_FORMATS[native_yuv])
+    if mode is not None:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, mode[0])
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, mode[1])
+        capture.set(cv2.CAP_PROP_FPS, mode[2])
+    fps = capture.get(cv2.CAP_PROP_FPS) or (mode[2] if mode else 30)
+
+    stats = stats or Instrumentation()
+    preview = preview or Preview()
+    pixel_format = negotiated_format(capture) if native_yuv else None
+    pipeline = ReplayPipeline(capture, fps, delay=delay, save_length=save_length, stats=stats,
+                              pixel_format=pixel_format, **pipeline_options)
+    delay_errors = []
+    detector = MotionDetector(pipeline, stats=stats) if detect else None
+    pipeline.start()
+    if detector:
+        detector.start()
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < duration:
+            now = time.monotonic()
+            latest = pipeline.present(now) if preview.ready(now) else None
+            if latest is not None:
+                start = stats.start()
+                preview.render(latest[1], now)
+                stats.stop("preview", start)
+                delay_errors.append(time.monotonic() - pipeline.ring.timestamp(latest[0]) - delay)
+            time.sleep(DISPLAY_INTERVAL)
+        elapsed = time.monotonic() - started
+        if detector:
+            detector.stop()
+        pipeline.update_gauges()
+        engine = pipeline.engine
+        captured = engine.frames_captured
+        display_dropped = pipeline.scheduler.dropped
+        jitter = pipeline.scheduler.jitter
+        ring = pipeline.ring
+
+        # Save the window once and time it, the way the app's save button would
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "benchmark" + CODECS[codec]["extension"])
+            save_started = time.perf_counter()
+            job = None
+            if pipeline.recorder:
+                pipeline.recorder.save_clip(save_length, filename)
+            else:
+                frames = pipeline.snapshot()
+                if frames is not None:
+                    job = ExportJob(frames, filename, fps, frames.ring.width, frames.ring.height,
+                                    codec=codec, preset=preset)
+                    exporter = ExportEngine(stats=stats)
+                    exporter.export(job)
+                    exporter.shutdown()
+            save_seconds = time.perf_counter() - save_started
+            clip_bytes = os.path.getsize(filename) if os.path.exists(filename) else 0
+    finally:
+        if detector:
+            detector.stop()
+        pipeline.stop()
+
+    expected = fps * elapsed
+    absolute_errors = [abs(error) for error in delay_errors]
+    return {
+        "source": backend.list_devices()[0],
+        "width": ring.width if ring else None,
+        "height": ring.height if ring else None,
+        "fps": fps,
+        "delay": delay,
+        "save_length": save_length,
+        "duration": elapsed,
+        "options": pipeline_options,
+        "pixel_format": pipeline.pixel_format.name if pipeline.pixel_format else "BGR",
+        "preview": {"max_height": preview.max_height, "max_fps": preview.max_fps, "mirror": preview.mirror},
+        "codec": codec,
+        "preset": preset,
+        "frames_captured": captured,
+        "sustained_fps": captured / elapsed,
+        "capture_drop_rate": max(0.0, 1 - captured / expected) if expected else None,
+        "display_drop_rate": display_dropped / captured if captured else None,
+        "delay_error_mean": sum(delay_errors) / len(delay_errors) if delay_errors else None,
+        "delay_error_p95": percentile(absolute_errors, 0.95),
+        "delay_error_max": max(absolute_errors) if absolute_errors else None,
+        "delay_jitter": jitter,
+        "peak_rss_mb": peak_rss_mb(),
+        "buffer_bytes": ring.footprint_bytes if ring else None,
+        "save_seconds": save_seconds,
+        "encode_fps": job.encode_fps if job else None,
+        "clip_frames": job.done if job else None,
+        "clip_bytes": clip_bytes,
+        "detector_cost_ms": detector.cost * 1e3 if detector else None,
+        "detector_stride": detector.stride if detector else None,
+        "detector_reps": detector.rep_count if detector else None,
+        "stats": stats.summary() if stats.enabled else None,
+    }
+
+
+def run_upload_benchmark(clips=6, clip_bytes=4_000_000, bandwidth=8_000_000, failure_rate=0.1, expire_rate=0.02,
+                         workers=2, restart_after=1.0, timeout=120.0):
+    """Push clips through an UploadQueue against a throttled, failing FakeDriveService.
+
+    After ``restart_after`` seconds the queue is stopped and a new one is started
+    from the same state file, as if the app had been restarted mid-upload.
+    Every uploaded file is compared byte for byte with its source.
+    Returns a dict of results.
+    """
+    service = FakeDriveService(bandwidth=bandwidth, failure_rate=failure_rate, expire_rate=expire_rate, seed=1)
+    folder_link = "https://drive.google.com/drive/folders/benchmarkFolder"
+    with tempfile.TemporaryDirectory() as directory:
+        state = os.path.join(directory, "upload_queue.json")
+        paths = []
+        for number in range(clips):
+            path = os.path.join(directory, f"clip_{number}.mp4")
+            with open(path, "wb") as f:
+                f.write(os.urandom(clip_bytes))
+            paths.append(path)
+
+        def new_queue():
+            queue = UploadQueue(state, service, workers=workers, chunk_size=256 * 1024)
+            queue.BACKOFF_BASE = 0.05  # Retry quickly; the fake's failures are instant
+            queue.BACKOFF_MAX = 1.0
+            return queue
+
+        started = time.monotonic()
+        queue = new_queue()
+        for path in paths:
+            queue.add(path, folder_link)
+        queue.start()
+        time.sleep(restart_after)
+        queue.stop()
+        resumed = sum(1 for upload in queue.uploads if upload["sent"] and upload["status"] != "done")
+
+        queue = new_queue()
+        queue.start()
+        while time.monotonic() - started < timeout:
+            counts = queue.summary()
+            if counts["pending"] == counts["uploading"] == 0:
+                break
+            time.sleep(0.05)
+        elapsed = time.monotonic() - started
+        queue.stop()
+
+        uploaded = {name: data for name, _, data in service.files.values()}
+        intact = sum(1 for path in paths if uploaded.get(os.path.basename(path)) == open(path, "rb").read())
+        counts = queue.summary()
+    return {
+        "clips": clips,
+        "clip_bytes": clip_bytes,
+        "workers": workers,
+        "bandwidth": bandwidth,
+        "duration": elapsed,
+        "throughput": intact * clip_bytes / elapsed,
+        "done": counts["done"],
+        "failed": counts["failed"],
+        "intact": intact,
+        "resumed_after_restart": resumed,
+        "retries": sum(upload["retries"] for upload in queue.uploads),
+        "injected_failures": service.failures,
+        "folder_lookups": service.folder_lookups,
+    }
+
+
+def run_stream_benchmark(backend, mode=None, delay=1.0, duration=10.0, clients=4, slow_clients=1, slow_delay=0.2,
+                         qualities=("medium",), stats=None):
+    """Stream a delayed synthetic feed to loopback viewers and measure the fan-out.
+
+    The pipeline runs with two taps (``delay`` and ``delay`` + 1 s), each
+    published through a StreamServer on 127.0.0.1. ``clients`` viewers per tap
+    are spread over ``qualities``; ``slow_clients`` of them sleep
+    ``slow_delay`` seconds after every frame and have a small receive buffer.
+    The capture rate and the fast viewers' frame rate should not suffer from
+    the slow ones, and every published frame is encoded at most once per
+    quality. Returns a dict of results.
+    """
+    stats = stats or Instrumentation()
+    capture = backend.open(0)
+    if not capture.isOpened():
+        raise RuntimeError(f"Unable to open {backend.list_devices()[0]}")
+    if mode is not None:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, mode[0])
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, mode[1])
+        capture.set(cv2.CAP_PROP_FPS, mode[2])
+    fps = capture.get(cv2.CAP_PROP_FPS) or (mode[2] if mode else 30)
+    pipeline = ReplayPipeline(capture, fps, delay=delay, save_length=1, stats=stats)
+    cameras = CameraGroup([pipeline])
+    taps = [DelayTap("Main", delay), DelayTap("Slow", delay + 1.0)]
+    pipeline.set_tap_delays([tap.delay for tap in taps[1:]])
+    for tap in taps:
+        tap.reset(cameras.pipelines)
+
+    server = StreamServer(0, host="127.0.0.1", stats=stats)
+    server.start()
+    viewers = []
+    for tap in taps:
+        server.add(tap.name)  # Unknown streams are refused, so offer them before the viewers connect
+        url = f"http://127.0.0.1:{server.port}/stream/{urllib.parse.quote(tap.name)}"
+        for number in range(clients):
+            slow = number < slow_clients
+            viewer = StreamViewer(f"{url}?quality={qualities[number % len(qualities)]}",
+                                  frame_delay=slow_delay if slow else 0.0, receive_buffer=8192 if slow else None)
+            viewer.slow = slow
+            viewers.append(viewer)
+    for viewer in viewers:
+        viewer.start()
+
+    publish_times = []
+    cameras.start()
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < duration:
+            now = time.monotonic()
+            for tap in taps:
+                frame = tap.stream_frame(tap.select(cameras, now, stats), len(cameras))
+                if frame is not None:
+                    publish_started = time.perf_counter()
+                    server.publish(tap.name, frame)
+                    publish_times.append(time.perf_counter() - publish_started)
+            time.sleep(DISPLAY_INTERVAL)
+        elapsed = time.monotonic() - started
+        captured = pipeline.engine.frames_captured
+        client_stats = server.client_stats()
+        with server.lock:
+            channels = list(server.channels.values())
+        published = sum(channel.frames_published for channel in channels)
+        encodes = sum(channel.encodes for channel in channels)
+        replaced = sum(channel.frames_replaced for channel in channels)
+    finally:
+        for viewer in viewers:
+            viewer._stopping = True
+        server.stop()
+        for viewer in viewers:
+            viewer.stop()
+        cameras.stop()
+
+    fast = [viewer.frames / elapsed for viewer in viewers if not viewer.slow]
+    slow = [viewer.frames / elapsed for viewer in viewers if viewer.slow]
+    return {
+        "source": backend.list_devices()[0],
+        "fps": fps,
+        "duration": elapsed,
+        "taps": len(taps),
+        "clients": len(viewers),
+        "slow_clients": len(slow),
+        "qualities": list(qualities),
+        "sustained_fps": captured / elapsed,
+        "frames_published": published,
+        "encodes": encodes,
+        "encodes_per_frame": encodes / published if published else None,
+        "frames_replaced_before_encode": replaced,
+        "publish_ms_p95": (percentile(publish_times, 0.95) or 0) * 1e3,
+        "fast_client_fps_min": min(fast) if fast else None,
+        "slow_client_fps_max": max(slow) if slow else None,
+        "bad_frames": sum(viewer.bad_frames for viewer in viewers),
+        "client_errors": [viewer.error for viewer in viewers if viewer.error],
+        "per_client": client_stats,
+    }
+
+
+# Run in a fresh interpreter: how long importing the app takes, and whether the Drive libraries came along
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import instant_replay_camera
+elapsed = time.perf_counter() - start
+heavy = sorted({name.split(".")[0] for name in sys.modules if name.startswith(("google", "googleapiclient"))})
+print(json.dumps({"import_ms": elapsed * 1000, "heavy_modules": heavy}))
+"""
+
+
+def run_startup_benchmark(runs=5, source="synthetic", window=None):
+    """Measure cold start, one fresh process per run.
+
+    Always times importing the app; with a display (``window`` None means
+    detect one) it also launches the app with --startup-time, in a scratch
+    directory so the session profile is left alone, and records how long the
+    window and the camera list took. Returns a dict of medians.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    if window is None:
+        window = not sys.platform.startswith("linux") or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    imports, windows, devices, processes = [], [], [], []
+    heavy = set()
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True, cwd=directory)
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        imports.append(probe["import_ms"])
+        heavy.update(probe["heavy_modules"])
+        if not window:
+            continue
+        with tempfile.TemporaryDirectory() as scratch:
+            command = [sys.executable, os.path.join(directory, "instant_replay_camera.py"), "--startup-time", "--source", source]
+            started = time.perf_counter()
+            completed = subprocess.run(command, capture_output=True, text=True, cwd=scratch, timeout=60)
+            processes.append((time.perf_counter() - started) * 1000)
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        ready = json.loads(completed.stdout.strip().splitlines()[-1])
+        windows.append(ready["window_ms"])
+        devices.append(ready["devices_ms"])
+    return {
+        "runs": runs,
+        "source": source,
+        "import_ms": percentile(imports, 0.5),
+        "import_ms_max": max(imports),
+        "heavy_modules_at_start": sorted(heavy),
+        "window_ms": percentile(windows, 0.5),
+        "devices_ms": percentile(devices, 0.5),
+        "process_ms": percentile(processes, 0.5),
+    }
+
+
+def build_info():
+    """Enough about this build and machine to compare results across them."""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        "revision": revision,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+    }
+
+
+def run_suite(resolutions, fps_values, delays, save_lengths, output, extra_args=()):
+    """Sweep resolution × fps × delay × save length, one fresh process per run.
+
+    Each run gets its own process so peak RSS is not inherited from earlier runs.
+    Results are appended to ``output`` as JSON lines.
+    """
+    info = build_info()
+    combinations = list(itertools.product(resolutions, fps_values, delays, save_lengths))
+    with open(output, "a") as f:
+        for number, ((width, height), fps, delay, save_length) in enumerate(combinations, 1):
+            print(f"[{number}/{len(combinations)}] {width}x{height}@{fps} delay={delay} save={save_length}")
+            command = [
+                sys.executable, os.path.abspath(__file__), "run", "--json",
+                "--source", f"synthetic:{width}x{height}@{fps}",
+                "--delay", str(delay), "--save-length", str(save_length), *extra_args,
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                result = {"error": completed.stderr.strip().splitlines()[-1:] or ["failed"]}
+                result.update(width=width, height=height, fps=fps, delay=delay, save_length=save_length)
+            else:
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+            result["build"] = info
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+
+
+def parse_list(text, convert):
+    return [convert(item) for item in text.split(",") if item]
+
+
+def parse_resolution(text):
+    width, _, height = text.partition("x")
+    return int(width), int(height)
+
+
+def add_pipeline_arguments(parser):
+    parser.add_argument("--codec", default="mp4v", choices=list(CODECS))
+    parser.add_argument("--preset", default="balanced")
+    parser.add_argument("--mirror", action="store_true", help="mirror the preview")
+    parser.add_argument("--preview-height", type=int, help="scale the preview down to this many lines")
+    parser.add_argument("--preview-fps", type=int, help="cap the preview frame rate")
+    parser.add_argument("--compress", action="store_true", help="JPEG-compressed buffer")
+    parser.add_argument("--segments", action="store_true", help="pre-encoded segment recorder")
+    parser.add_argument("--spill", metavar="DIRECTORY", help="spill the save window to a mapped file here")
+    parser.add_argument("--stats", action="store_true", help="include per-stage timings")
+    parser.add_argument("--detect", action="store_true", help="run the motion detector alongside")
+    parser.add_argument("--native-yuv", choices=list(PIXEL_FORMATS), help="buffer raw frames in this format, not BGR")
+
+
+def pipeline_options(args):
+    return {
+        "compress_buffer": args.compress,
+        "record_segments": args.segments,
+        "spill_directory": args.spill,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the Eyewi replay pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark one configuration")
+    run.add_argument("--source", default="synthetic", help="capture source, as for instant_replay_camera.py --source")
+    run.add_argument("--delay", type=float, default=2.0)
+    run.add_argument("--save-length", type=int, default=5)
+    run.add_argument("--duration", type=float, help="seconds to run (default: delay + save length + 5)")
+    run.add_argument("--json", action="store_true", help="print the result as one JSON line")
+    run.add_argument("--trace", help="write a Chrome trace (or JSON lines if it ends in .jsonl) of the run")
+    add_pipeline_arguments(run)
+
+    suite = commands.add_parser("suite", help="sweep settings with synthetic sources")
+    suite.add_argument("--resolutions", default="640x480,1280x720,1920x1080")
+    suite.add_argument("--fps", default="30,60")
+    suite.add_argument("--delays", default="0,2")
+    suite.add_argument("--save-lengths", default="5,30")
+    suite.add_argument("--output", default="benchmark_results.jsonl")
+    add_pipeline_arguments(suite)
+
+    uploads = commands.add_parser("uploads", help="exercise the Drive upload queue against a local fake")
+    uploads.add_argument("--clips", type=int, default=6)
+    uploads.add_argument("--clip-mb", type=float, default=4.0)
+    uploads.add_argument("--bandwidth-mb", type=float, default=8.0, help="fake server bandwidth in MB/s")
+    uploads.add_argument("--failure-rate", type=float, default=0.1)
+    uploads.add_argument("--expire-rate", type=float, default=0.02)
+    uploads.add_argument("--workers", type=int, default=2)
+    uploads.add_argument("--json", action="store_true")
+
+    stream = commands.add_parser("stream", help="stream the delayed feed to loopback viewers")
+    stream.add_argument("--source", default="synthetic:1280x720@30")
+    stream.add_argument("--delay", type=float, default=1.0)
+    stream.add_argument("--duration", type=float, default=10.0)
+    stream.add_argument("--clients", type=int, default=4, help="viewers per tap")
+    stream.add_argument("--slow-clients", type=int, default=1, help="of which this many read slowly")
+    stream.add_argument("--slow-delay", type=float, default=0.2, help="seconds a slow viewer waits after each frame")
+    stream.add_argument("--qualities", default="medium", help=f"comma-separated, from {','.join(STREAM_QUALITIES)}")
+    stream.add_argument("--json", action="store_true")
+
+    startup = commands.add_parser("startup", help="measure cold start time in fresh processes")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--source", default="synthetic", help="capture source for the window runs")
+    startup.add_argument("--no-window", action="store_true", help="only time the imports, even with a display")
+    startup.add_argument("--output", help="append the result with build info to this JSON lines file, to track releases")
+    startup.add_argument("--json", action="store_true")
+
+    args = parser.parse_args(argv)
+    if args.command == "startup":
+        result = run_startup_benchmark(args.runs, args.source, False if args.no_window else None)
+        if args.output:
+            with open(args.output, "a") as f:
+                f.write(json.dumps(dict(result, build=build_info())) + "\n")
+        if args.json:
+            print(json.dumps(result))
+        else:
+            for key, value in result.items():
+                print(f"{key:>22}: {value}")
+    elif args.command == "stream":
+        backend = backend_from_spec(args.source)
+        mode = (backend.width, backend.height, backend.fps) if isinstance(backend, SyntheticBackend) else None
+        result = run_stream_benchmark(backend, mode, args.delay, args.duration, args.clients, args.slow_clients,
+                                      args.slow_delay, parse_list(args.qualities, str))
+        if args.json:
+            print(json.dumps(result))
+        else:
+            for key, value in result.items():
+                print(f"{key:>30}: {value}")
+    elif args.command == "uploads":
+        result = run_upload_benchmark(args.clips, int(args.clip_mb * 1e6), args.bandwidth_mb * 1e6,
+                                      args.failure_rate, args.expire_rate, args.workers)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            for key, value in result.items():
+                print(f"{key:>22}: {value}")
+    elif args.command == "run":
+        backend = backend_from_spec(args.source)
+        mode = None
+        if isinstance(backend, SyntheticBackend):
+            mode = (backend.width, backend.height, backend.fps)
+        stats = Instrumentation(enabled=args.stats or bool(args.trace), trace_path=args.trace)
+        preview = Preview(args.preview_height, args.preview_fps, args.mirror)
+        result = run_benchmark(backend, mode, delay=args.delay, save_length=args.save_length, duration=args.duration,
+                               codec=args.codec, preset=args.preset, stats=stats, preview=preview, detect=args.detect,
+                               native_yuv=args.native_yuv, **pipeline_options(args))
+        stats.close_trace()
+        if args.json:
+            print(json.dumps(result))
+        else:
+            for key, value in result.items():
+                print(f"{key:>20}: {value}")
+    else:
+        extra_args = ["--codec", args.codec, "--preset", args.preset]
+        if args.mirror:
+            extra_args.append("--mirror")
+        if args.preview_height:
+            extra_args += ["--preview-height", str(args.preview_height)]
+        if args.preview_fps:
+            extra_args += ["--preview-fps", str(args.preview_fps)]
+        if args.compress:
+            extra_args.append("--compress")
+        if args.segments:
+            extra_args.append("--segments")
+        if args.spill:
+            extra_args += ["--spill", args.spill]
+        if args.native_yuv:
+            extra_args += ["--native-yuv", args.native_yuv]
+        if args.stats:
+            extra_args.append("--stats")
+        if args.detect:
+            extra_args.append("--detect")
+        run_suite(parse_list(args.resolutions, parse_resolution), parse_list(args.fps, int),
+                  parse_list(args.delays, float), parse_list(args.save_lengths, int), args.output, extra_args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+import cv2
+
+from atomic_file import write_json_atomic
+
+
+# Modes tried when a camera cannot list its own
+PROBE_RESOLUTIONS = [
+    (320, 240), (640, 480), (800, 600),
+    (1280, 720), (1920, 1080), (2560, 1440),
+    (3840, 2160)  # 4K
+]
+PROBE_FPS = [15, 30, 60, 120, 240]
+
+
+def sort_modes(modes):
+    return sorted(set(tuple(int(v) for v in mode) for mode in modes), key=lambda x: (x[0], x[1], x[2]))
+
+
+def probe_modes(index, cancel=None):
+    """Find supported (width, height, fps) modes by trial and error with cap.set/cap.get.
+
+    Slow: every combination can reconfigure the sensor. ``cancel`` is an optional
+    Event checked between probes; a cancelled probe returns None.
+    """
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        print("Error: Could not open webcam.")
+        return []
+
+    supported = []
+    try:
+        for width, height in PROBE_RESOLUTIONS:
+            for fps in PROBE_FPS:
+                if cancel is not None and cancel.is_set():
+                    return None
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+                cap.set(cv2.CAP_PROP_FPS, fps)
+
+                # Whatever the camera settled on is a mode it supports
+                supported.append((int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                  int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                  int(cap.get(cv2.CAP_PROP_FPS))))
+    finally:
+        cap.release()
+    return sort_modes(supported)
+
+
+# --- Native V4L2 mode enumeration (Linux) ---
+
+def _iowr(nr, size):
+    return (3 << 30) | (size << 16) | (ord("V") << 8) | nr
+
+
+def _ior(nr, size):
+    return (2 << 30) | (size << 16) | (ord("V") << 8) | nr
+
+
+_V4L2_CAPABILITY = struct.Struct("<16s32s32sIII3I")
+_V4L2_FMTDESC = struct.Struct("<III32sII3I")
+_V4L2_FRMSIZEENUM = struct.Struct("<III6I2I")
+_V4L2_FRMIVALENUM = struct.Struct("<5I6I2I")
+
+VIDIOC_QUERYCAP = _ior(0, _V4L2_CAPABILITY.size)
+VIDIOC_ENUM_FMT = _iowr(2, _V4L2_FMTDESC.size)
+VIDIOC_ENUM_FRAMESIZES = _iowr(74, _V4L2_FRMSIZEENUM.size)
+VIDIOC_ENUM_FRAMEINTERVALS = _iowr(75, _V4L2_FRMIVALENUM.size)
+
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_FRMSIZE_TYPE_DISCRETE = 1
+V4L2_FRMIVAL_TYPE_DISCRETE = 1
+
+
+def _v4l2_enum(fd, request, layout, fields):
+    """Yield the unpacked results of an enumerating ioctl until the driver says EINVAL."""
+    import fcntl
+
+    index = 0
+    while True:
+        buffer = bytearray(layout.size)
+        # Every request starts with the index followed by the u32 fields that select what to list
+        struct.pack_into(f"<{1 + len(fields)}I", buffer, 0, index, *fields)
+        try:
+            fcntl.ioctl(fd, request, buffer, True)
+        except OSError:
+            return
+        yield layout.unpack(buffer)
+        index += 1
+
+
+def v4l2_device_info(index):
+    """(driver, card, bus_info) of /dev/video<index>, or None if it can't be queried."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import fcntl
+
+        fd = os.open(f"/dev/video{index}", os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        buffer = bytearray(_V4L2_CAPABILITY.size)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buffer, True)
+        driver, card, bus_info = _V4L2_CAPABILITY.unpack(buffer)[:3]
+        return tuple(value.split(b"\0", 1)[0].decode(errors="replace") for value in (driver, card, bus_info))
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
+def _fps_in_range(fastest, slowest):
+    """Standard frame rates between two frame intervals given as (num, den)."""
+    low = slowest[1] / slowest[0] if slowest[0] else 0
+    high = fastest[1] / fastest[0] if fastest[0] else 0
+    return [fps for fps in PROBE_FPS if low <= fps <= high]
+
+
+def enumerate_v4l2_modes(index):
+    """List modes with the V4L2 format/frame-size/frame-interval ioctls.
+
+    Returns {fourcc: [(width, height, fps), ...]}, or None when not on Linux or
+    the device can't be opened. Nothing is reconfigured, so this is instant.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        fd = os.open(f"/dev/video{index}", os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+
+    modes = {}
+    try:
+        for fmt in _v4l2_enum(fd, VIDIOC_ENUM_FMT, _V4L2_FMTDESC, (V4L2_BUF_TYPE_VIDEO_CAPTURE,)):
+            pixel_format = fmt[4]
+            fourcc = pixel_format.to_bytes(4, "little").decode(errors="replace")
+            sizes = []
+            for size in _v4l2_enum(fd, VIDIOC_ENUM_FRAMESIZES, _V4L2_FRMSIZEENUM, (pixel_format,)):
+                if size[2] == V4L2_FRMSIZE_TYPE_DISCRETE:
+                    sizes.append((size[3], size[4]))
+                else:
+                    min_w, max_w, _, min_h, max_h, _ = size[3:9]
+                    sizes.extend((w, h) for w, h in PROBE_RESOLUTIONS if min_w <= w <= max_w and min_h <= h <= max_h)
+
+            found = []
+            for width, height in sizes:
+                for interval in _v4l2_enum(fd, VIDIOC_ENUM_FRAMEINTERVALS, _V4L2_FRMIVALENUM, (pixel_format, width, height)):
+                    if interval[4] == V4L2_FRMIVAL_TYPE_DISCRETE:
+                        numerator, denominator = interval[5:7]
+                        if numerator:
+                            found.append((width, height, round(denominator / numerator)))
+                    else:
+                        fastest, slowest = interval[5:7], interval[7:9]
+                        found.extend((width, height, fps) for fps in _fps_in_range(fastest, slowest))
+            modes[fourcc] = sort_modes(found)
+    finally:
+        os.close(fd)
+    return modes
+
+
+def device_key(index, name):
+    """Cache key for a camera: its identity plus the driver that serves it."""
+    info = v4l2_device_info(index)
+    if info is not None:
+        driver, card, bus_info = info
+        return f"{card}|{bus_info}|{driver}"
+    return f"{name}|{sys.platform}"
+
+
+class CapabilityCache:
+    """Supported camera modes, persisted to disk and refreshed in the background."""
+
+    def __init__(self, path="camera_capabilities.json"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self._load()
+        self._refresh_thread = None
+        self._cancel = threading.Event()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        """Save the cache. Needs the lock."""
+        write_json_atomic(self.path, self.entries)
+
+    def get(self, key):
+        """Cached modes for ``key`` as a list of (width, height, fps), or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+        return [tuple(mode) for mode in entry["modes"]] if entry else None
+
+    def put(self, key, modes):
+        with self.lock:
+            self.entries[key] = {"modes": [list(mode) for mode in modes], "updated": time.time()}
+            self._write()
+
+    def refresh(self, key, detect, on_update):
+        """Re-detect the modes for ``key`` on a background thread.
+
+        ``detect(cancel)`` returns the modes (or None if cancelled), and
+        ``on_update(key, modes)`` is called from that thread if they differ from the
+        cache. A refresh already running is cancelled first.
+        """
+        self.cancel_refresh()
+        self._cancel = cancel = threading.Event()
+
+        def run():
+            modes = detect(cancel)
+            if modes is None or cancel.is_set():
+                return
+            if modes and modes != self.get(key):
+                self.put(key, modes)
+                on_update(key, modes)
+
+        self._refresh_thread = threading.Thread(target=run, name="capability-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def cancel_refresh(self):
+        """Stop a running refresh and wait for it to release the camera."""
+        self._cancel.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from instrumentation import Instrumentation
+
+
+class CaptureEngine:
+    """Reads frames from a cv2.VideoCapture on a dedicated thread.
+
+    Every frame is stamped with a monotonic capture time and passed to
+    ``sink(timestamp, frame)``, which runs on the capture thread and stores it;
+    the display picks its frames from the store itself.
+
+    If ``buffer_provider`` is given it is called before every read and may return
+    a preallocated array for the capture to decode into, avoiding a fresh
+    allocation per frame.
+
+    Read times are recorded as the "read" stage of ``stats`` (an Instrumentation).
+    """
+
+    def __init__(self, capture, sink, buffer_provider=None, stats=None):
+        self.capture = capture
+        self.sink = sink
+        self.buffer_provider = buffer_provider
+        self.stats = stats or Instrumentation()
+        self.frames_captured = 0
+        self.read_failures = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the capture thread. The caller still owns (and releases) the capture."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        stats = self.stats
+        while not self._stop_event.is_set():
+            buffer = self.buffer_provider() if self.buffer_provider else None
+            start = stats.start()
+            if buffer is not None:
+                ret, frame = self.capture.read(buffer)
+            else:
+                ret, frame = self.capture.read()
+            timestamp = time.monotonic()
+            stats.stop("read", start)
+            if not ret:
+                self.read_failures += 1
+                time.sleep(0.005)
+                continue
+
+            self.frames_captured += 1
+            self.sink(timestamp, frame)
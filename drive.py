@@ -1,20 +1,27 @@
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 import os
 import pickle
+from upload_queue import UploadError, UploadSessionExpired, extract_folder_id
 
 class GoogleDriveUploader:
+    UPLOAD_URL = "https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable&supportsAllDrives=true&fields=id"
+    FILES_URL = "https://www.googleapis.com/drive/v3/files/"
+    SHORTCUT_TYPE = "application/vnd.google-apps.shortcut"
+
     def __init__(self, credentials_file='credentials.json', token_file='token.pickle'):
         self.scopes = ['https://www.googleapis.com/auth/drive.file']
         self.credentials_file = credentials_file
         self.token_file = token_file
         self.creds = None
         self.authenticated = False
+        self.session = None  # Authorized HTTP session for resumable uploads
 
     def authenticate(self):
         """Authenticate and create the Google Drive service."""
+        # The Google client libraries take a while to import, so they are loaded on first use
+        from googleapiclient.discovery import build
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import AuthorizedSession, Request
+
         if os.path.exists(self.token_file):
             with open(self.token_file, 'rb') as token:
                 self.creds = pickle.load(token)
@@ -32,6 +39,8 @@ class GoogleDriveUploader:
 
         # Build the Google Drive service
         self.service = build('drive', 'v3', credentials=self.creds)
+        self.session = AuthorizedSession(self.creds)
+        self.authenticated = True
 
     def upload_to_shared_folder(self, file_path, folder_link):
         """
@@ -47,6 +56,8 @@ class GoogleDriveUploader:
             print("Error: Invalid shared folder link.")
             return
 
+        from googleapiclient.http import MediaFileUpload
+
         file_name = os.path.basename(file_path)
 
         file_metadata = {
@@ -69,6 +80,67 @@ class GoogleDriveUploader:
         """
         Extracts the folder ID from a shared Google Drive link.
         """
-        import re
-        match = re.search(r'folders/([a-zA-Z0-9_-]+)', folder_link)
-        return match.group(1) if match else None
\ No newline at end of file
+        return extract_folder_id(folder_link)
+
+    # --- Resumable uploads, as used by upload_queue.UploadQueue ---
+
+    def _check(self, response):
+        """Raise an UploadError for a failed response; server errors and rate limits are retryable."""
+        if response.status_code in (404, 410):
+            raise UploadSessionExpired(f"Upload session expired ({response.status_code})")
+        if response.status_code >= 400:
+            # Drive reports rate limiting as 403 with a rateLimitExceeded reason
+            rate_limited = response.status_code == 429 or (
+                response.status_code == 403
+                and any(reason in response.text for reason in ("rateLimitExceeded", "userRateLimitExceeded"))
+            )
+            retryable = response.status_code >= 500 or rate_limited
+            raise UploadError(f"Drive returned {response.status_code}: {response.text[:200]}", retryable)
+
+    def resolve_folder(self, folder_link):
+        """ID of the folder a shared link points to, following shortcuts."""
+        folder_id = extract_folder_id(folder_link)
+        if not folder_id:
+            raise UploadError("Invalid shared folder link", retryable=False)
+        response = self.session.get(self.FILES_URL + folder_id, params={
+            "fields": "id,mimeType,shortcutDetails", "supportsAllDrives": "true",
+        })
+        if response.status_code == 404:
+            raise UploadError("Shared folder not found", retryable=False)
+        self._check(response)
+        metadata = response.json()
+        if metadata.get("mimeType") == self.SHORTCUT_TYPE:
+            return metadata["shortcutDetails"]["targetId"]
+        return folder_id
+
+    def start_upload(self, name, folder_id, size, content_type):
+        """Open a resumable upload session and return its URI."""
+        response = self.session.post(
+            self.UPLOAD_URL,
+            json={"name": name, "parents": [folder_id]},
+            headers={"X-Upload-Content-Length": str(size), "X-Upload-Content-Type": content_type},
+        )
+        self._check(response)
+        return response.headers["Location"]
+
+    def _upload_status(self, response):
+        """(bytes the server has, file ID once the upload is complete) from a session response."""
+        if response.status_code == 308:
+            # "Range: bytes=0-N" lists what was received; no header means nothing yet
+            received = response.headers.get("Range")
+            return (int(received.rsplit("-", 1)[1]) + 1 if received else 0), None
+        self._check(response)
+        return None, response.json()["id"]
+
+    def upload_chunk(self, session_uri, data, offset, total):
+        """Send ``data`` starting at byte ``offset``; returns (bytes confirmed, file ID or None)."""
+        content_range = f"bytes {offset}-{offset + len(data) - 1}/{total}" if data else f"bytes */{total}"
+        response = self.session.put(session_uri, data=data, headers={"Content-Range": content_range})
+        received, file_id = self._upload_status(response)
+        return (total if file_id else received), file_id
+
+    def query_upload(self, session_uri, total):
+        """Ask how much of an interrupted upload the server kept; returns like upload_chunk."""
+        response = self.session.put(session_uri, headers={"Content-Range": f"bytes */{total}"})
+        received, file_id = self._upload_status(response)
+        return (total if file_id else received), file_id
\ No newline at end of file
@@ -0,0 +1,399 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import cv2
+
+from instrumentation import Instrumentation
+from segment_recorder import concat_entry
+
+
+# Container and codec choices offered for saved clips
+CODECS = {
+    "mp4v": {"label": "MPEG-4 (mp4v)", "extension": ".mp4", "fourcc": "mp4v"},
+    "mjpg": {"label": "Motion JPEG (MJPG)", "extension": ".avi", "fourcc": "MJPG"},
+    "ffmpeg": {"label": "H.264 (ffmpeg)", "extension": ".mp4", "fourcc": None},
+}
+
+# Speed/quality presets: OpenCV writer quality (used by MJPG) and ffmpeg x264 settings
+PRESETS = {
+    "fast": {"quality": 75, "x264_preset": "ultrafast", "crf": 28},
+    "balanced": {"quality": 90, "x264_preset": "veryfast", "crf": 23},
+    "quality": {"quality": 100, "x264_preset": "medium", "crf": 18},
+}
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None
+
+
+def available_codecs():
+    """Codec keys that can be used on this machine."""
+    return [key for key in CODECS if key != "ffmpeg" or ffmpeg_available()]
+
+
+def _encode_chunk(path, fourcc, fps, size, quality, frames):
+    """Process-pool worker: encode one chunk of frames into its own file."""
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    out.set(cv2.VIDEOWRITER_PROP_QUALITY, quality)
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return len(frames)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    """One clip to export, with progress reporting and cancellation.
+
+    ``frames`` is any iterable of ``(timestamp, frame)``; if it has a release()
+    method (like a FrameSnapshot) it is called once the job is finished.
+    ``progress(done, total, fps)`` is called from the exporting thread.
+    """
+
+    PROGRESS_INTERVAL = 0.2  # Seconds between progress callbacks
+
+    def __init__(self, frames, filename, fps, width, height, codec="mp4v", preset="balanced", progress=None):
+        self.frames = frames
+        self.filename = filename
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.codec = codec
+        self.preset = preset
+        self.progress = progress
+        self.total = len(frames)
+        self.done = 0
+        self.started = None
+        self.finished = None
+        self._last_progress = 0.0
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def encode_fps(self):
+        """Frames encoded per second of wall time so far."""
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def _advance(self, count):
+        self.done += count
+        now = time.perf_counter()
+        if self.progress and (now - self._last_progress >= self.PROGRESS_INTERVAL or self.done >= self.total):
+            self._last_progress = now
+            self.progress(self.done, self.total, self.encode_fps)
+        if self.cancelled:
+            raise ExportCancelled()
+
+
+class ChunkCache:
+    """Encoded chunk files shared between exports of overlapping ranges of the same ring.
+
+    A chunk is keyed by the ring, its sequence range and the encoding settings,
+    so two clips that cover the same aligned chunk encode it once: the second
+    export waits for (or reuses) the first one's file. Chunks in use are always
+    kept; of the unused ones the ``keep`` most recent stay for saves still to
+    come, and older ones are deleted. The files live in a temporary directory,
+    not next to the saved clips; clear() removes them.
+    """
+
+    def __init__(self, keep=64):
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> ChunkEntry, least recently used first
+        self.directory = None  # Created on first use
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, key, extension):
+        """The entry for ``key`` and whether the caller has to encode it (by completing ``entry.future``)."""
+        with self.lock:
+            entry = self.entries.get(key)
+            created = entry is None
+            if created:
+                if self.directory is None:
+                    self.directory = tempfile.mkdtemp(prefix="eyewi-chunks-")
+                path = os.path.join(self.directory, f"chunk_{key[0]}_{key[1]}_{key[2]}_{abs(hash(key)):x}{extension}")
+                entry = self.entries[key] = ChunkEntry(key, path)
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            entry.users += 1
+            return entry, created
+
+    def release(self, entry):
+        with self.lock:
+            entry.users -= 1
+            failed = entry.future.done() and entry.future.exception() is not None
+            if failed and entry.users == 0:
+                self._remove(entry)  # Let the next export try again
+            idle = [entry for entry in self.entries.values() if entry.users == 0 and entry.future.done()]
+            for entry in idle[:max(0, len(idle) - self.keep)]:
+                self._remove(entry)
+
+    def _remove(self, entry):
+        self.entries.pop(entry.key, None)
+        if os.path.exists(entry.path):
+            os.remove(entry.path)
+
+    def clear(self):
+        """Delete every cached chunk not in use, and the directory once nothing is left."""
+        with self.lock:
+            for entry in [entry for entry in self.entries.values() if entry.users == 0 and entry.future.done()]:
+                self._remove(entry)
+            if self.directory is not None and not self.entries:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self.directory = None
+
+
+class ChunkEntry:
+    """One encoded chunk in a ChunkCache; ``future`` gives its frame count once the file is written."""
+
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        self.future = Future()
+        self.users = 0
+
+
+class ExportEngine:
+    """Encodes saved clips.
+
+    With ffmpeg installed, OpenCV codecs are encoded in chunks on a process pool
+    and the chunk files are joined by ffmpeg without re-encoding; without it the
+    clip is encoded in one pass on the calling thread. The "ffmpeg" codec pipes
+    raw frames to an external ffmpeg/x264 process instead.
+
+    Clips read from a FrameSnapshot are chunked at sequence numbers that are
+    multiples of CHUNK_FRAMES, so overlapping clips from the same ring share
+    their common chunks through a ChunkCache instead of encoding them again.
+
+    Whole exports are timed as the "save" stage of ``stats`` and frames encoded
+    on the calling thread as "encode". While ``throttled`` (set by the
+    LoadController) only one chunk is encoded at a time, leaving the other
+    cores to capture and display.
+    """
+
+    CHUNK_FRAMES = 60  # Frames per process-pool chunk (2 s at 30 fps, like the segment recorder)
+
+    def __init__(self, workers=None, stats=None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.stats = stats or Instrumentation()
+        self.pool = None  # Started on first use; workers are expensive to spawn
+        self.throttled = False
+        self.chunk_cache = ChunkCache()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.chunk_cache.clear()
+
+    def export(self, job):
+        """Encode ``job`` on the calling thread. Returns False if it was cancelled."""
+        job.started = time.perf_counter()
+        start = self.stats.start()
+        try:
+            if job.codec == "ffmpeg":
+                self._export_ffmpeg_pipe(job)
+            elif ffmpeg_available() and job.total > self.CHUNK_FRAMES and hasattr(job.frames, "read_range"):
+                self._export_shared(job)
+            elif ffmpeg_available() and job.total > self.CHUNK_FRAMES:
+                self._export_chunked(job)
+            else:
+                self._export_single(job)
+            return True
+        except ExportCancelled:
+            if os.path.exists(job.filename):
+                os.remove(job.filename)
+            return False
+        finally:
+            job.finished = time.perf_counter()
+            self.stats.stop("save", start)
+            lost = getattr(job.frames, "lost", 0)
+            if lost:
+                # The capture overwrote them after the snapshot's copy budget ran out
+                print(f"{os.path.basename(job.filename)}: {lost} frames were lost before they could be saved")
+                self.stats.count("frames lost before saving", lost)
+            release = getattr(job.frames, "release", None)
+            if release:
+                release()
+
+    def _export_single(self, job):
+        codec = CODECS[job.codec]
+        out = cv2.VideoWriter(job.filename, cv2.VideoWriter_fourcc(*codec["fourcc"]), job.fps, (job.width, job.height))
+        out.set(cv2.VIDEOWRITER_PROP_QUALITY, PRESETS[job.preset]["quality"])
+        try:
+            for _, frame in job.frames:
+                start = self.stats.start()
+                out.write(frame)
+                self.stats.stop("encode", start)
+                job._advance(1)
+        finally:
+            out.release()
+
+    def _export_chunked(self, job):
+        codec = CODECS[job.codec]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        workdir = tempfile.mkdtemp(prefix=".eyewi-export-", dir=os.path.dirname(job.filename) or None)
+        pending = []
+        paths = []
+
+        def submit(chunk):
+            path = os.path.join(workdir, f"chunk_{len(paths):05d}{codec['extension']}")
+            paths.append(path)
+            pending.append(self.pool.submit(
+                _encode_chunk, path, codec["fourcc"], job.fps, (job.width, job.height),
+                PRESETS[job.preset]["quality"], chunk,
+            ))
+
+        try:
+            chunk = []
+            for _, frame in job.frames:
+                chunk.append(frame)
+                if len(chunk) == self.CHUNK_FRAMES:
+                    submit(chunk)
+                    chunk = []
+                    # Keep only a few chunks in flight so the clip is never copied whole
+                    while len(pending) > (1 if self.throttled else self.workers):
+                        job._advance(pending.pop(0).result())
+                if job.cancelled:
+                    raise ExportCancelled()
+            if chunk:
+                submit(chunk)
+            while pending:
+                job._advance(pending.pop(0).result())
+
+            list_path = os.path.join(workdir, "chunks.txt")
+            with open(list_path, "w") as f:
+                for path in paths:
+                    f.write(concat_entry(path))
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", job.filename],
+                check=True,
+            )
+        finally:
+            for future in pending:
+                future.cancel()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _export_shared(self, job):
+        """Like _export_chunked, for a FrameSnapshot: chunks any overlapping clip already encoded are reused."""
+        codec = CODECS[job.codec]
+        quality = PRESETS[job.preset]["quality"]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        snapshot = job.frames
+        directory = os.path.dirname(job.filename) or "."
+        entries = []
+        pending = []
+        try:
+            seq = snapshot.start
+            while seq < snapshot.end:
+                end = min(snapshot.end, (seq // self.CHUNK_FRAMES + 1) * self.CHUNK_FRAMES)
+                key = (snapshot.ring.ring_id, seq, end, job.codec, quality, job.fps, job.width, job.height)
+                entry, created = self.chunk_cache.acquire(key, codec["extension"])
+                entries.append(entry)
+                if created:
+                    try:
+                        self._encode_entry(entry, job, snapshot.read_range(seq, end), codec, quality)
+                    except Exception as e:
+                        entry.future.set_exception(e)  # Don't leave other clips waiting for it
+                        raise
+                else:
+                    snapshot.skip(end)  # Encoded (or being encoded) for another clip
+                    self.stats.count("chunks shared")
+                pending.append(entry)
+                seq = end
+                # Keep only a few chunks in flight so the clip is never copied whole
+                while len(pending) > (1 if self.throttled else self.workers):
+                    job._advance(pending.pop(0).future.result())
+                if job.cancelled:
+                    raise ExportCancelled()
+            while pending:
+                job._advance(pending.pop(0).future.result())
+
+            workdir = tempfile.mkdtemp(prefix=".eyewi-export-", dir=directory)
+            try:
+                list_path = os.path.join(workdir, "chunks.txt")
+                with open(list_path, "w") as f:
+                    for entry in entries:
+                        if entry.future.result():  # Empty if all its frames were lost
+                            f.write(concat_entry(entry.path))
+                subprocess.run(
+                    ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                     "-i", list_path, "-c", "copy", job.filename],
+                    check=True,
+                )
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+        finally:
+            for entry in entries:
+                self.chunk_cache.release(entry)
+
+    def _encode_entry(self, entry, job, frames, codec, quality):
+        """Encode ``frames`` into the entry's file on the process pool and complete its future when done."""
+        if not frames:
+            entry.future.set_result(0)
+            return
+        future = self.pool.submit(_encode_chunk, entry.path, codec["fourcc"], job.fps, (job.width, job.height),
+                                  quality, frames)
+
+        def done(future):
+            if future.exception() is not None:
+                entry.future.set_exception(future.exception())
+            else:
+                entry.future.set_result(future.result())
+
+        future.add_done_callback(done)
+
+    def _export_ffmpeg_pipe(self, job):
+        preset = PRESETS[job.preset]
+        process = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{job.width}x{job.height}", "-r", str(job.fps), "-i", "-",
+             "-c:v", "libx264", "-preset", preset["x264_preset"], "-crf", str(preset["crf"]),
+             "-pix_fmt", "yuv420p", job.filename],
+            stdin=subprocess.PIPE,
+        )
+        finished = False
+        try:
+            for _, frame in job.frames:
+                start = self.stats.start()
+                process.stdin.write(frame.data)
+                self.stats.stop("encode", start)
+                job._advance(1)
+            process.stdin.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg exited with status {process.returncode}")
+            finished = True
+        finally:
+            if not finished:
+                # Cancelled, ffmpeg died (BrokenPipeError) or reading the frames failed
+                process.kill()
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass  # The pipe is already broken
+                process.wait()
+                if os.path.exists(job.filename):
+                    os.remove(job.filename)  # Truncated
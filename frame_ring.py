@@ -0,0 +1,461 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+_ring_ids = itertools.count(1)
+
+
+class FrameRing:
+    """Fixed-capacity frame store backed by one contiguous (N, H, W, C) uint8 array.
+
+    Frames are addressed by a sequence number that only ever grows; frame ``seq``
+    lives in slot ``seq % capacity`` with its capture time in the parallel
+    ``timestamps`` array. The playback delay and the save window are read cursors
+    into the same ring, so every frame is stored exactly once and no memory is
+    allocated per frame.
+
+    With a ``pixel_format`` (see pixel_formats) frames are kept in the camera's
+    native YUV layout; ``width`` and ``height`` stay the image size, and frames
+    are converted to BGR only when they are shown or written out.
+    """
+
+    SLACK_FRAMES = 8  # Spare slots so the writer never lands on a frame still being shown
+
+    def __init__(self, capacity, width, height, channels=3, pixel_format=None):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.pixel_format = pixel_format  # Native layout the frames are kept in, or None for BGR
+        self.ring_id = next(_ring_ids)  # Names this ring's sequence numbers, e.g. for caching encoded ranges
+        self.capacity = int(capacity) + self.SLACK_FRAMES
+        self.frames = self._allocate(self.capacity)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.lock = threading.Lock()
+        self.write_seq = 0  # Sequence number of the next frame to be written
+        self.delay_seq = 0  # First frame that has not yet waited out the delay
+        self.first_seq = 0  # No frame before this one is valid (moves forward on resize)
+        self.snapshots = []  # Live FrameSnapshots pinning frames for a writer
+        self._rescued_seq = -1  # Last sequence number checked against the snapshots
+
+    @property
+    def frame_shape(self):
+        if self.pixel_format is not None:
+            return self.pixel_format.storage_shape(self.width, self.height)
+        return (self.height, self.width, self.channels)
+
+    @property
+    def oldest_seq(self):
+        """Oldest sequence number still held in the ring."""
+        return max(self.first_seq, self.write_seq - self.capacity)
+
+    @property
+    def bytes_per_frame(self):
+        return int(np.prod(self.frame_shape))
+
+    @property
+    def footprint_bytes(self):
+        """Memory held by the ring's frame storage."""
+        return self.frames.nbytes
+
+    def _allocate(self, capacity):
+        return np.empty((capacity,) + self.frame_shape, dtype=np.uint8)
+
+    def _store(self, slot, frame):
+        if frame.ctypes.data != self.frames[slot].ctypes.data:
+            self.frames[slot] = frame
+
+    def _detach(self, slot):
+        """Return slot contents that stay valid after the slot is overwritten."""
+        return self.frames[slot].copy()
+
+    def _item_bytes(self, item):
+        """Memory held by what _detach returned."""
+        return item.nbytes
+
+    def _decode(self, item):
+        """Turn what _detach returned into a BGR frame."""
+        if self.pixel_format is not None:
+            return self.pixel_format.to_bgr(item)
+        return item
+
+    def frame(self, seq):
+        """Return a view (not a copy) of the frame with the given sequence number."""
+        return self.frames[seq % self.capacity]
+
+    def get(self, seq):
+        """Like frame(), but returns None if ``seq`` is no longer (or not yet) in the ring."""
+        with self.lock:
+            if not self.oldest_seq <= seq < self.write_seq:
+                return None
+        return self.frame(seq)
+
+    def get_bgr(self, seq):
+        """Like get(), but always a BGR image: converted (a new array) if the ring keeps a native format."""
+        frame = self.get(seq)
+        if frame is None or self.pixel_format is None:
+            return frame
+        return self.pixel_format.to_bgr(frame)
+
+    def get_reduced(self, seq):
+        """Like get(), but may return a smaller (or grayscale) frame when that is cheaper, for analysis."""
+        frame = self.get(seq)
+        if frame is None or self.pixel_format is None:
+            return frame
+        return self.pixel_format.luma(frame)  # The Y plane is grayscale already
+
+    def timestamp(self, seq):
+        return float(self.timestamps[seq % self.capacity])
+
+    def _first_seq_at(self, target, low, high):
+        """First sequence number in [low, high) captured at or after ``target`` (high if none). Needs the lock.
+
+        Capture times grow with the sequence number, so this is a binary search.
+        """
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[middle % self.capacity] < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def nearest_seq(self, target):
+        """Sequence number of the held frame captured closest to time ``target``, or None if empty."""
+        with self.lock:
+            oldest, end = self.oldest_seq, self.write_seq
+            if oldest >= end:
+                return None
+            seq = self._first_seq_at(target, oldest, end)
+            if seq == end:
+                return end - 1
+            if seq > oldest and target - self.timestamps[(seq - 1) % self.capacity] <= self.timestamps[seq % self.capacity] - target:
+                return seq - 1
+            return seq
+
+    def time_range(self, start_time, end_time):
+        """(start, end) sequence range of the frames that left the delay and were captured in [start_time, end_time)."""
+        with self.lock:
+            oldest, end = self.oldest_seq, self.delay_seq
+            start = self._first_seq_at(start_time, oldest, end)
+            return start, self._first_seq_at(end_time, start, end)
+
+    def _rescue(self, seqs):
+        """Hand frames about to be lost to every snapshot still waiting for them. Needs the lock.
+
+        Overlapping snapshots share one copy of each frame.
+        """
+        for seq in seqs:
+            if seq < self.oldest_seq:
+                continue
+            item = None
+            for snapshot in self.snapshots:
+                if snapshot.next_seq <= seq < snapshot.end:
+                    if snapshot.max_rescue_bytes is not None and snapshot.rescued_bytes >= snapshot.max_rescue_bytes:
+                        snapshot.lost += 1  # Over its budget: read() returns None for this frame
+                        continue
+                    if item is None:
+                        item = (self.timestamp(seq), self._detach(seq % self.capacity))
+                    snapshot.evicted[seq] = item
+                    snapshot.rescued_bytes += self._item_bytes(item[1])
+
+    def _prepare_slot(self):
+        """Rescue the pinned frame (if any) in the slot the next write will overwrite. Needs the lock."""
+        if self._rescued_seq != self.write_seq:
+            self._rescued_seq = self.write_seq
+            if self.snapshots and self.write_seq >= self.capacity:
+                self._rescue([self.write_seq - self.capacity])
+
+    def next_slot(self):
+        """View of the slot the next frame will be written to, for in-place reads."""
+        with self.lock:
+            self._prepare_slot()
+            return self.frames[self.write_seq % self.capacity]
+
+    def commit(self, timestamp, frame=None):
+        """Publish the next slot. ``frame`` is copied in unless it already is that slot."""
+        with self.lock:
+            self._prepare_slot()
+            slot = self.write_seq % self.capacity
+            if frame is not None:
+                self._store(slot, frame)
+            self.timestamps[slot] = timestamp
+            self.write_seq += 1
+            # If the ring was overrun the delay cursor can only start at the oldest frame
+            if self.delay_seq < self.oldest_seq:
+                self.delay_seq = self.oldest_seq
+            return self.write_seq - 1
+
+    def advance_delay(self, now, delay):
+        """Move the delay cursor past every frame at least ``delay`` seconds old.
+
+        Returns the sequence numbers that just became due for display, oldest first.
+        """
+        due = []
+        with self.lock:
+            while self.delay_seq < self.write_seq and now - self.timestamps[self.delay_seq % self.capacity] >= delay:
+                due.append(self.delay_seq)
+                self.delay_seq += 1
+        return due
+
+    def save_range(self, length):
+        """(start, end) sequence range of the last ``length`` frames that left the delay."""
+        with self.lock:
+            end = self.delay_seq
+            start = max(self.oldest_seq, end - int(length))
+            return start, end
+
+    def snapshot(self, start, end, max_rescue_bytes=None):
+        """Pin frames ``start``..``end`` for a writer without copying them.
+
+        Costs O(1) whatever the range. A pinned frame is only copied if the
+        capture is about to overwrite it before the writer has read it, and
+        only until ``max_rescue_bytes`` have been copied; frames overwritten
+        after that are lost to the snapshot.
+        """
+        with self.lock:
+            snapshot = FrameSnapshot(self, max(start, self.oldest_seq), end, max_rescue_bytes)
+            self.snapshots.append(snapshot)
+            return snapshot
+
+    def reserve(self, frames, limit=None):
+        """Grow the ring if it cannot hold ``frames`` frames plus the slack slots.
+
+        It grows with 25% headroom for further growth, but to no more than
+        ``limit`` frames (or ``frames``, if that is more).
+        """
+        if frames + self.SLACK_FRAMES > self.capacity:
+            capacity = int(frames * 1.25)
+            if limit is not None:
+                capacity = max(frames, min(capacity, limit))
+            self.resize(capacity)
+
+    def resize(self, capacity):
+        """Reallocate the ring for ``capacity`` frames, keeping the newest frames.
+
+        Frames are copied in two passes so the capture is only held up for the
+        few frames it writes meanwhile: the bulk without the lock, then the rest
+        with it. A frame overwritten during the first pass is too old to be kept
+        anyway. Only one thread may resize the ring at a time.
+        """
+        capacity = int(capacity) + self.SLACK_FRAMES
+        frames = self._allocate(capacity)
+        timestamps = np.zeros(capacity, dtype=np.float64)
+        with self.lock:
+            copied = self.write_seq
+            start = max(self.oldest_seq, copied - capacity)
+        self._copy_into(frames, timestamps, capacity, start, copied)
+        with self.lock:
+            first = max(self.oldest_seq, self.write_seq - capacity)
+            self._rescue(range(self.oldest_seq, first))
+            self._copy_into(frames, timestamps, capacity, max(first, copied), self.write_seq)
+            self.first_seq = first
+            self._adopt(frames)
+            self.timestamps = timestamps
+            self.capacity = capacity
+            if self.delay_seq < self.oldest_seq:
+                self.delay_seq = self.oldest_seq
+
+    def _copy_into(self, frames, timestamps, capacity, start, end):
+        for seq in range(start, end):
+            frames[seq % capacity] = self.frames[seq % self.capacity]
+            timestamps[seq % capacity] = self.timestamps[seq % self.capacity]
+
+    def _adopt(self, frames):
+        """Switch to the storage from _allocate. Needs the lock."""
+        self.frames = frames
+
+    def clear(self):
+        with self.lock:
+            self.ring_id = next(_ring_ids)  # Sequence numbers start over, so they mean other frames
+            self.write_seq = 0
+            self.delay_seq = 0
+            self.first_seq = 0
+
+    def close(self):
+        """Release any resources besides the frame storage itself."""
+
+
+class FrameSnapshot:
+    """Immutable range of ring frames held for a writer thread.
+
+    Iterating yields ``(timestamp, frame)`` in capture order. Frames are read from
+    the ring as the writer reaches them, and each is released as soon as it has
+    been read. The snapshot releases itself when iteration finishes; call
+    release() to give it up early.
+    """
+
+    def __init__(self, ring, start, end, max_rescue_bytes=None):
+        self.ring = ring
+        self.start = start
+        self.end = end
+        self.next_seq = start  # Frames before this one are no longer pinned
+        self.evicted = {}  # seq -> (timestamp, frame) rescued before the ring overwrote them
+        self.max_rescue_bytes = max_rescue_bytes  # None: rescue every pinned frame
+        self.rescued_bytes = 0
+        self.lost = 0  # Frames overwritten after the rescue budget ran out
+
+    def __len__(self):
+        return max(0, self.end - self.start)
+
+    def __iter__(self):
+        try:
+            for seq in range(self.start, self.end):
+                item = self._take(seq)
+                if item is not None:
+                    frame = self.ring._decode(item[1])
+                    if frame is not None:  # None: a frame the compressed ring failed to encode
+                        yield item[0], frame
+        finally:
+            self.release()
+
+    def _take(self, seq):
+        ring = self.ring
+        with ring.lock:
+            self.next_seq = seq + 1
+            if seq in self.evicted:
+                return self.evicted.pop(seq)
+            if seq < ring.oldest_seq:
+                return None  # Released early, nothing left to read
+            return ring.timestamp(seq), ring._detach(seq % ring.capacity)
+
+    def read_range(self, start, end):
+        """Frames ``start``..``end`` (within the snapshot) in order, as a list; frames before ``end`` are released."""
+        frames = []
+        for seq in range(max(start, self.start), min(end, self.end)):
+            item = self._take(seq)
+            if item is not None:
+                frame = self.ring._decode(item[1])
+                if frame is not None:
+                    frames.append(frame)
+        return frames
+
+    def skip(self, seq):
+        """Release the frames before ``seq`` without reading them, e.g. when they were encoded for another clip."""
+        ring = self.ring
+        with ring.lock:
+            self.next_seq = max(self.next_seq, min(seq, self.end))
+            for old in [old for old in self.evicted if old < self.next_seq]:
+                del self.evicted[old]
+            if self.next_seq >= self.end and self in ring.snapshots:
+                ring.snapshots.remove(self)
+
+    def timestamps(self):
+        """Capture times of the pinned frames, oldest first: an index for seeking by time."""
+        ring = self.ring
+        with ring.lock:
+            seqs = np.arange(self.start, self.end)
+            times = ring.timestamps[seqs % ring.capacity]
+            for seq, (timestamp, frame) in self.evicted.items():
+                times[seq - self.start] = timestamp
+            return times
+
+    def read(self, seq):
+        """Random access for a reader that does not iterate: ``(timestamp, frame)`` of ``seq``, or None.
+
+        The frame stays pinned, so it can be read again; only the frames
+        actually read are copied out (or decoded, for a compressed ring).
+        """
+        ring = self.ring
+        with ring.lock:
+            item = self.evicted.get(seq)
+            if item is None:
+                if not max(self.next_seq, ring.oldest_seq) <= seq < self.end:
+                    return None
+                item = ring.timestamp(seq), ring._detach(seq % ring.capacity)
+        frame = ring._decode(item[1])
+        return (item[0], frame) if frame is not None else None
+
+    def release(self):
+        ring = self.ring
+        with ring.lock:
+            if self in ring.snapshots:
+                ring.snapshots.remove(self)
+            self.next_seq = self.end
+            self.evicted.clear()
+
+
+class CompressedFrameRing(FrameRing):
+    """FrameRing that keeps every frame JPEG-encoded instead of as raw BGR.
+
+    Frames are encoded by a small thread pool (OpenCV releases the GIL while
+    encoding) and only decoded when they are displayed or written out, so a long
+    save window at high resolution costs a fraction of the raw memory. Frames
+    in a native ``pixel_format`` are converted to BGR by the same pool, off the
+    capture thread.
+    """
+
+    def __init__(self, capacity, width, height, channels=3, quality=85, workers=2, pixel_format=None):
+        self.quality = quality
+        self.encode_failures = 0  # Frames imencode rejected; they read as dropped
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jpeg-encode")
+        super().__init__(capacity, width, height, channels, pixel_format)
+
+    def _held(self):
+        """Encoded buffers of all finished frames currently in the ring."""
+        with self.lock:
+            futures = [self.frames[seq % self.capacity] for seq in range(self.oldest_seq, self.write_seq)]
+        return [future.result() for future in futures if future.done() and future.result() is not None]
+
+    @property
+    def bytes_per_frame(self):
+        held = self._held()
+        return sum(data.nbytes for data in held) / len(held) if held else 0
+
+    @property
+    def footprint_bytes(self):
+        return sum(data.nbytes for data in self._held())
+
+    def _allocate(self, capacity):
+        return [None] * capacity
+
+    def _encode(self, frame):
+        if self.pixel_format is not None:
+            frame = self.pixel_format.to_bgr(frame)
+        try:
+            ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        except cv2.error:
+            ok = False
+        if not ok:
+            self.encode_failures += 1
+            return None
+        return data
+
+    def _store(self, slot, frame):
+        # The capture hands over a freshly allocated frame, so no copy is needed
+        self.frames[slot] = self.pool.submit(self._encode, frame)
+
+    def next_slot(self):
+        return None  # Frames are encoded out of the capture's own buffer
+
+    def _detach(self, slot):
+        return self.frames[slot]  # Encoded frames are never modified, only replaced
+
+    def _item_bytes(self, item):
+        return item.result().nbytes if item.done() and item.result() is not None else 0
+
+    def _decode(self, item):
+        data = item.result()
+        return cv2.imdecode(data, cv2.IMREAD_COLOR) if data is not None else None
+
+    def get_bgr(self, seq):
+        return self.get(seq)  # Decoding gives BGR already
+
+    def get_reduced(self, seq):
+        # The JPEG decoder can skip most of the work for a quarter-size grayscale frame
+        with self.lock:
+            if not self.oldest_seq <= seq < self.write_seq:
+                return None
+            item = self.frames[seq % self.capacity]
+        data = item.result()
+        return cv2.imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_4) if data is not None else None
+
+    def frame(self, seq):
+        """Decode and return the frame with the given sequence number."""
+        return self._decode(self.frames[seq % self.capacity])
+
+    def close(self):
+        self.pool.shutdown(wait=False)
@@ -1,30 +1,49 @@
+import time
+
+STARTED = time.perf_counter()  # Taken before the imports, for the startup time measurement
+
 import tkinter as tk
 import tkinter.messagebox
 import tkinter.filedialog
 from tkinter import ttk
 import cv2
-from AVFoundation import AVCaptureDevice
-import time
-from collections import deque
+import json
 import os
 import threading
-import copy
-import time
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-import os
-import pickle
-import re
-import drive
+from concurrent.futures import ThreadPoolExecutor
+import drive  # Loads the Google client libraries only when Drive is first used
 import shutil
+from frame_ring import FrameRing
+from replay import ReplayPipeline, default_memory_budget, max_save_seconds
+from multicam import CameraGroup
+from motion import MotionDetector
+from load_control import LoadController
+from pixel_formats import YUYV, negotiated_format, request_raw_format
+from backends import backend_from_spec, default_backend
+from capabilities import CapabilityCache
+from export import CODECS, PRESETS, ExportEngine, ExportJob, available_codecs
+from instrumentation import Instrumentation
+from preview import PREVIEW_FPS, PREVIEW_SIZES, Preview
+from review import REVIEW_SPEEDS, ReviewSession
+from save_jobs import SaveJob, SaveManager, claim_filenames
+from session_profile import SessionProfile
+from streaming import StreamServer
+from taps import DelayTap
+from upload_queue import UploadQueue
 
 class WebcamSelectorApp:
-    SAVE_DIRECTORY_FILE = "save_directory.txt"
-    SAVE_LINK_FILE = "save_link.txt"
-    def __init__(self, root):
+    PROFILE_FILE = "session_profile.json"
+    CAPABILITIES_FILE = "camera_capabilities.json"
+    UPLOAD_QUEUE_FILE = "upload_queue.json"
+    DISPLAY_INTERVAL_MS = 5  # How often the Tk loop polls for a frame to show
+    STATS_INTERVAL_MS = 1000  # How often the buffer footprint label is refreshed
+    MAX_SAVE_LENGTH = 120  # Seconds; the memory budget may allow less
+    RESIZE_DELAY_MS = 300  # Wait this long after the save slider stops before resizing the buffers
+    STREAM_PORT = 8080  # Default port of the LAN stream
+    SAVE_WORKERS = 2  # Saves encoded at the same time; further saves wait in the queue
+    def __init__(self, root, backend=None, trace_path=None, resume=False, started=STARTED, exit_when_ready=False):
         self.root = root
+        self.backend = backend or default_backend()  # Where cameras are listed and opened
         self.root.title("Eyewi")
 
         # Create a Frame to hold the canvas and scrollbar
@@ -34,6 +53,8 @@ class WebcamSelectorApp:
         # Create a Canvas
         canvas = tk.Canvas(main_frame)
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.main_frame = main_frame
+        self.controls_canvas = canvas
 
         # Add a vertical scrollbar to the canvas
         scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=canvas.yview)
@@ -48,31 +69,77 @@ class WebcamSelectorApp:
         canvas.create_window((0, 0), window=self.content_frame, anchor="nw")
 
         # Initialize Variables
+        self.started = started  # perf_counter() when the process started, for the startup time
+        self.exit_when_ready = exit_when_ready  # Print the startup times and quit (--startup-time)
+        self.profile = SessionProfile(self.PROFILE_FILE)  # Camera, mode and settings of the last session
+        self.resume_pending = resume  # Resume the last session once the cameras are listed
+        self.webcams = []  # Filled in by discover_devices(), which runs in the background
+        self.devices_listed = False
+        self.window_seconds = None  # Startup times, reported once both are known
+        self.devices_seconds = None
         self.drive = drive.GoogleDriveUploader()
+        # Clips waiting to be uploaded, kept on disk so they survive a restart
+        self.upload_queue = UploadQueue(self.UPLOAD_QUEUE_FILE, self.drive, on_change=lambda: self.root.after(0, self.update_upload_status))
+        self.capabilities = CapabilityCache(self.CAPABILITIES_FILE)  # Supported modes per camera
         self.currentwidth = 0
         self.currentheight = 0
         self.currentfps = 0
-        self.save_length = 1
+        self.save_length = int(self.profile["save_length"])
+        self.memory_budget = default_memory_budget()  # Bytes all the cameras' RAM buffers may use together
+        self.save_length_job = None  # Pending resize of the buffers after the save length changed
         self.running = False
         self.capture = None
-        self.delay_buffer = deque()  # To store frames for delayed playback
-        self.max_save_buffer_size = 0
-        self.save_buffer = deque()  # To store frames for delayed playback
-        self.delay = 0.0
-        self.mirror = False  # Flag to toggle mirroring
+        self.cameras = None  # One capture, delay and save pipeline per camera, created in start_webcam
+        self.delay = float(self.profile["delay"])
+        self.mirror = bool(self.profile["mirror"])  # Flag to toggle mirroring
+        self.preview = Preview(mirror=self.mirror)  # Scales, caps and mirrors what is shown; the buffers keep the original
+        self.preview_in_app = False  # Draw the preview in this window instead of an OpenCV window
+        self.preview_image = None
+        self.main_tap = DelayTap("Main", self.delay, self.preview)  # The view the delay slider controls
+        self.taps = [self.main_tap]  # Every delayed view of the buffers, each with its own delay and mirror flag
+        self.tap_canvases = {}  # Tap name -> [canvas, image item, PhotoImage] for extra taps shown in the app
+        self.taps_added = 0
+        self.review = None  # ReviewSession while the main view is paused for review
+        self.compress_buffer = False  # Keep buffered frames JPEG-encoded
+        self.native_yuv = False  # Buffer the camera's raw YUV frames, converting only what is shown or saved
+        self.record_segments = False  # Pre-encode the delayed stream so saving is a remux
+        self.spill_to_disk = False  # Age the save window out of RAM into a mapped file
+        self.spill_directory = self.profile["spill_directory"]  # Where the spill file goes; None means the save directory
+        self.jpeg_quality = 85
+        self.stats = Instrumentation(enabled=bool(trace_path), trace_path=trace_path)  # Per-stage timings
+        self.stats_overlay = False  # Draw the stats onto the video
+        self.exporter = ExportEngine(stats=self.stats)  # Encodes saved clips
+        self.save_manager = SaveManager(
+            self.exporter, workers=self.SAVE_WORKERS, on_done=self._save_finished,
+            on_change=lambda: self.root.after(0, self.update_save_queue),
+        )
+        self.saves_requested = 0
+        self.auto_save = False  # Save a clip for every rep the motion detector finds
+        self.detector = None
+        self.adapt_to_load = True  # Lower the preview quality when the machine can't keep up
+        self.load_controller = None
+        self.stream_server = None  # Publishes every tap over HTTP while streaming is on
+        self.codec = "mp4v"
+        self.preset = "balanced"
         self.upload_to_drive = False
 
         # Populate the content frame with widgets
         self.populate_widgets()
+        self.update_max_save_length()
+        self.upload_queue.start()
+        self.update_upload_status()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Listing cameras can take seconds (OpenCV opens each one), so the window comes up first
+        self.discover_devices()
+        self.root.after_idle(self.on_window_ready)
 
 
-    def populate_widgets(self):
-        # Initialize default save directory
-        self.save_directory = os.getcwd()
 
-        # Get list of webcams
-        self.webcams = self.get_webcam_names()
+    def populate_widgets(self):
+        # The save directory of the last session, if it still exists
+        directory = self.profile["save_directory"]
+        self.save_directory = directory if directory and os.path.isdir(directory) else os.getcwd()
 
         # Dropdown to select webcam
         self.webcamlabel = tk.Label(self.content_frame, text="Select Webcam:")
@@ -82,29 +149,30 @@ class WebcamSelectorApp:
         self.webcam_dropdown.bind("<<ComboboxSelected>>", self.on_webcam_change)
         self.webcam_dropdown.pack(pady=5)
 
-        if self.webcams:
-            self.webcam_dropdown.current(0)  # Set default to first webcam
-        else:
-            self.webcam_dropdown.set("No webcams found")
+        self.webcam_dropdown.set("Detecting cameras...")  # Filled in by on_devices_listed
+
+        # List of further cameras to film from at the same time
+        self.angles_label = tk.Label(self.content_frame, text="Extra Angles (filmed at the same time):")
+        self.angles_label.pack(pady=5)
+
+        self.angles_listbox = tk.Listbox(self.content_frame, selectmode=tk.MULTIPLE, height=1, exportselection=False)
+        self.angles_listbox.bind("<<ListboxSelect>>", lambda e: self.update_max_save_length())
+        self.angles_listbox.pack(pady=5)
 
         self.reslabel = tk.Label(self.content_frame, text="Select Resolution and FPS:")
         self.reslabel.pack(pady=5)
 
-        self.resolutions = self.get_supported_resolutions_fps(0)  # Placeholder index
+        self.resolutions = []  # Modes of the selected camera, filled in once the cameras are listed
         self.resolution_dropdown = ttk.Combobox(self.content_frame, state="readonly", values=self.resolutions)
+        self.resolution_dropdown.bind("<<ComboboxSelected>>", lambda e: self.update_max_save_length())
         self.resolution_dropdown.pack(pady=5)
-
-        if self.resolutions:
-            self.resolution_dropdown.current(len(self.resolutions) - 1)
-        else:
-            self.resolution_dropdown.set("N/A")
+        self.resolution_dropdown.set("Detecting...")
 
         # Slider to adjust delay
         self.slider_label = tk.Label(self.content_frame, text="Adjust Delay (0-30 seconds):")
         self.slider_label.pack(pady=5)
 
         self.delay_slider = tk.Scale(self.content_frame, from_=0, to=30, resolution=0.001, orient="horizontal", length=300, command=self.update_slider_label)
-        self.delay_slider.set(0.0)
         self.delay_slider.pack(pady=5)
 
         # Label to display slider value
@@ -116,8 +184,9 @@ class WebcamSelectorApp:
         self.entry_label.pack(pady=5)
 
         self.delay_var = tk.StringVar()
-        self.delay_var.set("0.0")
+        self.delay_var.set(f"{self.delay:.3f}")
         self.delay_var.trace("w", self.update_slider_from_entry)
+        self.delay_slider.set(self.delay)  # Now that the label and entry it updates exist
 
         self.delay_entry = tk.Entry(self.content_frame, width=10, textvariable=self.delay_var)
         self.delay_entry.pack(pady=5)
@@ -126,16 +195,109 @@ class WebcamSelectorApp:
         self.mirror_button = tk.Button(self.content_frame, text="Toggle Mirror", command=self.toggle_mirror)
         self.mirror_button.pack(pady=10)
 
+        # Dropdowns for the preview size and frame-rate cap
+        self.preview_size_label = tk.Label(self.content_frame, text="Preview Size and FPS:")
+        self.preview_size_label.pack(pady=5)
+
+        self.preview_sizes = list(PREVIEW_SIZES)
+        self.preview_size_dropdown = ttk.Combobox(self.content_frame, state="readonly", values=self.preview_sizes)
+        self.preview_size_dropdown.bind("<<ComboboxSelected>>", self.on_preview_size_change)
+        self.preview_size_dropdown.current(0)
+        self.preview_size_dropdown.pack(pady=5)
+
+        self.preview_fps_values = list(PREVIEW_FPS)
+        self.preview_fps_dropdown = ttk.Combobox(self.content_frame, state="readonly", values=self.preview_fps_values)
+        self.preview_fps_dropdown.bind("<<ComboboxSelected>>", self.on_preview_fps_change)
+        self.preview_fps_dropdown.current(0)
+        self.preview_fps_dropdown.pack(pady=5)
+
+        # Checkbox to draw the preview in this window instead of a separate OpenCV window
+        self.preview_in_app_var = tk.BooleanVar(value=self.preview_in_app)
+        self.preview_in_app_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Show Preview in App",
+            variable=self.preview_in_app_var,
+            command=self.toggle_preview_in_app
+        )
+        self.preview_in_app_checkbox.pack(pady=5)
+
+        # Canvas for the in-app preview, shown next to the controls when enabled
+        self.preview_canvas = tk.Canvas(self.main_frame, width=0, height=0, highlightthickness=0)
+        self.preview_item = self.preview_canvas.create_image(0, 0, anchor="nw")
+        # Click the preview to give it focus for the s/q shortcuts
+        self.preview_canvas.bind("<Button-1>", lambda e: self.preview_canvas.focus_set())
+        self.preview_canvas.bind("<KeyPress-s>", lambda e: self.save())
+        self.preview_canvas.bind("<KeyPress-q>", lambda e: self.stop_webcam())
+        self.preview_canvas.bind("<KeyPress-comma>", lambda e: self.step_review(-1))
+        self.preview_canvas.bind("<KeyPress-period>", lambda e: self.step_review(1))
+        self.preview_canvas.bind("<KeyPress-space>", lambda e: self.toggle_review_playback())
+
+        # Extra delayed views of the same buffer, each in its own window (or canvas)
+        self.taps_label = tk.Label(self.content_frame, text="Delay Taps (extra views):")
+        self.taps_label.pack(pady=5)
+
+        self.taps_listbox = tk.Listbox(self.content_frame, height=4, exportselection=False)
+        self.taps_listbox.pack(pady=5)
+
+        self.tap_delay_label = tk.Label(self.content_frame, text="Tap Delay (0-30 seconds):")
+        self.tap_delay_label.pack(pady=5)
+
+        self.tap_delay_var = tk.StringVar()
+        self.tap_delay_var.set("0.0")
+        self.tap_delay_entry = tk.Entry(self.content_frame, width=10, textvariable=self.tap_delay_var)
+        self.tap_delay_entry.pack(pady=5)
+
+        self.tap_mirror_var = tk.BooleanVar(value=False)
+        self.tap_mirror_checkbox = tk.Checkbutton(self.content_frame, text="Mirror Tap", variable=self.tap_mirror_var)
+        self.tap_mirror_checkbox.pack(pady=5)
+
+        self.add_tap_button = tk.Button(self.content_frame, text="Add Tap", command=self.add_tap)
+        self.add_tap_button.pack(pady=5)
+
+        self.remove_tap_button = tk.Button(self.content_frame, text="Remove Tap", command=self.remove_tap)
+        self.remove_tap_button.pack(pady=5)
+
+        # Review: pause the main view and scrub through the buffered window while capture carries on
+        self.review_button = tk.Button(self.content_frame, text="Pause and Review", command=self.toggle_review, state="disabled")
+        self.review_button.pack(pady=10)
+
+        self.review_var = tk.DoubleVar(value=0.0)
+        self.review_slider = tk.Scale(self.content_frame, from_=0, to=1, resolution=0.001, orient="horizontal", length=300,
+                                      variable=self.review_var, command=self.on_review_scrub, state="disabled")
+        self.review_slider.pack(pady=5)
+        self.review_slider_value = 0.0  # Last position set from playback, to tell it apart from a drag
+
+        review_controls = tk.Frame(self.content_frame)
+        review_controls.pack(pady=5)
+        self.review_back_button = tk.Button(review_controls, text="< Frame", command=lambda: self.step_review(-1), state="disabled")
+        self.review_back_button.pack(side=tk.LEFT)
+        self.review_play_button = tk.Button(review_controls, text="Play", command=self.toggle_review_playback, state="disabled")
+        self.review_play_button.pack(side=tk.LEFT)
+        self.review_forward_button = tk.Button(review_controls, text="Frame >", command=lambda: self.step_review(1), state="disabled")
+        self.review_forward_button.pack(side=tk.LEFT)
+
+        self.review_speeds = list(REVIEW_SPEEDS)
+        self.review_speed_dropdown = ttk.Combobox(self.content_frame, state="readonly", values=self.review_speeds, width=8)
+        self.review_speed_dropdown.bind("<<ComboboxSelected>>", self.on_review_speed_change)
+        self.review_speed_dropdown.current(self.review_speeds.index("0.5x"))
+        self.review_speed_dropdown.pack(pady=5)
+
         # Button to start/stop webcam
         self.control_button = tk.Button(self.content_frame, text="Start Webcam", command=self.toggle_webcam)
         self.control_button.pack(pady=10)
 
+        # Open the last session's camera in its saved mode, without probing its modes first
+        self.resume_button = tk.Button(self.content_frame, text="Resume Last Session", command=self.resume_session, state="normal" if self.profile.resumable else "disabled")
+        self.resume_button.pack(pady=5)
+
+        self.startup_label = tk.Label(self.content_frame, text="")
+        self.startup_label.pack(pady=5)
+
         # Slider to adjust save buffer values
         self.save_slider_label = tk.Label(self.content_frame, text="Adjust Video Length (Max 120 Seconds):")
         self.save_slider_label.pack(pady=5)
 
         self.save_slider = tk.Scale(self.content_frame, from_=1, to=120, resolution=1, orient="horizontal", length=300, command=self.update_save_slider_label)
-        self.save_slider.set(1)
         self.save_slider.pack(pady=5)
 
         # Label to display save slider value
@@ -147,21 +309,193 @@ class WebcamSelectorApp:
         self.save_entry_label.pack(pady=5)
 
         self.save_var = tk.StringVar()
-        self.save_var.set("1")
+        self.save_var.set(str(self.save_length))
         self.save_var.trace("w", self.update_save_from_entry)
+        self.save_slider.set(self.save_length)
 
         self.save_entry = tk.Entry(self.content_frame, width=10, textvariable=self.save_var)
         self.save_entry.pack(pady=5)
 
+        # Memory the buffers may use, and the longest save window that fits at the current settings
+        self.memory_label = tk.Label(self.content_frame, text="Buffer Memory (MB):")
+        self.memory_label.pack(pady=5)
+
+        self.memory_var = tk.StringVar()
+        self.memory_var.set(str(self.memory_budget // 2 ** 20))
+        self.memory_entry = tk.Entry(self.content_frame, width=10, textvariable=self.memory_var)
+        # Applied once the value is entered; every keystroke would resize the buffers to a partial number
+        self.memory_entry.bind("<Return>", self.update_memory_budget)
+        self.memory_entry.bind("<FocusOut>", self.update_memory_budget)
+        self.memory_entry.pack(pady=5)
+
+        self.max_save_label = tk.Label(self.content_frame, text="")
+        self.max_save_label.pack(pady=5)
+
+        # Checkbox to keep the buffer JPEG-compressed (takes effect when the webcam starts)
+        self.compress_var = tk.BooleanVar(value=self.compress_buffer)
+        self.compress_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Compress Buffer (JPEG)",
+            variable=self.compress_var,
+            command=self.toggle_compress_buffer
+        )
+        self.compress_checkbox.pack(pady=5)
+
+        # Checkbox to pre-encode the delayed stream into segments (takes effect when the webcam starts)
+        self.segments_var = tk.BooleanVar(value=self.record_segments)
+        self.segments_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Pre-encode Segments (Fast Save)",
+            variable=self.segments_var,
+            command=self.toggle_record_segments
+        )
+        self.segments_checkbox.pack(pady=5)
+
+        # Checkbox to keep the save window in a file on disk (takes effect when the webcam starts)
+        self.spill_var = tk.BooleanVar(value=self.spill_to_disk)
+        self.spill_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Spill Buffer to Disk",
+            variable=self.spill_var,
+            command=self.toggle_spill_to_disk
+        )
+        self.spill_checkbox.pack(pady=5)
+
+        # Checkbox to buffer frames in the camera's native YUV format (takes effect when the webcam starts)
+        self.native_yuv_var = tk.BooleanVar(value=self.native_yuv)
+        self.native_yuv_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Native YUV Buffer (Convert on Output)",
+            variable=self.native_yuv_var,
+            command=self.toggle_native_yuv
+        )
+        self.native_yuv_checkbox.pack(pady=5)
+
+        # Slider to adjust the JPEG quality of the compressed buffer
+        self.quality_slider = tk.Scale(self.content_frame, from_=50, to=100, resolution=1, orient="horizontal", length=300, label="JPEG Quality", command=self.update_jpeg_quality)
+        self.quality_slider.set(self.jpeg_quality)
+        self.quality_slider.pack(pady=5)
+
+        # Label showing how much memory the buffer uses
+        self.buffer_stats_label = tk.Label(self.content_frame, text="Buffer: -")
+        self.buffer_stats_label.pack(pady=5)
+
+        # Checkbox to shed preview quality and background work under load, and what was shed
+        self.adapt_var = tk.BooleanVar(value=self.adapt_to_load)
+        self.adapt_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Adapt to Load",
+            variable=self.adapt_var,
+            command=self.toggle_adapt_to_load
+        )
+        self.adapt_checkbox.pack(pady=5)
+
+        self.load_label = tk.Label(self.content_frame, text="Load: -")
+        self.load_label.pack(pady=5)
+
+        # Checkbox and port to stream every delayed view to other devices on the network
+        self.stream_var = tk.BooleanVar(value=False)
+        self.stream_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Stream to LAN (MJPEG)",
+            variable=self.stream_var,
+            command=self.toggle_streaming
+        )
+        self.stream_checkbox.pack(pady=5)
+
+        self.stream_port_var = tk.StringVar(value=str(self.STREAM_PORT))
+        self.stream_port_entry = tk.Entry(self.content_frame, width=8, textvariable=self.stream_port_var)
+        self.stream_port_entry.pack(pady=5)
+
+        self.stream_label = tk.Label(self.content_frame, text="", justify="left")
+        self.stream_label.pack(pady=5)
+
+        # Checkboxes to collect per-stage timings and to draw them onto the video
+        self.stats_var = tk.BooleanVar(value=self.stats.enabled)
+        self.stats_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Performance Stats",
+            variable=self.stats_var,
+            command=self.toggle_stats
+        )
+        self.stats_checkbox.pack(pady=5)
+
+        self.overlay_var = tk.BooleanVar(value=self.stats_overlay)
+        self.overlay_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Stats Overlay",
+            variable=self.overlay_var,
+            command=self.toggle_stats_overlay
+        )
+        self.overlay_checkbox.pack(pady=5)
+
+        # Label showing the collected timings
+        self.stats_label = tk.Label(self.content_frame, text="", justify="left", font=("Courier", 9))
+        self.stats_label.pack(pady=5)
+
+        # Dropdowns to choose the codec and speed/quality preset for saved clips
+        self.codec_label = tk.Label(self.content_frame, text="Video Codec:")
+        self.codec_label.pack(pady=5)
+
+        self.codecs = available_codecs()
+        self.codec_dropdown = ttk.Combobox(self.content_frame, state="readonly", values=[CODECS[key]["label"] for key in self.codecs])
+        self.codec_dropdown.bind("<<ComboboxSelected>>", self.on_codec_change)
+        self.codec_dropdown.current(self.codecs.index(self.codec))
+        self.codec_dropdown.pack(pady=5)
+
+        self.presets = list(PRESETS)
+        self.preset_dropdown = ttk.Combobox(self.content_frame, state="readonly", values=self.presets)
+        self.preset_dropdown.bind("<<ComboboxSelected>>", self.on_preset_change)
+        self.preset_dropdown.current(self.presets.index(self.preset))
+        self.preset_dropdown.pack(pady=5)
+
         # Button to save footage
         self.save_button = tk.Button(self.content_frame, text="Save Video", command=self.save, state="disabled")
         self.save_button.pack(pady=10)
 
+        # Save progress and a button to cancel the save in progress
+        self.save_progress_label = tk.Label(self.content_frame, text="")
+        self.save_progress_label.pack(pady=5)
+
+        # Saves waiting, in progress and just finished; select some to cancel only those
+        self.save_queue_listbox = tk.Listbox(self.content_frame, height=4, width=50, selectmode=tk.MULTIPLE, exportselection=False)
+        self.save_queue_listbox.pack(pady=5)
+
+        self.cancel_save_button = tk.Button(self.content_frame, text="Cancel Save", command=self.cancel_save, state="disabled")
+        self.cancel_save_button.pack(pady=5)
+
+        # Motion detection: save a clip around every rep automatically
+        self.auto_save_var = tk.BooleanVar(value=self.auto_save)
+        self.auto_save_checkbox = tk.Checkbutton(
+            self.content_frame,
+            text="Auto-Save Reps (Motion Detection)",
+            variable=self.auto_save_var,
+            command=self.toggle_auto_save
+        )
+        self.auto_save_checkbox.pack(pady=5)
+
+        self.motion_threshold_label = tk.Label(self.content_frame, text="Motion Threshold (% of frame moving):")
+        self.motion_threshold_label.pack(pady=5)
+        self.motion_threshold_slider = tk.Scale(self.content_frame, from_=0.5, to=20, resolution=0.5, orient="horizontal", length=300, command=self.update_motion_threshold)
+        self.motion_threshold_slider.set(2)
+        self.motion_threshold_slider.pack(pady=5)
+
+        self.roll_label = tk.Label(self.content_frame, text="Pre-roll / Post-roll (seconds):")
+        self.roll_label.pack(pady=5)
+        roll_frame = tk.Frame(self.content_frame)
+        roll_frame.pack(pady=5)
+        self.pre_roll_var = tk.StringVar(value="1.0")
+        self.pre_roll_var.trace("w", self.update_rolls)
+        tk.Entry(roll_frame, width=6, textvariable=self.pre_roll_var).pack(side=tk.LEFT, padx=5)
+        self.post_roll_var = tk.StringVar(value="1.0")
+        self.post_roll_var.trace("w", self.update_rolls)
+        tk.Entry(roll_frame, width=6, textvariable=self.post_roll_var).pack(side=tk.LEFT, padx=5)
+
         # Label for current save directory
         self.savelabel = tk.Label(self.content_frame, text=f"Current Save Directory:")
         self.savelabel.pack(pady=5)
 
-        self.dirlabel = tk.Label(self.content_frame, text=self.load_save_directory())
+        self.dirlabel = tk.Label(self.content_frame, text=self.save_directory)
         self.dirlabel.pack(pady=5)
 
         # Button to change save directory
@@ -189,7 +523,7 @@ class WebcamSelectorApp:
         self.drive_label.pack(pady=5)
 
         self.drive_var = tk.StringVar()
-        self.drive_var.set(self.load_link_directory())
+        self.drive_var.set(self.profile["drive_link"])
         
         self.drive_entry = tk.Entry(self.content_frame, width=30, textvariable=self.drive_var)
         self.drive_entry.pack(pady=5)
@@ -198,37 +532,391 @@ class WebcamSelectorApp:
         self.save_drive_button = tk.Button(self.content_frame, text="Save Drive Link", command=self.save_link, state="normal")
         self.save_drive_button.pack(pady=10)
 
+        # Upload queue status and a button to retry failed uploads
+        self.upload_status_label = tk.Label(self.content_frame, text="")
+        self.upload_status_label.pack(pady=5)
+
+        self.retry_uploads_button = tk.Button(self.content_frame, text="Retry Failed Uploads", command=self.upload_queue.retry_failed)
+        self.retry_uploads_button.pack(pady=5)
+
+    def toggle_compress_buffer(self):
+        self.compress_buffer = self.compress_var.get()
+        self.update_max_save_length()
+
+    def toggle_native_yuv(self):
+        self.native_yuv = self.native_yuv_var.get()
+        self.update_max_save_length()
+
+    def toggle_record_segments(self):
+        self.record_segments = self.segments_var.get()
+        self.update_max_save_length()
+
+    def toggle_spill_to_disk(self):
+        self.spill_to_disk = self.spill_var.get()
+        self.update_max_save_length()
+
+    def update_jpeg_quality(self, value):
+        self.jpeg_quality = int(value)
+        if self.cameras:
+            self.cameras.set_jpeg_quality(self.jpeg_quality)
+
+    def on_preview_size_change(self, event):
+        max_height = PREVIEW_SIZES[self.preview_sizes[self.preview_size_dropdown.current()]]
+        for tap in self.taps:
+            tap.preview.max_height = max_height
+
+    def on_preview_fps_change(self, event):
+        max_fps = PREVIEW_FPS[self.preview_fps_values[self.preview_fps_dropdown.current()]]
+        for tap in self.taps:
+            tap.preview.max_fps = max_fps
+
+    def toggle_preview_in_app(self):
+        self.preview_in_app = self.preview_in_app_var.get()
+        if self.preview_in_app:
+            cv2.destroyAllWindows()
+            self.preview_canvas.pack(side=tk.LEFT, before=self.controls_canvas)
+        else:
+            self.preview_canvas.pack_forget()
+            for canvas, item, image in self.tap_canvases.values():
+                canvas.destroy()
+            self.tap_canvases = {}
+
+    def add_tap(self):
+        """Add a view of the buffers with the delay and mirror flag entered above."""
+        try:
+            delay = float(self.tap_delay_var.get())
+            if not 0 <= delay <= 30:
+                raise ValueError
+        except ValueError:
+            tkinter.messagebox.showwarning("Warning", "Tap delay must be between 0 and 30 seconds.")
+            return
+        self.taps_added += 1
+        preview = Preview(self.preview.max_height, self.preview.max_fps, mirror=self.tap_mirror_var.get())
+        tap = DelayTap(f"Tap {self.taps_added}", delay, preview)
+        self.taps.append(tap)
+        if self.stream_server is not None:
+            self.stream_server.add(tap.name)
+        mirrored = " (mirrored)" if tap.mirror else ""
+        self.taps_listbox.insert(tk.END, f"{tap.name}: {delay:.3f} s{mirrored}")
+        self.update_tap_delays()
+
+    def remove_tap(self):
+        selection = self.taps_listbox.curselection()
+        if not selection:
+            return
+        index = selection[0]
+        tap = self.taps.pop(index + 1)  # The main tap is not in the list
+        self.taps_listbox.delete(index)
+        if tap.name in self.tap_canvases:
+            self.tap_canvases.pop(tap.name)[0].destroy()
+        else:
+            try:
+                cv2.destroyWindow(self.tap_window_name(tap))
+            except cv2.error:
+                pass  # Never shown
+        if self.stream_server is not None:
+            self.stream_server.remove(tap.name)
+        self.update_tap_delays()
+
+    def toggle_review(self):
+        """Pause the main view on the newest frame past the delay, or go back to the live delayed view."""
+        if self.review is None:
+            if not self.cameras:
+                return
+            if self.cameras.primary.recorder:
+                tkinter.messagebox.showwarning("Warning", "Review is not available with Fast Save: the save window is kept as encoded segments.")
+                return
+            snapshots = self.cameras.review_snapshots()
+            if snapshots is None:
+                tkinter.messagebox.showwarning("Warning", "Nothing to review yet: no frame has left the delay.")
+                return
+            speed = REVIEW_SPEEDS[self.review_speeds[self.review_speed_dropdown.current()]]
+            self.review = ReviewSession(snapshots, speed)
+            self.review_slider.config(to=max(self.review.duration, 0.001), state="normal")
+            self.set_review_slider()
+            self.review_button.config(text="Back to Live")
+            for button in (self.review_back_button, self.review_play_button, self.review_forward_button):
+                button.config(state="normal")
+        else:
+            self.end_review()
+
+    def end_review(self):
+        if self.review is not None:
+            self.review.close()
+            self.review = None
+        self.main_tap.set_delay(self.delay)  # Pick up the live view again
+        self.review_button.config(text="Pause and Review")
+        self.review_play_button.config(text="Play")
+        self.review_slider.config(state="disabled")
+        for button in (self.review_back_button, self.review_play_button, self.review_forward_button):
+            button.config(state="disabled")
+
+    def set_review_slider(self):
+        self.review_slider_value = round(self.review.offset, 3)
+        self.review_var.set(self.review_slider_value)
+
+    def on_review_scrub(self, value):
+        if self.review is not None and float(value) != self.review_slider_value:
+            self.review.seek(self.review.start_time + float(value))
+
+    def step_review(self, frames):
+        if self.review is not None:
+            self.review.step(frames)
+            self.review_play_button.config(text="Play")
+            self.set_review_slider()
+
+    def toggle_review_playback(self):
+        review = self.review
+        if review is None:
+            return
+        if review.playing:
+            review.pause()
+        else:
+            review.play()
+        self.review_play_button.config(text="Pause" if review.playing else "Play")
+
+    def on_review_speed_change(self, event):
+        if self.review is not None:
+            self.review.speed = REVIEW_SPEEDS[self.review_speeds[self.review_speed_dropdown.current()]]
+
+    def toggle_auto_save(self):
+        self.auto_save = self.auto_save_var.get()
+        if self.auto_save and self.running:
+            self.start_detector()
+        elif not self.auto_save:
+            self.stop_detector()
+
+    def start_detector(self):
+        """Watch the first camera for reps and save a clip around each one."""
+        self.stop_detector()
+        self.detector = MotionDetector(
+            self.cameras.primary, threshold=self.motion_threshold_slider.get() / 100,
+            on_clip=lambda start, end: self.root.after(0, lambda: self.save((start, end))),
+            stats=self.stats,
+        )
+        self.update_rolls()
+        self.detector.start()
+        if self.load_controller is not None:
+            self.load_controller.detector = self.detector
+            self.load_controller.apply()
+
+    def stop_detector(self):
+        if self.detector is not None:
+            self.detector.stop()
+            self.detector = None
+        if self.load_controller is not None:
+            self.load_controller.detector = None
+
+    def update_motion_threshold(self, value):
+        if self.detector is not None:
+            self.detector.threshold = float(value) / 100
+
+    def update_rolls(self, *args):
+        """Apply the pre-roll and post-roll entries to the detector."""
+        if self.detector is None:
+            return
+        try:
+            pre_roll = float(self.pre_roll_var.get())
+            post_roll = float(self.post_roll_var.get())
+            if pre_roll < 0 or post_roll < 0:
+                raise ValueError
+        except ValueError:
+            return  # Ignore invalid values
+        self.detector.pre_roll = pre_roll
+        self.detector.post_roll = post_roll
+
+    def update_tap_delays(self):
+        """Tell the buffers how far back the extra taps look, so they keep enough frames."""
+        if self.cameras:
+            self.cameras.set_tap_delays([tap.delay for tap in self.taps[1:]])
+        self.update_max_save_length()
+
+    def tap_window_name(self, tap):
+        return "Webcam Feed" if tap is self.main_tap else f"Webcam Feed - {tap.name}"
+
+    def draw_preview(self, frame, tap=None):
+        """Show ``frame`` on the tap's in-app canvas (PPM needs no image library and keeps the colors right)."""
+        data = cv2.imencode(".ppm", frame)[1].tobytes()
+        height, width = frame.shape[:2]
+        if tap is None or tap is self.main_tap:
+            canvas, item, image = self.preview_canvas, self.preview_item, self.preview_image
+        else:
+            if tap.name not in self.tap_canvases:
+                canvas = tk.Canvas(self.main_frame, width=0, height=0, highlightthickness=0)
+                canvas.pack(side=tk.LEFT, before=self.controls_canvas)
+                self.tap_canvases[tap.name] = [canvas, canvas.create_image(0, 0, anchor="nw"), None]
+            canvas, item, image = self.tap_canvases[tap.name]
+        if image is None or (image.width(), image.height()) != (width, height):
+            image = tk.PhotoImage(data=data, format="PPM")
+            canvas.config(width=width, height=height)
+            canvas.itemconfig(item, image=image)
+            if canvas is self.preview_canvas:
+                self.preview_image = image
+            else:
+                self.tap_canvases[tap.name][2] = image
+        else:
+            image.configure(data=data, format="PPM")
+
+    def toggle_stats(self):
+        self.stats.enabled = self.stats_var.get()
+        if self.stats.enabled:
+            self.stats.reset()
+        else:
+            self.stats_label.config(text="")
+
+    def toggle_adapt_to_load(self):
+        self.adapt_to_load = self.adapt_var.get()
+        if self.load_controller is not None and not self.adapt_to_load:
+            self.load_controller.reset()  # Back to the chosen settings
+            self.update_load_label()
+
+    def update_load_label(self):
+        controller = self.load_controller
+        if controller is None or not self.adapt_to_load:
+            self.load_label.config(text="Load: -", fg="black")
+            return
+        text = f"Load: {controller.status}"
+        if controller.reasons:
+            text += f"\n({', '.join(controller.reasons)})"
+        # The last step can only warn; make it stand out
+        self.load_label.config(text=text, fg="red" if controller.level == len(controller.LEVELS) - 1 else "black")
+
+    def toggle_streaming(self):
+        if not self.stream_var.get():
+            if self.stream_server is not None:
+                self.stream_server.stop()
+                self.stream_server = None
+            self.stream_port_entry.config(state="normal")
+            self.update_stream_label()
+            return
+        try:
+            port = int(self.stream_port_var.get())
+            self.stream_server = StreamServer(port, stats=self.stats)
+            self.stream_server.start()
+            for tap in self.taps:
+                self.stream_server.add(tap.name)
+        except (ValueError, OSError) as e:
+            self.stream_server = None
+            self.stream_var.set(False)
+            tkinter.messagebox.showerror("Error", f"Unable to start streaming: {e}")
+            return
+        self.stream_port_entry.config(state="disabled")
+        self.update_stream_label()
+
+    def update_stream_label(self):
+        """Show where to watch the stream and how each viewer is doing."""
+        server = self.stream_server
+        if server is None:
+            self.stream_label.config(text="")
+            return
+        lines = [f"Watch at {server.url()}"]
+        for client in server.client_stats():
+            lines.append(f"{client['address']} ({client['stream']}, {client['quality']}): "
+                         f"{client['fps']:.0f} fps, {client['frames_skipped']} skipped, {client['kbps']} kbit/s")
+        self.stream_label.config(text="\n".join(lines))
+
+    def toggle_stats_overlay(self):
+        self.stats_overlay = self.overlay_var.get()
+
+    def update_buffer_stats(self):
+        """Show the buffer footprint and load level, step the load controller, and show the stage timings if enabled."""
+        if not self.running:
+            return
+        if self.adapt_to_load and self.load_controller is not None:
+            self.load_controller.sample()
+            self.update_load_label()
+        scheduler = self.main_tap.schedulers[0] if self.main_tap.schedulers else None
+        if self.stats.enabled:
+            self.cameras.update_gauges(scheduler)
+            if self.detector is not None:
+                self.detector.update_gauges()
+            self.stats.flush()
+            self.stats_label.config(text="\n".join(self.stats.format_summary()))
+        self.update_max_save_length()  # A compressed frame's size depends on the scene
+        pipeline = self.cameras.primary  # Per-frame figures are for the first camera
+        ring = pipeline.ring
+        if ring is not None:
+            text = f"Buffer: {self.cameras.footprint_bytes / 1e6:.1f} MB ({ring.bytes_per_frame / 1e3:.1f} KB/frame)"
+            if len(self.cameras) > 1:
+                text += f" for {len(self.cameras)} cameras"
+            spill = pipeline.spill
+            if spill is not None:
+                status = "keeping up" if spill.keeping_up else "falling behind"
+                text += f"\nDisk: {spill.ring.footprint_bytes / 1e6:.1f} MB, {spill.write_bandwidth / 1e6:.1f} MB/s ({status})"
+            scheduler = scheduler or pipeline.scheduler
+            text += f"\nDelay jitter: {scheduler.jitter * 1e3:.1f} ms (max error {scheduler.max_error * 1e3:.1f} ms, {scheduler.dropped} frames skipped)"
+            detector = self.detector
+            if detector is not None:
+                state = "rep in progress" if detector.rep_start is not None else f"{detector.rep_count} reps"
+                text += f"\nDetector: {detector.cost * 1e3:.2f} ms/frame, every {detector.stride} frame(s), {state}"
+            self.buffer_stats_label.config(text=text)
+        self.update_stream_label()
+        self.root.after(self.STATS_INTERVAL_MS, self.update_buffer_stats)
+
+    def on_codec_change(self, event):
+        self.codec = self.codecs[self.codec_dropdown.current()]
+
+    def on_preset_change(self, event):
+        self.preset = self.presets[self.preset_dropdown.current()]
+
     def toggle_upload_to_drive(self):
         self.upload_to_drive = self.upload_to_drive_var.get()
 
     def authenticate(self):
         self.check_and_copy_credentials()
         self.drive.authenticate()
+        self.upload_queue.wake()  # Uploads left from earlier sessions can go now
         tkinter.messagebox.showinfo("Info", "Authentication Successful")
+
+    def update_upload_status(self):
+        """Show how many clips are waiting, uploading and failed."""
+        counts = self.upload_queue.summary()
+        if not any(counts[status] for status in ("pending", "uploading", "failed")):
+            self.upload_status_label.config(text=f"Uploads: {counts['done']} done" if counts["done"] else "")
+            return
+        text = f"Uploads: {counts['pending']} waiting, {counts['uploading']} uploading"
+        if counts["progress"] is not None:
+            text += f" ({counts['progress']:.0%})"
+        if counts["failed"]:
+            text += f", {counts['failed']} failed"
+        if counts["pending"] and not self.drive.authenticated:
+            text += "\n(authenticate Google Drive to continue)"
+        self.upload_status_label.config(text=text)
         
     def save_link(self):
-        with open(self.SAVE_LINK_FILE, "w") as f:
-            test = self.drive_var.get()
-            f.write(test)
-
-    def load_link_directory(self):
-        """Load the save directory from file or initialize it."""
-        if os.path.exists(self.SAVE_LINK_FILE):
-            with open(self.SAVE_LINK_FILE, "r") as f:
-                link = f.read().strip()
-                return link
-        open(self.SAVE_LINK_FILE, "w")
-        return ""
+        self.profile.update(drive_link=self.drive_var.get().strip())
 
     def on_webcam_change(self, event):
         selected_index = self.webcam_dropdown.current()  # Get the selected index
-        self.resolutions.clear()
-        self.resolutions = self.get_supported_resolutions_fps(selected_index)
+        self.resolutions = self.get_supported_resolutions_fps(selected_index) or []
         self.resolution_dropdown['values'] = self.resolutions
-        self.resolution_dropdown.current(len(self.resolutions) - 1)
+        if self.resolutions:
+            self.resolution_dropdown.current(len(self.resolutions) - 1)
+        else:
+            self.resolution_dropdown.set("Detecting...")
+
+    def on_capabilities_updated(self, index, modes):
+        """A background probe found different modes; update the dropdown if that camera is still selected."""
+        if self.webcam_dropdown.current() != index:
+            return
+        selected = self.resolution_dropdown.current()
+        previous = self.resolutions[selected] if 0 <= selected < len(self.resolutions) else None
+        self.resolutions = modes
+        self.resolution_dropdown['values'] = self.resolutions
+        if previous in self.resolutions:
+            self.resolution_dropdown.current(self.resolutions.index(previous))
+        else:
+            self.resolution_dropdown.current(len(self.resolutions) - 1)
+        self.update_max_save_length()
 
     def set_resolution(self):
         index = self.resolution_dropdown.current()
+        if index == -1 or not self.resolutions:
+            # Modes are still being detected; keep whatever the camera opened with
+            self.currentwidth = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.currentheight = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.currentfps = int(self.capture.get(cv2.CAP_PROP_FPS))
+            return
         self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolutions[index][0])
         self.currentwidth = self.resolutions[index][0]
         self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolutions[index][1])
@@ -236,42 +924,236 @@ class WebcamSelectorApp:
         self.capture.set(cv2.CAP_PROP_FPS, self.resolutions[index][2])
         self.currentfps = self.resolutions[index][2]
         
-    def update_save_directory(self):
-        self.dirlabel['text'] = self.load_save_directory()
-
-    def load_save_directory(self):
-        """Load the save directory from file or initialize it."""
-        if os.path.exists(self.SAVE_DIRECTORY_FILE):
-            with open(self.SAVE_DIRECTORY_FILE, "r") as f:
-                directory = f.read().strip()
-                if os.path.isdir(directory):
-                    return directory
-        # Default to the current working directory
-        default_directory = os.getcwd()
-        self.update_save_directory_file(default_directory)
-        return default_directory
-
-    def update_save_directory_file(self, directory):
-        """Update the save directory file with the new directory."""
-        with open(self.SAVE_DIRECTORY_FILE, "w") as f:
-            f.write(directory)
-
     def get_webcam_names(self):
-        """Retrieve names of connected webcams using AVFoundation."""
-        devices = AVCaptureDevice.devicesWithMediaType_("vide")
-        return [device.localizedName() for device in devices]
+        """Retrieve names of connected webcams from the capture backend."""
+        return self.backend.list_devices()
+
+    def discover_devices(self):
+        """List the cameras on a background thread; on_devices_listed fills in the dropdowns."""
+        def run():
+            start = time.perf_counter()
+            try:
+                names = self.get_webcam_names()
+            except Exception as e:
+                print(f"Error listing cameras: {e}")
+                names = []
+            elapsed = time.perf_counter() - start
+            self.root.after(0, lambda: self.on_devices_listed(names, elapsed))
+
+        threading.Thread(target=run, name="device-discovery", daemon=True).start()
+
+    def on_devices_listed(self, names, elapsed):
+        self.webcams = names
+        self.devices_listed = True
+        self.devices_seconds = elapsed
+        self.webcam_dropdown['values'] = self.webcams
+        self.angles_listbox.delete(0, tk.END)
+        for name in self.webcams:
+            self.angles_listbox.insert(tk.END, name)
+        self.angles_listbox.config(height=min(4, max(1, len(self.webcams))))
+
+        if not self.webcams:
+            self.webcam_dropdown.set("No webcams found")
+            self.resolution_dropdown.set("N/A")
+            self.resume_pending = False
+        else:
+            index = self.find_profile_camera()
+            self.webcam_dropdown.current(0 if index is None else index)
+            if self.resume_pending:
+                self.resume_pending = False
+                self.resume_session()
+            else:
+                self.on_webcam_change(None)
+            self.update_max_save_length()
+        self.report_startup()
+
+    def find_profile_camera(self):
+        """Index of the last session's camera, preferring its cache key over its name, or None."""
+        key = self.profile["camera_key"]
+        if key and self.backend.cache_modes:
+            for index in range(len(self.webcams)):
+                if self.backend.device_key(index) == key:
+                    return index
+        if self.profile["camera"] in self.webcams:
+            return self.webcams.index(self.profile["camera"])
+        return None
+
+    def resume_session(self):
+        """Open the last session's camera in its saved mode, skipping mode detection."""
+        if self.running:
+            return
+        if not self.devices_listed:
+            self.resume_pending = True  # on_devices_listed resumes once the cameras are known
+            self.resume_button.config(state="disabled")
+            return
+        index = self.find_profile_camera()
+        if index is None or not self.profile.resumable:
+            tkinter.messagebox.showwarning("Warning", f"{self.profile['camera'] or 'The last camera'} is not connected.")
+            self.resume_button.config(state="normal" if self.profile.resumable else "disabled")
+            self.on_webcam_change(None)
+            return
+        self.capabilities.cancel_refresh()
+        self.webcam_dropdown.current(index)
+        self.resolutions = [tuple(self.profile["mode"])]
+        self.resolution_dropdown['values'] = self.resolutions
+        self.resolution_dropdown.current(0)
+        self.start_webcam()
+
+    def store_profile(self):
+        """Remember the current camera, mode and settings for the next session."""
+        values = {
+            "delay": self.delay, "save_length": int(self.save_length), "mirror": self.mirror,
+            "save_directory": self.save_directory, "spill_directory": self.spill_directory,
+        }
+        if self.running and self.cameras:
+            index = self.webcam_dropdown.current()
+            values["camera"] = self.webcams[index]
+            values["camera_key"] = self.backend.device_key(index) if self.backend.cache_modes else None
+            values["mode"] = [self.currentwidth, self.currentheight, self.currentfps]
+        self.profile.update(**values)
+        self.resume_button.config(state="normal" if self.profile.resumable and not self.running else "disabled")
+
+    def on_window_ready(self):
+        """The window has been drawn for the first time."""
+        self.window_seconds = time.perf_counter() - self.started
+        self.stats.gauge("startup window ms", self.window_seconds * 1000)
+        self.report_startup()
+
+    def report_startup(self):
+        """Show (and print) how long the window and the camera list took, once both are known."""
+        if self.window_seconds is None or not self.devices_listed:
+            return
+        self.stats.gauge("startup devices ms", self.devices_seconds * 1000)
+        text = f"Startup: window {self.window_seconds * 1000:.0f} ms, cameras listed in {self.devices_seconds * 1000:.0f} ms"
+        self.startup_label.config(text=text)
+        print(text)
+        if self.exit_when_ready:
+            print(json.dumps({"window_ms": round(self.window_seconds * 1000, 1), "devices_ms": round(self.devices_seconds * 1000, 1), "cameras": len(self.webcams)}))
+            self.on_close()
+
+    def on_close(self):
+        if self.save_manager.active and not self.exit_when_ready:
+            if not tkinter.messagebox.askyesno("Quit", "Clips are still being saved. Quit and cancel them?"):
+                return
+        if self.running:
+            self.stop_webcam()  # Stores the profile while the camera and mode are still known
+        else:
+            self.store_profile()
+        if self.stream_server is not None:
+            self.stream_server.stop()
+            self.stream_server = None
+        self.save_manager.shutdown()
+        self.exporter.shutdown()  # Stops the encoder processes and deletes the cached chunks
+        self.upload_queue.stop()  # Unfinished uploads resume on the next start
+        self.root.destroy()
 
     def update_save_slider_label(self, value):
         """Update the slider value label."""
         self.save_slider_value_label.config(text=f"Video Length: {int(value)} Seconds")
         self.save_length = int(value)
         self.save_var.set(f"{int(value)}")  # Update entry box without triggering infinite loop
+        if self.cameras:
+            # Resize the buffers once the slider comes to rest, not for every step of a drag
+            if self.save_length_job is not None:
+                self.root.after_cancel(self.save_length_job)
+            self.save_length_job = self.root.after(self.RESIZE_DELAY_MS, self.apply_save_length)
+
+    def apply_save_length(self):
+        self.save_length_job = None
+        if self.cameras:
+            self.cameras.set_save_length(self.save_length)
+
+    def update_memory_budget(self, *args):
+        try:
+            megabytes = float(self.memory_var.get())
+            if megabytes <= 0:
+                raise ValueError
+        except ValueError:
+            self.memory_var.set(str(self.memory_budget // 2 ** 20))  # Back to the budget in use
+            return
+        budget = int(megabytes * 2 ** 20)
+        if budget == self.memory_budget:
+            return
+        minimum = self.min_memory_budget()
+        if minimum and budget < minimum:
+            tkinter.messagebox.showwarning(
+                "Warning",
+                f"The buffers need at least {-(-minimum // 2 ** 20)} MB for the delay and video length at these settings. "
+                "Shorten the video length or delay first."
+            )
+            self.memory_var.set(str(self.memory_budget // 2 ** 20))
+            return
+        if self.cameras:
+            dropped = max(pipeline.frames_dropped_by_budget(budget // len(self.cameras)) for pipeline in self.cameras.pipelines)
+            if dropped and not tkinter.messagebox.askyesno("Shrink Buffer", f"This budget discards {dropped} buffered frames. Continue?"):
+                self.memory_var.set(str(self.memory_budget // 2 ** 20))
+                return
+        self.memory_budget = budget
+        if self.cameras:
+            self.cameras.set_memory_budget(self.memory_budget // len(self.cameras))
+        self.update_max_save_length()
+
+    def min_memory_budget(self):
+        """Bytes all the buffers need for the delay plus the video length, or None if unknown or kept on disk."""
+        if self.cameras:
+            pipeline = self.cameras.primary
+            ring = pipeline.ring
+            width, height = (ring.width, ring.height) if ring else (self.currentwidth, self.currentheight)
+            minimum = pipeline.min_memory_budget(pipeline.estimate_frame_bytes(width, height))
+            return minimum and minimum * len(self.cameras)
+        index = self.resolution_dropdown.current()
+        if self.spill_to_disk or self.record_segments or index == -1 or not self.resolutions:
+            return None
+        width, height, fps = self.resolutions[index]
+        frame_bytes = YUYV.frame_bytes(width, height) if self.native_yuv else width * height * 3
+        if self.compress_buffer:
+            frame_bytes //= ReplayPipeline.JPEG_RATIO
+        delay = max([self.delay] + [tap.delay for tap in self.taps[1:]])
+        frames = int((fps or 30) * (delay + self.save_length)) + FrameRing.SLACK_FRAMES
+        return frames * frame_bytes * (1 + len(self.angles_listbox.curselection()))
+
+    def update_max_save_length(self):
+        """Show the longest save window that fits in the memory budget, and keep the save length within it."""
+        count = len(self.cameras) if self.cameras else 1 + len(self.angles_listbox.curselection())
+        budget = self.memory_budget // count
+        if self.cameras:
+            pipeline = self.cameras.primary
+            ring = pipeline.ring
+            width, height = (ring.width, ring.height) if ring else (self.currentwidth, self.currentheight)
+            max_length = pipeline.max_save_length(pipeline.estimate_frame_bytes(width, height))
+        elif self.spill_to_disk or self.record_segments:
+            max_length = None  # The save window is kept on disk
+        else:
+            index = self.resolution_dropdown.current()
+            if index == -1 or not self.resolutions:
+                self.max_save_label.config(text="")
+                return
+            width, height, fps = self.resolutions[index]
+            frame_bytes = YUYV.frame_bytes(width, height) if self.native_yuv else width * height * 3
+            if self.compress_buffer:
+                frame_bytes //= ReplayPipeline.JPEG_RATIO
+            delay = max([self.delay] + [tap.delay for tap in self.taps[1:]])
+            max_length = max_save_seconds(budget, frame_bytes, fps or 30, delay)
+
+        limit = self.MAX_SAVE_LENGTH
+        if max_length is None:
+            self.max_save_label.config(text="Save length is not limited by memory (kept on disk)")
+        else:
+            self.max_save_label.config(text=f"Max {max_length:.0f} s at current settings")
+            limit = max(1, min(limit, int(max_length)))
+        self.save_slider.config(to=limit)
+        if self.save_length > limit:
+            self.save_slider.set(limit)
 
     def update_slider_label(self, value):
         """Update the slider value label."""
         self.slider_value_label.config(text=f"Delay: {float(value):.3f} Seconds")
         self.delay = float(value)
         self.delay_var.set(f"{float(value):.3f}")  # Update entry box without triggering infinite loop
+        self.main_tap.set_delay(self.delay)
+        if self.cameras:
+            self.cameras.set_delay(self.delay)
+        self.update_max_save_length()
 
     def update_slider_from_entry(self, *args):
         """Update the slider value from the entry box."""
@@ -280,6 +1162,10 @@ class WebcamSelectorApp:
             if 0 <= delay_value <= 30:
                 self.delay_slider.set(delay_value)  # Update the slider
                 self.delay = delay_value
+                self.main_tap.set_delay(self.delay)
+                if self.cameras:
+                    self.cameras.set_delay(self.delay)
+                self.update_max_save_length()
             else:
                 raise ValueError
         except ValueError:
@@ -289,7 +1175,7 @@ class WebcamSelectorApp:
         """Update the slider value from the entry box."""
         try:
             save_value = float(self.save_var.get())
-            if 0 <= save_value <= 120:
+            if 0 <= save_value <= self.save_slider.cget("to"):
                 self.save_slider.set(save_value)  # Update the slider
                 self.save_length = save_value
             else:
@@ -311,87 +1197,123 @@ class WebcamSelectorApp:
         if selected_index == -1 or not self.webcams:
             tkinter.messagebox.showwarning("Warning", "No webcam selected.")
             return
-        
-        self.capture = cv2.VideoCapture(selected_index)
+
+        self.capabilities.cancel_refresh()  # Release the camera if it is still being probed
+        self.capture = self.backend.open(selected_index)
 
         #second open check
         if not self.capture.isOpened():
             tkinter.messagebox.showerror("Error", f"Unable to open {self.webcams[selected_index]}")
             return
-        
+
+        if self.native_yuv:
+            request_raw_format(self.capture)  # Before the frame size, so the driver picks a YUV mode
         self.set_resolution()
+
+        # Extra angles are asked for the same mode as the main camera
+        captures = [self.capture]
+        names = [self.webcams[selected_index]]
+        for index in self.angles_listbox.curselection():
+            if index == selected_index:
+                continue
+            capture = self.backend.open(index)
+            if not capture.isOpened():
+                tkinter.messagebox.showerror("Error", f"Unable to open {self.webcams[index]}")
+                for opened in captures:
+                    opened.release()
+                return
+            if self.native_yuv:
+                request_raw_format(capture)
+            capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.currentwidth)
+            capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.currentheight)
+            capture.set(cv2.CAP_PROP_FPS, self.currentfps)
+            captures.append(capture)
+            names.append(self.webcams[index])
+
         self.running = True
         self.control_button.config(text="Stop Webcam")
         self.mirror_button.config(state="normal")  # Enable the mirror button
+        self.compress_checkbox.config(state="disabled")  # Buffer mode is fixed while running
+        self.segments_checkbox.config(state="disabled")
+        self.spill_checkbox.config(state="disabled")
+        self.native_yuv_checkbox.config(state="disabled")
         self.save_button.config(state="normal")  # Enable the save button
-        self.max_save_buffer_size = (int(self.currentfps or 30) * self.save_length)  # Maximum number of frames for a 30-second save buffer
+        self.review_button.config(state="normal")
+        spill_directory = (self.spill_directory or self.save_directory) if self.spill_to_disk else None
+        pipelines = [
+            ReplayPipeline(
+                capture, capture.get(cv2.CAP_PROP_FPS) or self.currentfps, delay=self.delay, save_length=self.save_length,
+                compress_buffer=self.compress_buffer, jpeg_quality=self.jpeg_quality,
+                record_segments=self.record_segments, spill_directory=spill_directory, stats=self.stats,
+                memory_budget=self.memory_budget // len(captures),
+                pixel_format=negotiated_format(capture) if self.native_yuv else None,
+            )
+            for capture in captures
+        ]
+        self.cameras = CameraGroup(pipelines, names)
+        for tap in self.taps:
+            tap.reset(pipelines)
+        self.update_tap_delays()  # Also fits the save length to the memory budget
+        self.cameras.start()
+        self.store_profile()
+        self.load_controller = LoadController(self.cameras, self.taps, exporter=self.exporter, stats=self.stats)
+        if self.auto_save:
+            self.start_detector()
         self.show_frame()
+        self.update_buffer_stats()
 
-    def sort_resolutions(self, tuples_list):
-        return sorted(tuples_list, key=lambda x: (x[0], x[1], x[2]))
-    
     def get_supported_resolutions_fps(self, index):
+        """Return the cached modes of camera ``index`` at once and re-detect them in the background."""
         selected_index = index
 
         if selected_index == -1 or not self.webcams:
             return
 
-        resolutions = [
-            (320, 240), (640, 480), (800, 600), 
-            (1280, 720), (1920, 1080), (2560, 1440), 
-            (3840, 2160)  # 4K
-        ]
-        # Common FPS values
-        fps_values = [15, 30, 60, 120, 240]
-        
-        supported_combinations = []
-
-        # Initialize the webcam
-        cap = cv2.VideoCapture(selected_index)
-
-        if not cap.isOpened():
-            print("Error: Could not open webcam.")
-            return supported_combinations
-
-        # Test each resolution and FPS
-        for width, height in resolutions:
-            for fps in fps_values:
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-                cap.set(cv2.CAP_PROP_FPS, fps)
-
-                # Retrieve the settings after applying
-                actual_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                actual_fps = int(cap.get(cv2.CAP_PROP_FPS))
+        backend = self.backend
+        if not backend.cache_modes:
+            return backend.supported_modes(selected_index)
 
-                # Check if the desired settings were successfully applied
-                if int(actual_width) == width and int(actual_height) == height and int(actual_fps) == fps:
-                    if ((int(actual_width), int(actual_height), int(actual_fps)) not in supported_combinations):
-                        supported_combinations.append((int(width), int(height), int(fps)))
-                elif ((int(actual_width), int(actual_height), int(actual_fps)) not in supported_combinations):
-                    supported_combinations.append((int(actual_width), int(actual_height), int(actual_fps)))
-
-        cap.release()
-        return self.sort_resolutions(supported_combinations)
+        key = backend.device_key(selected_index)
+        if not self.running:  # Probing would fight the running capture for the camera
+            self.capabilities.refresh(
+                key,
+                lambda cancel: backend.supported_modes(selected_index, cancel),
+                lambda key, modes: self.root.after(0, lambda: self.on_capabilities_updated(selected_index, modes))
+            )
+        return self.capabilities.get(key) or []
 
     def stop_webcam(self):
         """Stops the webcam feed."""
+        self.store_profile()
         self.running = False
         self.control_button.config(text="Start Webcam")
+        self.resume_button.config(state="normal")  # The profile now holds this camera and mode
         self.mirror_button.config(state="disabled")  # Disable the mirror button
+        self.compress_checkbox.config(state="normal")
+        self.segments_checkbox.config(state="normal")
+        self.spill_checkbox.config(state="normal")
+        self.native_yuv_checkbox.config(state="normal")
         self.save_button.config(state="disabled")  # Disable the save button
+        self.end_review()
+        self.review_button.config(state="disabled")
+        self.stop_detector()
+        if self.load_controller is not None:
+            self.load_controller.reset()  # Back to the chosen preview settings
+            self.load_controller = None
+        self.update_load_label()
 
-        if self.capture:
-            self.capture.release()
+        if self.cameras:
+            self.cameras.stop()  # Also releases the captures and the frame stores
+            self.cameras = None
+        self.exporter.chunk_cache.clear()  # Chunks of this run's rings can't be shared by later saves
 
-        cv2.destroyAllWindows()  # Close OpenCV window
-        self.delay_buffer.clear()  # Clear the delay buffer
-        self.save_buffer.clear()  # Clear the saved buffer
+        cv2.destroyAllWindows()  # Close the OpenCV windows
 
     def toggle_mirror(self):
         """Toggles the mirroring effect on the video feed."""
         self.mirror = not self.mirror
+        self.preview.mirror = self.mirror  # Only the preview is mirrored; saved clips are not
+        self.profile.update(mirror=self.mirror)
 
     def change_save_directory(self):
         """Allow the user to select a directory to save videos."""
@@ -399,6 +1321,7 @@ class WebcamSelectorApp:
         if directory:  # If a directory is selected
             self.save_directory = directory
             self.dirlabel['text'] = directory
+            self.profile.update(save_directory=directory)
             tkinter.messagebox.showinfo("Info", f"Save directory changed to: {self.save_directory}")
 
     def get_max_res(self) -> tuple:
@@ -449,90 +1372,201 @@ class WebcamSelectorApp:
         else:
             print("credentials.json already exists in the current directory.")
 
-    def save(self):
-        """Save the last 30 seconds of webcam frames to an MP4 file in a separate thread."""
-        if not self.save_buffer:
-            tkinter.messagebox.showinfo("Info", "No frames available to save.")
-            return
-
-        self.save_button.config(state="disabled")  # Disable the save button
-        # Get FPS and resolution from the webcam
-        fps = copy.deepcopy(self.currentfps)  # Default to 30 FPS if unavailable
-        width = copy.deepcopy(self.currentwidth)
-        height = copy.deepcopy(self.currentheight)
-
-        # Start a new thread for saving the video, passing necessary arguments
-        save_thread = threading.Thread(
-            target=self._save_video,
-            args=(copy.deepcopy(self.save_buffer), fps, width, height)
-        )
-        save_thread.daemon = True  # Ensure thread exits when the application closes
-        save_thread.start()
+    def save(self, window=None):
+        """Save the last ``save_length`` seconds from every camera as a background job.
 
-    def _save_video(self, save_buffer, fps, width, height):
-        """Worker method to save video in a separate thread."""
-        # Generate a unique filename in the selected directory
-        filename = os.path.join(self.save_directory, "video.mp4")
-        counter = 1
-        while os.path.exists(filename):
-            filename = os.path.join(self.save_directory, f"video_{counter}.mp4")
-            counter += 1
-
-        # Create a VideoWriter object
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(filename, fourcc, fps, (width, height))
+        ``window`` is a (start, end) capture-time range to save instead, for
+        clips saved automatically. Saves can be requested at any time; they run
+        on the SaveManager's pool and wait in its queue when it is busy, and
+        are refused once that queue is full.
+        """
+        cameras = self.cameras
+        auto = window is not None
+        if cameras is None:
+            if not auto:
+                tkinter.messagebox.showinfo("Info", "No frames available to save.")
+            return
+        if self.save_manager.full:
+            if auto:
+                print("Save queue is full; skipping the clip for this rep")
+            else:
+                tkinter.messagebox.showwarning("Warning", "Too many saves are waiting. Try again once one has finished.")
+            return
+        self.saves_requested += 1
+        name = f"{'Rep' if auto else 'Clip'} {self.saves_requested} ({time.strftime('%H:%M:%S')})"
+
+        if cameras.primary.recorder:
+            # The clips are already encoded; joining the segments is all that's left
+            length = self.save_length
+            if auto:
+                # The segments can only be cut from the end, so save from the window's start up to now
+                length = time.monotonic() - cameras.delay - window[0]
+            recorders = [pipeline.recorder for pipeline in cameras.pipelines]
+            filenames = claim_filenames(self.save_directory, len(recorders))
+            run = lambda: self._save_segments(recorders, filenames, length)
+            self.save_manager.submit(SaveJob(name, filenames, run=run, auto=auto))
+            return
 
-        # Write frames to the file
-        for _, frame in save_buffer:
-            out.write(frame)
+        # Pin the same time window in every camera instead of copying the frames;
+        # they are released as they are written. The jobs that may be pending
+        # share the copy budget for frames overwritten while they wait.
+        share = 1 / self.save_manager.limit
+        if auto:
+            snapshots = cameras.snapshots_between(*window, share=share)
+        else:
+            snapshots = cameras.snapshots(self.save_length, share=share)
+        if not any(frames is not None for frames in snapshots):
+            if not auto:
+                tkinter.messagebox.showinfo("Info", "No frames available to save.")
+            return
+        filenames = claim_filenames(self.save_directory, len(snapshots), CODECS[self.codec]["extension"])
+        exports = []
+        for frames, filename, pipeline in zip(snapshots, filenames, cameras.pipelines):
+            if frames is None:
+                continue
+            ring = frames.ring  # With the disk tier enabled the save window lives in the mapped file
+            exports.append(ExportJob(
+                frames, filename, pipeline.fps, ring.width, ring.height,
+                codec=self.codec, preset=self.preset, progress=self.update_save_progress,
+            ))
+        self.save_manager.submit(SaveJob(name, filenames, exports=exports, auto=auto))
+
+    def update_save_progress(self, done, total, fps):
+        """Called from the save threads while clips are being encoded."""
+        self.root.after(0, self.update_save_queue)
+
+    def update_save_queue(self):
+        """Show every queued, running and recently finished save."""
+        jobs = list(self.save_manager.jobs)
+        active = [job for job in jobs if not job.finished]
+        self.save_queue_listbox.delete(0, tk.END)
+        for job in jobs:
+            self.save_queue_listbox.insert(tk.END, job.describe())
+        self.cancel_save_button.config(state="normal" if active else "disabled")
+        if active:
+            queued = sum(1 for job in active if job.state == "queued")
+            self.save_progress_label.config(text=f"Saving {len(active) - queued} clip(s), {queued} queued")
+
+    def cancel_save(self):
+        """Cancel the selected saves, or every unfinished one if none is selected."""
+        jobs = list(self.save_manager.jobs)
+        selected = [jobs[index] for index in self.save_queue_listbox.curselection() if index < len(jobs)]
+        for job in selected or self.save_manager.active:
+            job.cancel()
+        self.update_save_queue()
+
+    def _save_segments(self, recorders, filenames, length):
+        """Save job: cut the clips from the pre-encoded segments, one per camera in parallel."""
+        with ThreadPoolExecutor(max_workers=len(recorders)) as pool:
+            results = list(pool.map(lambda args: args[0].save_clip(length, args[1]), zip(recorders, filenames)))
+        return [filename for filename, result in zip(filenames, results) if result]
+
+    def _save_finished(self, job):
+        """Runs on a save thread once a job is done: report it and queue its clips for upload if enabled."""
+        if job.state == "failed":
+            message = f"Failed to save {job.name}" + (f": {job.error}" if job.error else "")
+            self.root.after(0, lambda: tkinter.messagebox.showerror("Error", message))
+            return
+        if job.state != "saved":
+            if not job.auto and job.state != "cancelled":
+                self.root.after(0, lambda: tkinter.messagebox.showinfo("Info", "No frames available to save."))
+            return
 
-        out.release()  # Release the writer
-        self.root.after(0, lambda: tkinter.messagebox.showinfo("Info", f"Video saved as {filename}"))
+        names = ", ".join(job.saved)
+        fps = job.encode_fps
+        text = f"{'Rep' if job.auto else 'Last'} saved as {names}" + (f" ({fps:.0f} fps)" if fps else "")
+        # Saved clips are reported without interrupting the session
+        self.root.after(0, lambda: self.save_progress_label.config(text=text))
 
         if (self.upload_to_drive):
             if (not self.drive.authenticated):
                 self.drive.authenticate()
-                self.drive.authenticated = True
-            self.drive.upload_to_shared_folder(filename, self.drive_var.get())
-            self.root.after(0, lambda: tkinter.messagebox.showinfo("Info", f"Video uploaded to Google Drive"))
-
-        self.root.after(0, lambda: self.save_button.config(state="normal"))  # Enable the save button
+            # Uploaded in the background so saving doesn't wait for the network
+            for filename in job.saved:
+                self.upload_queue.add(filename, self.drive_var.get())
+
+    def draw_stats_overlay(self, frame):
+        """Return a copy of ``frame`` with the stats drawn on it; the buffered frame is left alone."""
+        frame = frame.copy()
+        for line_number, line in enumerate(self.stats.format_summary()):
+            position = (10, 20 + 18 * line_number)
+            cv2.putText(frame, line, position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+            cv2.putText(frame, line, position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        return frame
 
     def show_frame(self):
-        """Capture and display frames in an external OpenCV window."""
+        """Display each tap's frame captured closest to its delay ago, in OpenCV windows or the app."""
         if self.running:
-            ret, frame = self.capture.read()
-            if ret:
-                # Apply mirroring if enabled
-                if self.mirror:
-                    frame = cv2.flip(frame, 1)  # Flip horizontally
-
-                # Store frame in delay buffer
-                self.delay_buffer.append((time.time(), frame))
-
-                # Remove frames outside the delay window
-                while self.delay_buffer and time.time() - self.delay_buffer[0][0] > self.delay:
-                    val = self.delay_buffer.popleft()
-                    self.save_buffer.append(val)
-
-                    # Display the delayed frame in an external OpenCV window
-                    cv2.imshow("Webcam Feed", val[1])
-
-                # Limit the save buffer size to 30 seconds
-                if len(self.save_buffer) > self.max_save_buffer_size:
-                    self.save_buffer.popleft()
-
-            if cv2.waitKey(1) & 0xFF == ord('s'):
-                self.save()
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                self.stop_webcam()
-                return
-
-            self.root.after(1, self.show_frame)
-
-
-# Create the Tkinter application
-root = tk.Tk()
-app = WebcamSelectorApp(root)
-root.mainloop()
+            stats = self.stats
+            now = time.monotonic()
+            count = len(self.cameras)
+            for tap in self.taps:
+                # LAN viewers get every frame, whatever the preview's frame-rate cap
+                streamed = self.stream_server is not None and self.stream_server.watched(tap.name)
+                shown = tap.preview.ready(now)
+                if not (shown or streamed):
+                    continue
+                if tap is self.main_tap and self.review is not None:
+                    # Paused for review: show the frames at the review position instead
+                    was_playing = self.review.playing
+                    updates = self.review.present(now)
+                    if was_playing:
+                        self.set_review_slider()
+                        if not self.review.playing:
+                            self.review_play_button.config(text="Play")
+                else:
+                    updates = tap.select(self.cameras, now, stats)
+                if streamed:
+                    # The buffered frames, before the preview scales, mirrors or annotates them
+                    frame = tap.stream_frame(updates, count)
+                    if frame is not None:
+                        self.stream_server.publish(tap.name, frame)
+                if not shown:
+                    continue
+                # One camera's preview, or a grid of every camera at preview size
+                frame = tap.render(updates, count, now, stats)
+                if frame is None:
+                    continue
+                if tap is self.main_tap and self.stats_overlay and stats.enabled:
+                    frame = self.draw_stats_overlay(frame)
+                start = stats.start()
+                if self.preview_in_app:
+                    self.draw_preview(frame, tap)
+                else:
+                    cv2.imshow(self.tap_window_name(tap), frame)
+                stats.stop("display", start)
+
+            if not self.preview_in_app:
+                start = stats.start()
+                key = cv2.waitKey(1) & 0xFF
+                stats.stop("waitkey", start)
+                if key == ord('s'):
+                    self.save()
+                elif key == ord('q'):
+                    self.stop_webcam()
+                    return
+                elif key == ord(','):
+                    self.step_review(-1)
+                elif key == ord('.'):
+                    self.step_review(1)
+                elif key == ord(' '):
+                    self.toggle_review_playback()
+
+            self.root.after(self.DISPLAY_INTERVAL_MS, self.show_frame)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Eyewi: Instant Replay for Athletes")
+    parser.add_argument("--source", default="", help="capture source: synthetic[:WxH@FPS], file:PATH[,PATH...], v4l2, v4l2-raw, avfoundation or opencv")
+    parser.add_argument("--trace", help="record per-stage timings to this file (Chrome trace, or JSON lines if it ends in .jsonl)")
+    parser.add_argument("--resume", action="store_true", help="open the last session's camera in its saved mode right away")
+    parser.add_argument("--startup-time", action="store_true", help="print how long the window and the camera list took to appear (as JSON) and quit")
+    args = parser.parse_args()
+
+    # Create the Tkinter application (guarded so export worker processes can import this module)
+    root = tk.Tk()
+    app = WebcamSelectorApp(root, backend_from_spec(args.source), trace_path=args.trace, resume=args.resume, exit_when_ready=args.startup_time)
+    root.mainloop()
+    app.stats.close_trace()
@@ -0,0 +1,183 @@
+import json
+import math
+import os
+import threading
+import time
+
+
+class Histogram:
+    """Durations in log-spaced buckets: constant memory and O(1) recording.
+
+    Buckets are a quarter octave wide from 1 µs up to about 30 s, so
+    percentiles are accurate to within ~19%.
+    """
+
+    MINIMUM = 1e-6
+    BUCKETS_PER_OCTAVE = 4
+    SIZE = 100
+
+    def __init__(self):
+        self.counts = [0] * self.SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.MINIMUM:
+            index = 0
+        else:
+            index = min(self.SIZE - 1, int(math.log2(value / self.MINIMUM) * self.BUCKETS_PER_OCTAVE))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Upper edge of the bucket holding the given fraction of samples."""
+        target = fraction * self.count
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if count and running >= target:
+                return min(self.max, self.MINIMUM * 2 ** ((index + 1) / self.BUCKETS_PER_OCTAVE))
+        return self.max
+
+
+class Instrumentation:
+    """Per-stage timings, counters and gauges for one session, optionally traced to a file.
+
+    Stages are timed with a start/stop pair so nothing is allocated per frame::
+
+        start = stats.start()
+        ...
+        stats.stop("read", start)
+
+    While disabled start() returns None and stop() returns at once, so leaving
+    the calls in the hot path costs next to nothing. With a ``trace_path`` every
+    timed stage is also written as an event: Chrome trace format (load it in
+    chrome://tracing or Perfetto), or JSON lines if the path ends in ``.jsonl``.
+    """
+
+    def __init__(self, enabled=False, trace_path=None):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.epoch = time.perf_counter()
+        self.trace_path = None
+        self._trace_file = None
+        self._events = []  # Trace events waiting for flush()
+        if trace_path:
+            self.open_trace(trace_path)
+
+    def start(self):
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage, start):
+        """Record the time since ``start`` (from start()) against ``stage``."""
+        if start is None:
+            return
+        end = time.perf_counter()
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.add(end - start)
+            if self._trace_file is not None:
+                self._events.append({
+                    "name": stage, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                    "ts": (start - self.epoch) * 1e6, "dur": (end - start) * 1e6,
+                })
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        """Record the current value of something that goes up and down, like buffer occupancy."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = value
+            if self._trace_file is not None:
+                self._events.append({
+                    "name": name, "ph": "C", "pid": os.getpid(),
+                    "ts": (time.perf_counter() - self.epoch) * 1e6, "args": {name: value},
+                })
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def summary(self):
+        """{stage: {count, mean, p50, p95, max}} in seconds, plus counters and gauges."""
+        with self.lock:
+            stages = {
+                stage: {
+                    "count": histogram.count,
+                    "mean": histogram.mean,
+                    "p50": histogram.percentile(0.5),
+                    "p95": histogram.percentile(0.95),
+                    "max": histogram.max,
+                }
+                for stage, histogram in self.histograms.items()
+            }
+            return {"stages": stages, "counters": dict(self.counters), "gauges": dict(self.gauges)}
+
+    def format_summary(self):
+        """Summary as short text lines for the stats panel or the video overlay."""
+        summary = self.summary()
+        lines = [
+            f"{stage}: {values['mean'] * 1e3:.2f} ms avg, {values['p95'] * 1e3:.2f} p95, {values['max'] * 1e3:.1f} max"
+            for stage, values in sorted(summary["stages"].items())
+        ]
+        lines += [f"{name}: {value}" for name, value in sorted(summary["counters"].items())]
+        lines += [f"{name}: {value:.0%}" if isinstance(value, float) else f"{name}: {value}"
+                  for name, value in sorted(summary["gauges"].items())]
+        return lines
+
+    # --- Trace file ---
+
+    def open_trace(self, path):
+        self.close_trace()
+        self.trace_path = path
+        self.json_lines = path.endswith(".jsonl")
+        self._trace_file = open(path, "w")
+        if not self.json_lines:
+            self._trace_file.write("[\n")
+            self._first_event = True
+
+    def flush(self):
+        """Write pending trace events. Call periodically from one thread, not per frame."""
+        with self.lock:
+            events, self._events = self._events, []
+            trace = self._trace_file
+        if trace is None or not events:
+            return
+        for event in events:
+            if self.json_lines:
+                trace.write(json.dumps(event) + "\n")
+            else:
+                trace.write(("" if self._first_event else ",\n") + json.dumps(event))
+                self._first_event = False
+        trace.flush()
+
+    def close_trace(self):
+        if self._trace_file is None:
+            return
+        self.flush()
+        with self.lock:
+            trace, self._trace_file = self._trace_file, None
+        if not self.json_lines:
+            trace.write("\n]\n")
+        trace.close()
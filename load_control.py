@@ -0,0 +1,150 @@
+import time
+
+
+class LoadController:
+    """Steps quality down when the machine can't keep up with the camera, and back up once it can.
+
+    Every sample() checks four signals against limits: how late frames reach
+    the screen (the delay error of the frames the main tap presented), how far
+    the display falls short of the frame rate it should show, how far the
+    capture falls short of the camera's frame rate, and how full the
+    background queues (disk spill, segment encoder) are. After
+    OVERLOAD_SAMPLES overloaded samples in a row it goes one step further down
+    LEVELS; after RECOVER_SAMPLES calm samples in a row it goes one step back.
+
+    ``taps`` is the app's list of DelayTaps (the first is the main one) and may
+    change between samples; ``detector`` and ``exporter`` are optional.
+    """
+
+    LEVELS = (
+        "normal",
+        "preview frame rate lowered",
+        "preview size lowered",
+        "motion detection paused, encoding throttled",
+        "capture settings too high for this machine",
+    )
+    SHED_FPS = 15  # Preview frame rate from the first step on
+    SHED_HEIGHT = 480  # Preview height from the second step on
+    LATENCY_FRAMES = 2.5  # Frames shown later than this many frame intervals count as overload
+    RATE_RATIO = 0.8  # Capturing or showing less than this fraction of the frame rate counts as overload
+    QUEUE_FILL = 0.5  # Background queues fuller than this count as overload
+    OVERLOAD_SAMPLES = 2
+    RECOVER_SAMPLES = 5
+
+    def __init__(self, cameras, taps, detector=None, exporter=None, stats=None):
+        self.cameras = cameras
+        self.taps = taps
+        self.detector = detector
+        self.exporter = exporter
+        self.stats = stats
+        self.level = 0
+        self.reasons = []  # What was over its limit at the last sample
+        self.overloaded = 0  # Overloaded samples in a row
+        self.calm = 0  # Calm samples in a row
+        self._last_time = None
+        self._last_captured = 0
+        self._last_shown = 0
+
+    @property
+    def status(self):
+        return self.LEVELS[self.level]
+
+    def sample(self, now=None):
+        """Measure the signals since the last sample and step the level if needed. Returns the level."""
+        now = time.monotonic() if now is None else now
+        pipeline = self.cameras.primary
+        interval = 1.0 / pipeline.fps
+        reasons = []
+        calm = True
+
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        calm_ratio = (1 + self.RATE_RATIO) / 2
+
+        # Capture-to-display latency and display rate of the main tap since the last sample.
+        # Nothing shown (delay still filling, or paused for review) tells nothing either way.
+        schedulers = self.taps[0].schedulers if self.taps else []
+        if schedulers:
+            scheduler = schedulers[0]
+            shown = scheduler.shown - self._last_shown
+            self._last_shown = scheduler.shown
+            count = min(shown, len(scheduler.errors))
+            if count > 0 and elapsed > 0:
+                errors = list(scheduler.errors)[-count:]
+                latency = sum(errors) / len(errors)
+                limit = self.LATENCY_FRAMES * interval
+                if latency > limit:
+                    reasons.append(f"frames shown {latency * 1e3:.0f} ms late")
+                calm = calm and latency < limit / 2
+
+                fps_cap = self.taps[0].preview.fps_cap
+                target = min(pipeline.fps, fps_cap) if fps_cap else pipeline.fps
+                rate = shown / elapsed
+                if rate < self.RATE_RATIO * target:
+                    reasons.append(f"showing {rate:.0f} of {target:.0f} fps")
+                calm = calm and rate >= calm_ratio * target
+
+        # Capture rate against the camera's frame rate
+        engine = pipeline.engine
+        if engine is not None:
+            captured = engine.frames_captured
+            if elapsed > 0:
+                rate = (captured - self._last_captured) / elapsed
+                if rate < self.RATE_RATIO * pipeline.fps:
+                    reasons.append(f"capturing {rate:.0f} of {pipeline.fps:.0f} fps")
+                calm = calm and rate >= calm_ratio * pipeline.fps
+            self._last_captured = captured
+        self._last_time = now
+
+        # Frames waiting for the disk spill or the segment encoder
+        for worker in (pipeline.spill, pipeline.recorder):
+            if worker is not None:
+                fill = worker.queue.qsize() / worker.queue_size
+                if fill > self.QUEUE_FILL:
+                    reasons.append(f"{type(worker).__name__} queue {fill:.0%} full")
+                calm = calm and fill < self.QUEUE_FILL / 2
+
+        self.reasons = reasons
+        if reasons:
+            self.overloaded += 1
+            self.calm = 0
+        else:
+            self.overloaded = 0
+            self.calm = self.calm + 1 if calm else 0
+
+        if self.overloaded >= self.OVERLOAD_SAMPLES and self.level < len(self.LEVELS) - 1:
+            self._step(self.level + 1)
+        elif self.calm >= self.RECOVER_SAMPLES and self.level > 0:
+            self._step(self.level - 1)
+        self.apply()
+        return self.level
+
+    def _step(self, level):
+        self.level = level
+        self.overloaded = 0  # Give the step time to take effect before judging again
+        self.calm = 0
+        print(f"Load: {self.status}" + (f" ({', '.join(self.reasons)})" if self.reasons else ""))
+        if self.stats is not None:
+            self.stats.count("load steps")
+
+    def apply(self):
+        """Put the current level into effect, including on taps added since the last step."""
+        level = self.level
+        for tap in self.taps:
+            tap.preview.limit_fps = self.SHED_FPS if level >= 1 else None
+            tap.preview.limit_height = self.SHED_HEIGHT if level >= 2 else None
+        if self.detector is not None:
+            self.detector.paused = level >= 3
+        if self.exporter is not None:
+            self.exporter.throttled = level >= 3
+        if self.stats is not None and self.stats.enabled:
+            self.stats.gauge("load level", level)
+
+    def reset(self):
+        """Back to full quality, e.g. when the capture restarts."""
+        self.level = 0
+        self.overloaded = self.calm = 0
+        self.reasons = []
+        self._last_time = None
+        self._last_captured = 0
+        self._last_shown = 0
+        self.apply()
@@ -0,0 +1,152 @@
+import math
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """Marks reps from motion in one camera's stream and reports each as a clip to save.
+
+    A worker thread takes the newest frame from the pipeline's ring, so the
+    capture thread never waits for it. Each frame is shrunk to a small grayscale
+    thumbnail and compared with the previous one; the fraction of pixels that
+    changed is the activity. A rep starts when the activity rises above
+    ``threshold`` and ends once it has stayed below it for ``quiet`` seconds.
+
+    ``on_clip(start_time, end_time)`` is called from the worker with the rep's
+    capture-time window, widened by ``pre_roll`` and ``post_roll``, as soon as
+    all of it has left the delay and is in the save window.
+
+    Every comparison is timed. If the detector needs more than BUDGET of a
+    frame interval per frame it backs off to every Nth frame (``stride``).
+    """
+
+    THUMBNAIL_WIDTH = 64  # Frames are compared at this width
+    PIXEL_THRESHOLD = 25  # Gray-level change that counts a pixel as moving
+    BUDGET = 0.25  # Fraction of a frame interval the detector may spend per frame
+    MIN_REP = 0.3  # Seconds; shorter bursts of motion are not reps
+    RECENT_REPS = 100  # Reps kept in ``reps``; older ones are only counted
+
+    def __init__(self, pipeline, threshold=0.02, quiet=1.0, pre_roll=1.0, post_roll=1.0, on_clip=None, stats=None):
+        self.pipeline = pipeline
+        self.threshold = threshold
+        self.quiet = quiet
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.on_clip = on_clip
+        self.stats = stats
+        self.paused = False  # Set by the LoadController to free the CPU for capture and display
+        self.stride = 1  # Analyse every Nth frame
+        self.cost = 0.0  # Moving average of seconds per analysed frame
+        self.activity = 0.0
+        self.frames_analysed = 0
+        self.frames_skipped = 0
+        self.reps = deque(maxlen=self.RECENT_REPS)  # (start, end) capture times of the latest reps
+        self.rep_count = 0  # Reps found this session
+        self.rep_start = None  # Capture time the current rep started, or None
+        self.last_active = None
+        self._due = []  # Reps waiting for their post-roll to leave the delay
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def interval(self):
+        return 1.0 / self.pipeline.fps
+
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="motion-detector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def update_gauges(self):
+        stats = self.stats
+        if stats is not None and stats.enabled:
+            stats.gauge("detector stride", self.stride)
+            stats.gauge("motion activity", round(self.activity, 4))
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        # Take every step-th pixel first (free, it is a view) so the resize only touches a few
+        step = max(1, width // (self.THUMBNAIL_WIDTH * 2))
+        frame = frame[::step, ::step]
+        size = (self.THUMBNAIL_WIDTH, max(1, round(height * self.THUMBNAIL_WIDTH / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)  # Sensor noise is not motion
+
+    def _run(self):
+        last_seq = -1
+        previous = None
+        while not self._stopping:
+            self._release_due()
+            if self.paused:
+                previous = None  # The scene may have changed meanwhile; don't count that as motion
+                if self.rep_start is not None:
+                    self._end_rep()  # Ends at its last motion, not after the pause
+                time.sleep(self.interval)
+                continue
+            ring = self.pipeline.ring
+            seq = ring.write_seq - 1 if ring is not None else -1
+            if seq < 0 or seq < last_seq + self.stride:
+                time.sleep(self.interval / 2)
+                continue
+            if last_seq >= 0:
+                self.frames_skipped += seq - last_seq - 1
+            last_seq = seq
+            timestamp = ring.timestamp(seq)
+            start = self.stats.start() if self.stats else None
+            started = time.perf_counter()  # The cost includes decoding a compressed frame
+            frame = ring.get_reduced(seq)
+            if frame is None:
+                if self.stats:
+                    self.stats.stop("detect", start)
+                continue
+            thumbnail = self._thumbnail(frame)
+            if previous is not None and previous.shape == thumbnail.shape:
+                moving = cv2.absdiff(thumbnail, previous) > self.PIXEL_THRESHOLD
+                self._update(timestamp, np.count_nonzero(moving) / moving.size)
+            previous = thumbnail
+            self._note_cost(time.perf_counter() - started)
+            if self.stats:
+                self.stats.stop("detect", start)
+
+    def _note_cost(self, cost):
+        self.frames_analysed += 1
+        self.cost = cost if self.frames_analysed == 1 else 0.9 * self.cost + 0.1 * cost
+        self.stride = max(1, math.ceil(self.cost / (self.interval * self.BUDGET)))
+
+    def _update(self, timestamp, activity):
+        self.activity = activity
+        if activity >= self.threshold:
+            if self.rep_start is None:
+                self.rep_start = timestamp
+            self.last_active = timestamp
+        elif self.rep_start is not None and timestamp - self.last_active >= self.quiet:
+            self._end_rep()
+
+    def _end_rep(self):
+        """Close the rep in progress at its last motion; too short a burst is dropped."""
+        if self.last_active - self.rep_start >= self.MIN_REP:
+            rep = (self.rep_start, self.last_active)
+            self.reps.append(rep)
+            self.rep_count += 1
+            self._due.append(rep)
+        self.rep_start = None
+
+    def _release_due(self):
+        """Hand over the reps whose post-roll has left the delay."""
+        saved_until = time.monotonic() - self.pipeline.delay
+        while self._due and self._due[0][1] + self.post_roll <= saved_until:
+            start, end = self._due.pop(0)
+            if self.on_clip:
+                self.on_clip(start - self.pre_roll, end + self.post_roll)
@@ -0,0 +1,95 @@
+import time
+
+
+class CameraGroup:
+    """Several cameras filmed at once, one ReplayPipeline (capture thread and buffer) each.
+
+    Every capture thread stamps frames with the same monotonic clock, so a
+    moment in time means the same thing for every angle: a DelayTap picks the
+    frame nearest ``now - delay`` from each camera, and a save covers the same
+    capture-time window in every angle.
+    """
+
+    def __init__(self, pipelines, names=None):
+        self.pipelines = list(pipelines)
+        self.names = list(names) if names else [f"cam{index + 1}" for index in range(len(self.pipelines))]
+
+    def __len__(self):
+        return len(self.pipelines)
+
+    @property
+    def primary(self):
+        return self.pipelines[0]
+
+    @property
+    def delay(self):
+        return self.primary.delay
+
+    def start(self):
+        for pipeline in self.pipelines:
+            pipeline.start()
+
+    def stop(self):
+        for pipeline in self.pipelines:
+            pipeline.stop()
+
+    def set_delay(self, delay):
+        for pipeline in self.pipelines:
+            pipeline.set_delay(delay)
+
+    def set_tap_delays(self, delays):
+        """Delays of the extra taps, so every ring keeps frames for the longest one."""
+        for pipeline in self.pipelines:
+            pipeline.set_tap_delays(delays)
+
+    def set_save_length(self, save_length):
+        for pipeline in self.pipelines:
+            pipeline.set_save_length(save_length)
+
+    def set_memory_budget(self, memory_budget):
+        """Bytes each camera's RAM buffer may use."""
+        for pipeline in self.pipelines:
+            pipeline.set_memory_budget(memory_budget)
+
+    def set_jpeg_quality(self, quality):
+        for pipeline in self.pipelines:
+            pipeline.set_jpeg_quality(quality)
+
+    def update_gauges(self, scheduler=None):
+        self.primary.update_gauges(scheduler)
+
+    @property
+    def footprint_bytes(self):
+        return sum(pipeline.ring.footprint_bytes for pipeline in self.pipelines if pipeline.ring is not None)
+
+    def save_window(self, length, now=None):
+        """(start, end) capture times of the last ``length`` seconds to leave the delay, the same for every angle."""
+        end = (time.monotonic() if now is None else now) - self.delay
+        return end - length, end
+
+    def snapshots(self, length, now=None, share=1.0):
+        """Pin the same save window in every angle: a list with one FrameSnapshot (or None) per camera."""
+        return self.snapshots_between(*self.save_window(length, now), share)
+
+    def snapshots_between(self, start_time, end_time, share=1.0):
+        """Pin the frames captured in [start_time, end_time) in every angle, one FrameSnapshot (or None) per camera.
+
+        Each snapshot may copy ``share`` of its camera's save_rescue_bytes to keep frames the capture overwrites.
+        """
+        return [pipeline.snapshot_between(start_time, end_time, int(pipeline.save_rescue_bytes * share))
+                for pipeline in self.pipelines]
+
+    def review_snapshots(self):
+        """Pin everything the first camera keeps past the delay, and the same capture times in the others.
+
+        A review is never read to the end, so its snapshots would copy every
+        frame the capture overwrites; they stop at each camera's
+        review_rescue_bytes, and frames overwritten after that are lost.
+        Returns one FrameSnapshot (or None) per camera, or None if there is nothing to review yet.
+        """
+        first = self.primary.snapshot(self.primary.review_rescue_bytes)
+        if first is None:
+            return None
+        times = first.timestamps()
+        start, end = times[0], times[-1] + 1.0 / self.primary.fps
+        return [first] + [pipeline.snapshot_between(start, end, pipeline.review_rescue_bytes) for pipeline in self.pipelines[1:]]
@@ -0,0 +1,92 @@
+import cv2
+
+
+class PixelFormat:
+    """A camera's native frame layout, kept as-is in the buffers and turned into BGR only on output.
+
+    YUYV packs two pixels into four bytes (stored as H x W x 2); NV12 and I420
+    are a full-size Y plane followed by quarter-size chroma (stored as
+    1.5H x W x 1). ``fourccs`` are the V4L2 names the format goes by.
+    """
+
+    def __init__(self, name, fourccs, bytes_per_pixel, to_bgr_code):
+        self.name = name
+        self.fourccs = fourccs
+        self.bytes_per_pixel = bytes_per_pixel
+        self.to_bgr_code = to_bgr_code
+
+    def __repr__(self):
+        return self.name
+
+    def storage_shape(self, width, height):
+        """Shape of one frame of this format in the buffers."""
+        if self.name == "YUYV":
+            return (height, width, 2)
+        return (height * 3 // 2, width, 1)
+
+    def frame_bytes(self, width, height):
+        return int(width * height * self.bytes_per_pixel)
+
+    def view(self, frame, width, height):
+        """``frame`` as read from the capture (often one flat row of bytes) in storage shape, or None if it doesn't fit."""
+        shape = self.storage_shape(width, height)
+        if frame.shape == shape:
+            return frame
+        if frame.size != self.frame_bytes(width, height) or not frame.flags.c_contiguous:
+            return None
+        return frame.reshape(shape)
+
+    def to_bgr(self, frame):
+        """A new BGR image of ``frame``."""
+        if frame.shape[2] == 1:
+            frame = frame[:, :, 0]
+        return cv2.cvtColor(frame, self.to_bgr_code)
+
+    def luma(self, frame):
+        """The Y (brightness) plane of ``frame`` as a view: a free grayscale image for analysis."""
+        if self.name == "YUYV":
+            return frame[:, :, 0]
+        return frame[:frame.shape[0] * 2 // 3, :, 0]
+
+    def from_bgr(self, image):
+        """Convert a BGR image to this format in storage shape (for test sources)."""
+        height, width = image.shape[:2]
+        if self.name == "YUYV":
+            return cv2.cvtColor(image, cv2.COLOR_BGR2YUV_YUYV)
+        planar = cv2.cvtColor(image, cv2.COLOR_BGR2YUV_I420)
+        if self.name == "NV12":
+            # Same Y plane; the U and V planes are interleaved instead of one after the other
+            chroma = planar[height:].reshape(2, -1)
+            planar[height:] = chroma.T.reshape(height // 2, width)
+        return planar[:, :, None]
+
+
+YUYV = PixelFormat("YUYV", ("YUYV", "YUY2"), 2.0, cv2.COLOR_YUV2BGR_YUYV)
+NV12 = PixelFormat("NV12", ("NV12",), 1.5, cv2.COLOR_YUV2BGR_NV12)
+I420 = PixelFormat("I420", ("YU12", "I420", "IYUV"), 1.5, cv2.COLOR_YUV2BGR_I420)
+PIXEL_FORMATS = {pixel_format.name: pixel_format for pixel_format in (YUYV, NV12, I420)}
+
+
+def fourcc_name(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4))
+
+
+def request_raw_format(capture, pixel_format=YUYV):
+    """Ask ``capture`` for frames in ``pixel_format`` without OpenCV's conversion to BGR.
+
+    Call before setting the frame size, so the driver picks a mode in that format.
+    """
+    capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*pixel_format.fourccs[0]))
+    capture.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+
+def negotiated_format(capture):
+    """The raw PixelFormat the capture delivers, or None (with conversion back on) if it only delivers BGR."""
+    name = fourcc_name(capture.get(cv2.CAP_PROP_FOURCC))
+    converting = capture.get(cv2.CAP_PROP_CONVERT_RGB)
+    for pixel_format in PIXEL_FORMATS.values():
+        if name in pixel_format.fourccs and not converting:
+            return pixel_format
+    capture.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+    return None
@@ -0,0 +1,87 @@
+import time
+
+import cv2
+import numpy as np
+
+
+# Preview size choices: label -> maximum height (None keeps the capture size)
+PREVIEW_SIZES = {"Full": None, "1080p": 1080, "720p": 720, "480p": 480, "360p": 360}
+# Preview frame-rate caps: label -> frames per second (None shows every refresh)
+PREVIEW_FPS = {"Unlimited": None, "60": 60, "30": 30, "15": 15}
+
+
+class Preview:
+    """Turns a buffered frame into what is shown on screen.
+
+    Frames are scaled down to at most ``max_height`` lines, mirrored if asked and
+    shown at most ``max_fps`` times a second. All of that happens on a preview
+    copy once per displayed frame; the buffered frame is only read, so the
+    buffers and saved clips keep the full-resolution, unmirrored original.
+
+    ``limit_height`` and ``limit_fps`` are further caps set by the
+    LoadController while the machine can't keep up; the user's settings stay as they are.
+    """
+
+    def __init__(self, max_height=None, max_fps=None, mirror=False):
+        self.max_height = max_height
+        self.max_fps = max_fps
+        self.mirror = mirror
+        self.limit_height = None
+        self.limit_fps = None
+        self.next_time = 0.0
+        self._buffer = None  # Reused for every preview frame of the same size
+
+    @property
+    def height_cap(self):
+        """Lines the preview may have, taking the load limit into account (None for no cap)."""
+        caps = [cap for cap in (self.max_height, self.limit_height) if cap]
+        return min(caps) if caps else None
+
+    @property
+    def fps_cap(self):
+        """Frames per second the preview may show, taking the load limit into account (None for no cap)."""
+        caps = [cap for cap in (self.max_fps, self.limit_fps) if cap]
+        return min(caps) if caps else None
+
+    def ready(self, now=None):
+        """Whether the frame-rate cap allows another frame at ``now``."""
+        if not self.fps_cap:
+            return True
+        return (time.monotonic() if now is None else now) >= self.next_time
+
+    def tick(self, now=None):
+        """Count a frame as shown at ``now`` for the frame-rate cap."""
+        fps = self.fps_cap
+        if fps:
+            now = time.monotonic() if now is None else now
+            interval = 1.0 / fps
+            # Step from the previous slot so a late refresh doesn't push every later one back
+            self.next_time = max(self.next_time, now - interval) + interval
+
+    def size_for(self, width, height):
+        """(width, height) of the preview of a ``width`` x ``height`` frame."""
+        max_height = self.height_cap
+        if not max_height or height <= max_height:
+            return width, height
+        return max(1, round(width * max_height / height)), max_height
+
+    def _output(self, shape):
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype=np.uint8)
+        return self._buffer
+
+    def render(self, frame, now=None):
+        """The preview of ``frame``. May be ``frame`` itself if there is nothing to change; never modifies it."""
+        self.tick(now)
+        height, width = frame.shape[:2]
+        size = self.size_for(width, height)
+        if size != (width, height):
+            preview = self._output((size[1], size[0]) + frame.shape[2:])
+            # Bilinear is several times cheaper than INTER_AREA and good enough on screen
+            cv2.resize(frame, size, dst=preview, interpolation=cv2.INTER_LINEAR)
+            if self.mirror:
+                cv2.flip(preview, 1, preview)
+            return preview
+        if self.mirror:
+            return cv2.flip(frame, 1, self._output(frame.shape))
+        return frame
@@ -0,0 +1,359 @@
+import os
+import time
+
+import cv2
+
+from capture import CaptureEngine
+from frame_ring import FrameRing, CompressedFrameRing
+from instrumentation import Instrumentation
+from scheduler import PresentationScheduler
+from segment_recorder import SegmentRecorder
+from spill import SpillTier
+
+
+def default_memory_budget():
+    """Bytes the frame buffers may use by default: half the machine's memory (2 GB if unknown)."""
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (AttributeError, ValueError, OSError):
+        return 2 * 1024 ** 3
+
+
+def max_save_seconds(memory_budget, frame_bytes, fps, delay):
+    """Longest save window, in seconds, that fits in ``memory_budget`` bytes along with ``delay`` seconds of frames."""
+    frames = memory_budget // frame_bytes - FrameRing.SLACK_FRAMES
+    return max(0.0, frames / fps - delay)
+
+
+class ReplayPipeline:
+    """The capture → delay → save pipeline for one camera, independent of any UI.
+
+    Owns the capture once started: a CaptureEngine reads frames into the ring,
+    frames are held back by ``delay`` seconds, and the last ``save_length``
+    seconds of delayed frames are kept for saving (in the ring, a SpillTier or a
+    SegmentRecorder, depending on the options). ``delay`` and ``save_length``
+    can be changed while it runs; the buffer grows or shrinks in place.
+    Frames are stored as captured; mirroring and scaling for display are left
+    to a Preview. Stage timings go to ``stats`` (an Instrumentation).
+
+    With a ``pixel_format`` the capture delivers raw YUV frames (see
+    pixel_formats.request_raw_format); they are read straight into the ring
+    and only the frames that are shown or saved are converted to BGR.
+
+    ``memory_budget`` caps the bytes the RAM ring may hold: the save window is
+    cut short rather than exceed it (the delay itself is always kept).
+    """
+
+    JPEG_RATIO = 10  # Rough size of a raw frame over its JPEG, until real frames are measured
+    SHRINK_SLACK = 1.25  # Shrink the ring only when it holds this much more than needed
+    SAVE_RESCUE_SHARE = 0.25  # Of the memory budget, for copies of frames a save has not read before the capture overwrites them
+    REVIEW_RESCUE_SHARE = 0.25  # Of the memory budget, for copies of reviewed frames the capture overwrites
+
+    def __init__(self, capture, fps, delay=0.0, save_length=1,
+                 compress_buffer=False, jpeg_quality=85, record_segments=False, spill_directory=None, stats=None,
+                 memory_budget=None, pixel_format=None):
+        self.capture = capture
+        self.fps = fps or 30
+        self.delay = delay
+        self.save_length = save_length
+        self.compress_buffer = compress_buffer  # Keep buffered frames JPEG-encoded
+        self.jpeg_quality = jpeg_quality
+        self.record_segments = record_segments  # Pre-encode the delayed stream so saving is a remux
+        self.spill_directory = spill_directory  # Age the save window out of RAM into a file here
+        self.max_save_buffer_size = int(self.fps * save_length)  # Frames in the save window
+        self.memory_budget = memory_budget  # Bytes the RAM ring may use, or None for no limit
+        self.pixel_format = pixel_format  # Native YUV layout of the captured frames, or None for BGR
+        self.frame_size = None  # (width, height) of raw frames, which don't carry it themselves
+        self.engine = None
+        self.ring = None  # Frame store for delayed playback and saving, sized on the first frame
+        self.recorder = None
+        self.spill = None
+        self.stats = stats or Instrumentation()
+        self.scheduler = PresentationScheduler(1.0 / self.fps)  # Picks the frame to show at each refresh
+        self.tap_delays = []  # Delays of further views reading the same ring
+
+    @property
+    def save_ring(self):
+        """The ring the save window is read from (None in segment mode)."""
+        if self.recorder:
+            return None
+        return self.spill.ring if self.spill else self.ring
+
+    def start(self):
+        if self.record_segments:
+            self.recorder = SegmentRecorder(self.fps, self.save_length)
+            self.recorder.start()
+        if self.pixel_format is not None:
+            self.frame_size = (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.engine = CaptureEngine(self.capture, self.buffer_frame, buffer_provider=self.next_ring_slot, stats=self.stats)
+        self.engine.start()
+
+    def stop(self):
+        """Stop capturing, release the camera and free every buffer."""
+        if self.engine:
+            self.engine.stop()
+            self.engine = None
+
+        if self.capture:
+            self.capture.release()
+
+        if self.recorder:
+            self.recorder.stop()
+            self.recorder = None
+
+        if self.spill:
+            self.spill.stop()
+            self.spill = None
+
+        if self.ring:
+            self.ring.close()
+        self.ring = None
+
+    def set_delay(self, delay):
+        self.delay = delay
+        self.reserve_ring()
+        self.scheduler.reset()
+
+    def set_tap_delays(self, delays):
+        """Delays of further views (DelayTaps) reading this ring, so it holds enough for the longest."""
+        self.tap_delays = list(delays)
+        self.reserve_ring()
+
+    def set_save_length(self, save_length):
+        """Change the save window while running, growing or shrinking the buffers in place."""
+        self.save_length = save_length
+        self.max_save_buffer_size = int(self.fps * save_length)
+        if self.recorder:
+            self.recorder.save_length = save_length
+        if self.spill:
+            self.spill.resize(self.max_save_buffer_size)
+        self.resize_ring()
+
+    def set_memory_budget(self, memory_budget):
+        self.memory_budget = memory_budget
+        self.resize_ring()
+
+    @property
+    def longest_delay(self):
+        return max([self.delay] + self.tap_delays)
+
+    def estimate_frame_bytes(self, width, height, channels=3):
+        """Bytes a buffered frame of this size takes: measured once frames are buffered, estimated before."""
+        if self.ring is not None and self.ring.bytes_per_frame:
+            return self.ring.bytes_per_frame
+        if self.pixel_format is not None:
+            raw = self.pixel_format.frame_bytes(width, height)
+        else:
+            raw = width * height * channels
+        return raw // self.JPEG_RATIO if self.compress_buffer else raw
+
+    def max_save_length(self, frame_bytes):
+        """Longest save window in seconds that fits in the memory budget, or None if memory doesn't limit it.
+
+        With the disk tier or segment recording the save window isn't kept in RAM.
+        """
+        if not self.memory_budget or self.record_segments or self.spill_directory or not frame_bytes:
+            return None
+        return max_save_seconds(self.memory_budget, frame_bytes, self.fps, self.longest_delay)
+
+    def min_memory_budget(self, frame_bytes):
+        """Bytes the RAM buffer needs for the longest delay plus the whole save window, or None if it isn't kept in RAM."""
+        if self.record_segments or self.spill_directory or not frame_bytes:
+            return None
+        frames = int(self.fps * self.longest_delay) + self.max_save_buffer_size + FrameRing.SLACK_FRAMES
+        return frames * frame_bytes
+
+    def frames_dropped_by_budget(self, memory_budget):
+        """Buffered frames that switching to ``memory_budget`` would discard (0 if the ring keeps them all)."""
+        ring = self.ring
+        if ring is None or not ring.bytes_per_frame:
+            return 0
+        needed = self.ring_frames_needed(memory_budget=memory_budget)
+        held = ring.capacity - FrameRing.SLACK_FRAMES
+        if held <= needed * self.SHRINK_SLACK:
+            return 0  # resize_ring leaves the ring as it is
+        return max(0, ring.write_seq - ring.oldest_seq - needed)
+
+    def set_jpeg_quality(self, quality):
+        self.jpeg_quality = quality
+        if isinstance(self.ring, CompressedFrameRing):
+            self.ring.quality = quality
+
+    def ring_frames_needed(self, frame_bytes=None, memory_budget=None):
+        """Frames the ring must hold: everything inside the longest delay plus the save window, within the budget.
+
+        ``memory_budget`` overrides the pipeline's, to see what a new budget would do.
+        """
+        memory_budget = memory_budget or self.memory_budget
+        delay_frames = int(self.fps * self.longest_delay)
+        if self.recorder:
+            # The save window lives in the segment files; the ring only has to
+            # hold frames until the recorder has encoded them
+            return delay_frames + self.recorder.queue_size
+        if self.spill:
+            # Frames only stay in RAM until the disk tier has written them
+            return delay_frames + self.spill.queue_size
+        save_frames = self.max_save_buffer_size
+        frame_bytes = frame_bytes or (self.ring.bytes_per_frame if self.ring is not None else 0)
+        if memory_budget and frame_bytes:
+            budget_frames = int(memory_budget // frame_bytes) - FrameRing.SLACK_FRAMES
+            save_frames = max(0, min(save_frames, budget_frames - delay_frames))
+        return delay_frames + save_frames
+
+    def reserve_ring(self):
+        """Grow the frame store if the delay was raised beyond what it can hold, keeping within the memory budget."""
+        ring = self.ring
+        if ring is None:
+            return
+        limit = None
+        if self.memory_budget and ring.bytes_per_frame and not (self.recorder or self.spill):
+            limit = int(self.memory_budget // ring.bytes_per_frame) - FrameRing.SLACK_FRAMES
+        ring.reserve(self.ring_frames_needed(), limit)
+
+    def resize_ring(self):
+        """Fit the frame store to the save window: grow it exactly, or shrink it once it is well oversized."""
+        ring = self.ring
+        if ring is None:
+            return
+        needed = self.ring_frames_needed()
+        held = ring.capacity - FrameRing.SLACK_FRAMES
+        if needed > held or held > needed * self.SHRINK_SLACK:
+            start = self.stats.start()
+            ring.resize(needed)
+            self.stats.stop("resize", start)
+
+    def next_ring_slot(self):
+        """Runs on the capture thread: the ring slot the next frame is read into."""
+        slot = self.ring.next_slot() if self.ring is not None else None
+        if slot is not None and self.pixel_format is not None:
+            return slot.reshape(1, -1)  # OpenCV reads raw frames as one row of bytes
+        return slot
+
+    def create_ring(self, shape):
+        """Create the frame store for frames of the given shape in the selected buffer mode."""
+        if self.ring is not None:
+            self.ring.close()
+        pixel_format = self.pixel_format
+        if pixel_format is not None:
+            width, height = self.frame_size
+            channels = 3
+            frame_bytes = pixel_format.frame_bytes(width, height)
+        else:
+            height, width, channels = shape
+            frame_bytes = width * height * channels
+        if self.spill_directory and not self.recorder:
+            if self.spill is not None:
+                self.spill.stop()
+            self.spill = SpillTier(self.spill_directory, self.max_save_buffer_size, width, height, channels,
+                                   pixel_format=pixel_format)
+            self.spill.start()
+        if self.compress_buffer:
+            frames = self.ring_frames_needed(width * height * channels // self.JPEG_RATIO)
+            return CompressedFrameRing(frames, width, height, channels, quality=self.jpeg_quality, pixel_format=pixel_format)
+        return FrameRing(self.ring_frames_needed(frame_bytes), width, height, channels, pixel_format)
+
+    def buffer_frame(self, timestamp, frame):
+        """Runs on the capture thread: store a frame and move the frames that left the delay into the save window.
+
+        Nothing is handed to the display; present() picks frames from the ring itself.
+        """
+        if self.pixel_format is not None:
+            frame = self.native_view(frame)
+            if frame is None:
+                self.stats.count("bad frames")
+                return
+        if self.ring is None or self.ring.frame_shape != frame.shape:
+            self.ring = self.create_ring(frame.shape)
+
+        stats = self.stats
+        start = stats.start()
+        ring = self.ring
+        ring.commit(timestamp, frame)
+
+        # Frames that have waited out the delay move into the save window
+        due = ring.advance_delay(time.monotonic(), self.delay)
+        if self.recorder:
+            for seq in due:
+                self.recorder.submit(ring, seq)
+        elif self.spill:
+            for seq in due:
+                self.spill.submit(ring, seq)
+        stats.stop("buffer", start)
+
+    def native_view(self, frame):
+        """A raw frame from the capture in the ring's storage shape (a view), or None if it doesn't fit."""
+        if frame.ndim == 3 and frame.shape[2] == 3:
+            # The driver converted to BGR after all; buffer that from now on
+            print(f"Camera delivers BGR, not {self.pixel_format.name}; buffering BGR")
+            self.pixel_format = None
+            return frame
+        width, height = self.frame_size
+        return self.pixel_format.view(frame, width, height)
+
+    def present(self, now=None, delay=None, scheduler=None):
+        """The frame to show at ``now``, as (seq, frame), or None if the one on screen is still right.
+
+        ``delay`` and ``scheduler`` default to the pipeline's own; a DelayTap passes its own.
+        """
+        ring = self.ring
+        if ring is None:
+            return None
+        scheduler = scheduler or self.scheduler
+        delay = self.delay if delay is None else delay
+        seq = scheduler.select(ring, time.monotonic() if now is None else now, delay)
+        if seq is None:
+            return None
+        frame = ring.get_bgr(seq)  # Only the frames shown are converted from a native format
+        return (seq, frame) if frame is not None else None
+
+    def update_gauges(self, scheduler=None):
+        """Record buffer occupancy, dropped frames and delay jitter (of ``scheduler``, by default the pipeline's own)."""
+        ring = self.ring
+        stats = self.stats
+        scheduler = scheduler or self.scheduler
+        if not stats.enabled or ring is None or self.engine is None:
+            return
+        stats.gauge("buffer occupancy", (ring.write_seq - ring.oldest_seq) / ring.capacity)
+        stats.gauge("frames captured", self.engine.frames_captured)
+        stats.gauge("frames dropped", scheduler.dropped)
+        stats.gauge("delay jitter ms", round(scheduler.jitter * 1e3, 2))
+
+    def snapshot(self, max_rescue_bytes=None):
+        """Pin the current save window for a writer, or None if it is empty.
+
+        Frames the capture overwrites before the writer reads them are copied
+        up to ``max_rescue_bytes`` (save_rescue_bytes by default) and lost after that.
+        """
+        ring = self.save_ring
+        if ring is None:
+            return None
+        start, end = ring.save_range(self.max_save_buffer_size)
+        if start == end:
+            return None
+        return ring.snapshot(start, end, self.save_rescue_bytes if max_rescue_bytes is None else max_rescue_bytes)
+
+    def snapshot_between(self, start_time, end_time, max_rescue_bytes=None):
+        """Pin the saved frames captured in [start_time, end_time), or None if there are none. Copies are capped as in snapshot()."""
+        ring = self.save_ring
+        if ring is None:
+            return None
+        start, end = ring.time_range(start_time, end_time)
+        if start == end:
+            return None
+        return ring.snapshot(start, end, self.save_rescue_bytes if max_rescue_bytes is None else max_rescue_bytes)
+
+    def rescue_bytes(self, share):
+        """``share`` of the memory budget (or of the save ring's size without one), in bytes."""
+        ring = self.save_ring
+        budget = self.memory_budget or (ring.footprint_bytes if ring is not None else 0)
+        return int(budget * share)
+
+    @property
+    def save_rescue_bytes(self):
+        """Bytes a save may copy to keep frames the capture overwrites before they are written."""
+        return self.rescue_bytes(self.SAVE_RESCUE_SHARE)
+
+    @property
+    def review_rescue_bytes(self):
+        """Bytes a review may copy to keep frames the capture overwrites."""
+        return self.rescue_bytes(self.REVIEW_RESCUE_SHARE)
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+# Review playback speeds: label -> fraction of real time
+REVIEW_SPEEDS = {"0.25x": 0.25, "0.5x": 0.5, "1x": 1.0}
+
+
+class ReviewSession:
+    """A paused look back through the buffered window while capture carries on.
+
+    ``snapshots`` pin the window (one FrameSnapshot per camera, see
+    CameraGroup.review_snapshots), so its frames stay readable even when the
+    capture overwrites their slots, up to each snapshot's rescue budget;
+    frames lost beyond it are skipped, leaving the last readable one on
+    screen. Each camera's capture times are copied into a timestamp index
+    when the session starts, so seeking is a binary search; the frame shown
+    for a position is the last one captured at or before it.
+    Only frames that are actually shown are read out of the buffer (and
+    decoded, for a compressed buffer).
+    """
+
+    def __init__(self, snapshots, speed=0.5):
+        self.snapshots = snapshots
+        self.indexes = [snapshot.timestamps() if snapshot is not None else None for snapshot in snapshots]
+        self.start_time = float(self.indexes[0][0])
+        self.end_time = float(self.indexes[0][-1])
+        self.position = self.end_time  # Paused on the newest frame that left the delay
+        self.speed = speed
+        self.playing = False
+        self.last_time = None  # When the playback position was last advanced
+        self.shown = [None] * len(snapshots)  # Sequence number on screen per camera
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    @property
+    def offset(self):
+        """Position in seconds from the start of the window."""
+        return self.position - self.start_time
+
+    def seek(self, position):
+        self.position = min(max(position, self.start_time), self.end_time)
+
+    def step(self, frames):
+        """Move ``frames`` frames of the first camera forward (or back, if negative) and pause."""
+        self.playing = False
+        times = self.indexes[0]
+        index = min(max(self._index(times, self.position) + frames, 0), len(times) - 1)
+        self.position = float(times[index])
+
+    def play(self, speed=None):
+        if speed is not None:
+            self.speed = speed
+        if self.position >= self.end_time:
+            self.position = self.start_time  # Start over from the beginning
+        self.playing = True
+        self.last_time = None
+
+    def pause(self):
+        self.playing = False
+
+    def _index(self, times, position):
+        return max(0, int(np.searchsorted(times, position, side="right")) - 1)
+
+    def present(self, now):
+        """Advance playback to ``now`` and return the frames that changed, as a list of (camera index, frame)."""
+        if self.playing:
+            if self.last_time is not None:
+                self.position += (now - self.last_time) * self.speed
+                if self.position >= self.end_time:
+                    self.position = self.end_time
+                    self.playing = False
+            self.last_time = now
+
+        updates = []
+        for camera, (snapshot, times) in enumerate(zip(self.snapshots, self.indexes)):
+            if snapshot is None or not len(times):
+                continue
+            seq = snapshot.start + self._index(times, self.position)
+            if seq == self.shown[camera]:
+                continue
+            item = snapshot.read(seq)
+            if item is None:
+                continue
+            self.shown[camera] = seq
+            updates.append((camera, item[1]))
+        return updates
+
+    def close(self):
+        """Release the pinned window."""
+        for snapshot in self.snapshots:
+            if snapshot is not None:
+                snapshot.release()
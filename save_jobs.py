@@ -0,0 +1,207 @@
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def claim_filenames(directory, count, extension=".mp4", stem="video"):
+    """Reserve unused filenames for the angles of one clip.
+
+    Names carry the local time: video_20260101-093000.mp4, or
+    video_20260101-093000_cam1.mp4, _cam2.mp4, ... for several cameras, with
+    -2, -3, ... appended for further clips in the same second. Every name is
+    claimed by creating the file exclusively (O_EXCL), so saves running at the
+    same time can never be given the same name; the encoder then overwrites
+    the empty file.
+    """
+    base = f"{stem}_{time.strftime('%Y%m%d-%H%M%S')}"
+    for attempt in itertools.count(1):
+        name = base if attempt == 1 else f"{base}-{attempt}"
+        if count == 1:
+            paths = [os.path.join(directory, f"{name}{extension}")]
+        else:
+            paths = [os.path.join(directory, f"{name}_cam{number}{extension}") for number in range(1, count + 1)]
+        claimed = []
+        try:
+            for path in paths:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                claimed.append(path)
+            return paths
+        except FileExistsError:
+            for path in claimed:
+                os.remove(path)
+
+
+class SaveJob:
+    """One save request: a time range written to one file per camera.
+
+    Either ``exports`` (one ExportJob per camera, reading pinned frames) or
+    ``run`` (a callable returning the filenames it saved, e.g. joining
+    pre-encoded segments) does the work. ``filenames`` are the files claimed
+    for it; those not saved are removed again.
+    """
+
+    STATES = ("queued", "saving", "saved", "failed", "cancelled")
+
+    def __init__(self, name, filenames, exports=None, run=None, auto=False):
+        self.name = name
+        self.filenames = filenames
+        self.exports = exports or []
+        self.run = run
+        self.auto = auto  # Saved by the motion detector rather than the user
+        self.state = "queued"
+        self.saved = []  # Filenames written successfully
+        self.error = None
+        self.created = time.monotonic()
+
+    @property
+    def finished(self):
+        return self.state in ("saved", "failed", "cancelled")
+
+    @property
+    def progress(self):
+        """Fraction of the frames encoded so far (0 for jobs without exports until they are done)."""
+        if self.state == "saved":
+            return 1.0
+        total = sum(export.total for export in self.exports)
+        return sum(export.done for export in self.exports) / total if total else 0.0
+
+    @property
+    def encode_fps(self):
+        return sum(export.encode_fps for export in self.exports)
+
+    @property
+    def lost(self):
+        """Frames the capture overwrote before this job could read them (see FrameSnapshot.lost)."""
+        return sum(getattr(export.frames, "lost", 0) for export in self.exports)
+
+    def cancel(self):
+        for export in self.exports:
+            export.cancel()
+        if self.state == "queued":
+            self.state = "cancelled"
+
+    def describe(self):
+        lost = f", {self.lost} frames lost" if self.lost else ""
+        if self.state == "saving" and self.exports:
+            return f"{self.name}: saving {self.progress:.0%} ({self.encode_fps:.0f} fps){lost}"
+        if self.state == "failed" and self.error:
+            return f"{self.name}: failed ({self.error})"
+        return f"{self.name}: {self.state}{lost}"
+
+
+class SaveManager:
+    """Runs save jobs on a bounded pool, so saves can be requested at any time.
+
+    Each job has pinned its frames (FrameSnapshots) when it was created, so
+    jobs can wait in the queue while capture carries on, and overlapping jobs
+    share the frames in the ring and the chunks the ExportEngine already
+    encoded. At most ``workers`` jobs save at once; the rest wait in order.
+    While a job waits, the frames the capture overwrites are copied for it, so
+    at most ``max_queued`` jobs may wait: check ``full`` before pinning frames
+    for another one, and give each job a ``1 / limit`` share of the copy budget.
+    ``jobs`` lists the queued, running and the last KEEP_FINISHED finished jobs
+    for display.
+
+    ``on_change()`` is called whenever a job changes state and
+    ``on_done(job)`` once a job has finished, both from a worker thread.
+    """
+
+    KEEP_FINISHED = 5
+    MAX_QUEUED = 4  # Jobs that may wait for a worker; further saves are refused
+
+    def __init__(self, exporter, workers=2, max_queued=MAX_QUEUED, on_change=None, on_done=None):
+        self.exporter = exporter
+        self.limit = workers + max_queued  # Unfinished jobs at most
+        self.on_change = on_change
+        self.on_done = on_done
+        self.lock = threading.Lock()
+        self.jobs = []
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="save")
+
+    @property
+    def active(self):
+        """Jobs still queued or saving."""
+        with self.lock:
+            return [job for job in self.jobs if not job.finished]
+
+    @property
+    def full(self):
+        """Whether no further job can be accepted until one finishes."""
+        return len(self.active) >= self.limit
+
+    def submit(self, job):
+        """Queue ``job``. Returns it, or None if the queue is full and the job was dropped."""
+        with self.lock:
+            refused = sum(1 for other in self.jobs if not other.finished) >= self.limit
+            if not refused:
+                self.jobs.append(job)
+        if refused:
+            self._release(job)
+            self._remove_unsaved(job)
+            return None
+        self._changed()
+        self.pool.submit(self._run, job)
+        return job
+
+    def cancel_all(self):
+        for job in self.active:
+            job.cancel()
+        self._changed()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.shutdown(wait=False)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def _run(self, job):
+        if job.state == "cancelled":
+            self._release(job)
+            self._finish(job)
+            return
+        job.state = "saving"
+        self._changed()
+        try:
+            if job.run is not None:
+                job.saved = job.run()
+            else:
+                # The angles are encoded in parallel
+                with ThreadPoolExecutor(max_workers=len(job.exports)) as pool:
+                    results = list(pool.map(self.exporter.export, job.exports))
+                job.saved = [export.filename for export, result in zip(job.exports, results) if result]
+            if job.saved:
+                job.state = "saved"
+            else:
+                job.state = "cancelled" if any(export.cancelled for export in job.exports) else "failed"
+        except Exception as e:
+            print(f"Error saving video: {e}")
+            job.state = "failed"
+            job.error = str(e)
+            self._release(job)
+        self._finish(job)
+
+    def _release(self, job):
+        """Unpin the frames of exports that never ran."""
+        for export in job.exports:
+            release = getattr(export.frames, "release", None)
+            if release:
+                release()
+
+    def _remove_unsaved(self, job):
+        for filename in job.filenames:
+            if filename not in job.saved and os.path.exists(filename):
+                os.remove(filename)  # The claimed name, or what a failed encode left behind
+
+    def _finish(self, job):
+        self._remove_unsaved(job)
+        with self.lock:
+            finished = [other for other in self.jobs if other.finished]
+            for old in finished[:max(0, len(finished) - self.KEEP_FINISHED)]:
+                self.jobs.remove(old)
+        if self.on_done:
+            self.on_done(job)
+        self._changed()
@@ -0,0 +1,54 @@
+import statistics
+from collections import deque
+
+
+class PresentationScheduler:
+    """Picks the one frame to show at each display refresh.
+
+    The frame shown is the one whose capture time is closest to
+    ``now - delay``, found by binary search over the ring's timestamps. Frames
+    passed over in between are dropped on purpose rather than shown back to
+    back, so the on-screen delay stays steady even when a refresh runs late.
+    """
+
+    JITTER_WINDOW = 300  # Presented frames the delay error statistics cover
+
+    def __init__(self, frame_interval):
+        self.frame_interval = frame_interval
+        self.last_seq = None
+        self.shown = 0
+        self.dropped = 0  # Frames skipped because a later one was closer to the target
+        self.errors = deque(maxlen=self.JITTER_WINDOW)  # Presented delay minus the requested delay
+
+    def reset(self):
+        """Forget the error history, e.g. after the delay changed."""
+        self.errors.clear()
+
+    def select(self, ring, now, delay):
+        """Sequence number of the frame to show at ``now``, or None to keep the current one."""
+        target = now - delay
+        seq = ring.nearest_seq(target)
+        if seq is None or seq == self.last_seq:
+            return None
+        # Until the delay has filled, even the oldest frame is too recent to show
+        if ring.timestamp(seq) - target > self.frame_interval / 2:
+            return None
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            self.dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.shown += 1
+        self.errors.append(now - ring.timestamp(seq) - delay)
+        return seq
+
+    @property
+    def mean_error(self):
+        return statistics.fmean(self.errors) if self.errors else 0.0
+
+    @property
+    def jitter(self):
+        """Standard deviation of the presented delay, in seconds."""
+        return statistics.pstdev(self.errors) if len(self.errors) > 1 else 0.0
+
+    @property
+    def max_error(self):
+        return max(map(abs, self.errors)) if self.errors else 0.0
@@ -0,0 +1,230 @@
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import deque
+
+import cv2
+
+
+def concat_entry(path):
+    """A ``file`` line for ffmpeg's concat demuxer: absolute (entries resolve against the list file) and quoted."""
+    path = os.path.abspath(path).replace("'", "'\\''")
+    return f"file '{path}'\n"
+
+
+class Segment:
+    """One short, already-encoded video file covering a run of delayed frames."""
+
+    def __init__(self, path):
+        self.path = path
+        self.timestamps = []  # Capture time of every frame in the file
+        self.pins = 0  # Saves currently reading this file
+
+    @property
+    def start_time(self):
+        return self.timestamps[0]
+
+    @property
+    def end_time(self):
+        return self.timestamps[-1]
+
+
+class SegmentRecorder:
+    """Continuously encodes the delayed stream into fixed-length segment files.
+
+    Frames are queued from the capture thread and encoded on a background worker,
+    and only the segments covering the save window are kept. Saving a clip then
+    only has to close the current segment and join the relevant files, which
+    ffmpeg does without re-encoding. Without ffmpeg the segments are re-encoded
+    into the output file instead.
+    """
+
+    def __init__(self, fps, save_length, segment_seconds=2.0, directory=None, fourcc="mp4v"):
+        self.fps = fps
+        self.save_length = save_length
+        self.segment_seconds = segment_seconds
+        self.fourcc = fourcc
+        self.queue_size = int(fps * segment_seconds)  # Frames that may wait for the encoder
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.directory = tempfile.mkdtemp(prefix="eyewi-segments-", dir=directory)
+        self.segments = deque()
+        self.lock = threading.Lock()
+        self.dropped = 0  # Frames the encoder could not keep up with
+        self.current = None
+        self.writer = None
+        self.counter = 0
+        self.saving = 0  # save_clip calls in progress; stop() leaves the files to the last of them
+        self.stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="segment-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Finish the current segment and delete every segment file, once saves in progress are done with them."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+        with self.lock:
+            self.stopped = True
+            # Cuts queued behind the stop: the segments they wait for are closed now
+            while not self.queue.empty():
+                item = self.queue.get_nowait()
+                if isinstance(item, threading.Event):
+                    item.set()
+            if self.saving:
+                return  # The last save deletes the files
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def submit(self, ring, seq):
+        """Queue frame ``seq`` of ``ring`` for encoding. Never blocks the caller."""
+        try:
+            self.queue.put_nowait((ring, seq))
+        except queue.Full:
+            self.dropped += 1
+
+    def cut(self):
+        """Close the current segment once everything queued so far is encoded.
+
+        Returns an Event that is set when the segment is on disk.
+        """
+        done = threading.Event()
+        if not self.stopped:
+            self.queue.put(done)
+        if self.stopped:
+            done.set()  # Every segment was closed by stop(), which may have drained the queue before this put
+        return done
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self._close_current()
+                return
+            if isinstance(item, threading.Event):
+                self._close_current()
+                item.set()
+                continue
+
+            ring, seq = item
+            timestamp = ring.timestamp(seq)
+            frame = ring.get_bgr(seq)
+            if frame is None:
+                self.dropped += 1  # Overwritten before the encoder got to it
+                continue
+
+            if self.current is not None and timestamp - self.current.start_time >= self.segment_seconds:
+                self._close_current()
+            if self.current is None:
+                self._open_segment(frame)
+            self.writer.write(frame)
+            self.current.timestamps.append(timestamp)
+
+    def _open_segment(self, frame):
+        height, width = frame.shape[:2]
+        self.counter += 1
+        path = os.path.join(self.directory, f"segment_{self.counter:06d}.mp4")
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+        self.current = Segment(path)
+
+    def _close_current(self):
+        if self.current is None:
+            return
+        self.writer.release()
+        with self.lock:
+            self.segments.append(self.current)
+            self._expire()
+        self.current = None
+        self.writer = None
+
+    def _expire(self):
+        """Delete segments that fell out of the save window. Needs the lock."""
+        if not self.segments:
+            return
+        horizon = self.segments[-1].end_time - self.save_length - self.segment_seconds
+        while len(self.segments) > 1 and self.segments[0].end_time < horizon and self.segments[0].pins == 0:
+            os.remove(self.segments.popleft().path)
+
+    def save_clip(self, length, filename, timeout=5.0):
+        """Write the last ``length`` seconds of the delayed stream to ``filename``.
+
+        Raises RuntimeError if the current segment isn't closed within
+        ``timeout`` seconds or the recorder was stopped (and its files deleted)
+        before the save began.
+        """
+        with self.lock:
+            if self.stopped:
+                raise RuntimeError("Recording stopped before the clip could be cut")
+            self.saving += 1
+        try:
+            if not self.cut().wait(timeout):
+                raise RuntimeError("Timed out waiting for the current segment to be written")
+            with self.lock:
+                if not self.segments:
+                    return False
+                start_time = self.segments[-1].end_time - length
+                segments = [segment for segment in self.segments if segment.end_time >= start_time]
+                for segment in segments:
+                    segment.pins += 1
+
+            try:
+                if shutil.which("ffmpeg"):
+                    self._remux(segments, start_time, filename)
+                else:
+                    self._reencode(segments, start_time, filename)
+            finally:
+                with self.lock:
+                    for segment in segments:
+                        segment.pins -= 1
+                    self._expire()
+            return True
+        finally:
+            with self.lock:
+                self.saving -= 1
+                remove = self.stopped and not self.saving
+            if remove:
+                shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _remux(self, segments, start_time, filename):
+        """Join the segments with ffmpeg's concat demuxer, copying the encoded stream."""
+        list_path = os.path.join(self.directory, f"concat_{threading.get_ident()}.txt")
+        with open(list_path, "w") as f:
+            for i, segment in enumerate(segments):
+                f.write(concat_entry(segment.path))
+                skip = sum(1 for t in segment.timestamps if t < start_time) if i == 0 else 0
+                if skip:
+                    f.write(f"inpoint {skip / self.fps:.3f}\n")
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", filename],
+                check=True,
+            )
+        finally:
+            os.remove(list_path)
+
+    def _reencode(self, segments, start_time, filename):
+        """Fallback without ffmpeg: decode the segments and write them into one file."""
+        out = None
+        try:
+            for segment in segments:
+                reader = cv2.VideoCapture(segment.path)
+                for timestamp in segment.timestamps:
+                    ret, frame = reader.read()
+                    if not ret:
+                        break
+                    if timestamp < start_time:
+                        continue
+                    if out is None:
+                        height, width = frame.shape[:2]
+                        out = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+                    out.write(frame)
+                reader.release()
+        finally:
+            if out is not None:
+                out.release()
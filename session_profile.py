@@ -0,0 +1,72 @@
+import json
+
+from atomic_file import write_json_atomic
+
+
+class SessionProfile:
+    """The settings of the last session, persisted so the next launch starts where it left off.
+
+    One JSON file holds the camera (its name and capability-cache key), the
+    mode it ran in, the delay, save length, mirror flag and the save, spill
+    and Drive destinations. It replaces the old save_directory.txt and
+    save_link.txt files, whose contents are taken over the first time.
+    """
+
+    DEFAULTS = {
+        "camera": None,  # Name as listed by the backend
+        "camera_key": None,  # backend.device_key(), to tell cameras with the same name apart
+        "mode": None,  # [width, height, fps] the camera last ran in
+        "delay": 0.0,
+        "save_length": 1,
+        "mirror": False,
+        "save_directory": None,
+        "spill_directory": None,
+        "drive_link": "",
+    }
+    LEGACY_FILES = {"save_directory": "save_directory.txt", "drive_link": "save_link.txt"}
+
+    def __init__(self, path="session_profile.json"):
+        self.path = path
+        self.values = dict(self.DEFAULTS)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"expected an object, got {type(data).__name__}")
+            self.values.update(data)
+            return
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error reading {self.path}, starting with defaults: {e}")
+            return
+        for key, legacy_path in self.LEGACY_FILES.items():
+            try:
+                with open(legacy_path, "r") as f:
+                    self.values[key] = f.read().strip() or self.DEFAULTS[key]
+            except OSError:
+                pass
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    @property
+    def resumable(self):
+        """Whether a camera and mode were saved to resume with."""
+        return bool(self.values["camera"] and self.values["mode"])
+
+    def update(self, **values):
+        """Change some settings and write the file if anything changed."""
+        changed = {key: value for key, value in values.items() if self.values.get(key) != value}
+        if changed:
+            self.values.update(changed)
+            self.save()
+
+    def save(self):
+        try:
+            write_json_atomic(self.path, self.values)
+        except OSError as e:
+            print(f"Error saving the session profile: {e}")
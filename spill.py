@@ -0,0 +1,150 @@
+import mmap
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from frame_ring import FrameRing
+
+
+class MappedFrameRing(FrameRing):
+    """FrameRing whose frames live in a preallocated, memory-mapped ring file.
+
+    Every slot is padded to a whole number of pages, so each frame is written
+    sequentially into page-aligned space and can be flushed on its own. Reading a
+    frame only faults in its own pages, never the whole range.
+    """
+
+    def __init__(self, directory, capacity, width, height, channels=3, pixel_format=None):
+        self.directory = directory
+        self.path = None
+        self.generation = 0
+        if pixel_format is not None:
+            frame_bytes = pixel_format.frame_bytes(width, height)
+        else:
+            frame_bytes = width * height * channels
+        self.slot_bytes = -(-frame_bytes // mmap.PAGESIZE) * mmap.PAGESIZE
+        self._allocated = None  # (path, storage) of the mapping _allocate made last
+        super().__init__(capacity, width, height, channels, pixel_format)
+        self.path, self.storage = self._allocated
+
+    @property
+    def footprint_bytes(self):
+        return self.capacity * self.slot_bytes
+
+    def _allocate(self, capacity):
+        self.generation += 1
+        # One file per ring, so several cameras can spill into the same directory
+        path = os.path.join(self.directory, f".eyewi_spill_{os.getpid()}_{id(self):x}_{self.generation}.bin")
+        storage = np.memmap(path, dtype=np.uint8, mode="w+", shape=(capacity, self.slot_bytes))
+        self._allocated = (path, storage)
+        return storage[:, :self.bytes_per_frame].reshape((capacity,) + self.frame_shape)
+
+    def _adopt(self, frames):
+        super()._adopt(frames)
+        self.path, self.storage = self._allocated
+
+    def flush(self, start_seq, end_seq):
+        """Write slots ``start_seq``..``end_seq`` back to disk.
+
+        np.memmap only flushes the whole mapping, but msync skips clean pages,
+        so this costs about the same as syncing just the range.
+        """
+        if start_seq < end_seq:
+            with self.lock:
+                storage = self.storage
+            storage.flush()
+
+    def resize(self, capacity):
+        old_path = self.path
+        super().resize(capacity)
+        os.remove(old_path)  # Snapshots still reading it keep their mapping
+
+    def close(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class SpillTier:
+    """Second buffer tier that ages frames out of the RAM ring into a mapped file.
+
+    Frames are queued from the capture thread as they leave the delay and copied
+    into a MappedFrameRing by a background writer, so the RAM ring only has to
+    hold the delay itself. Saves read straight from the mapping.
+    """
+
+    FLUSH_FRAMES = 16  # Frames written between flushes to disk
+
+    def __init__(self, directory, capacity, width, height, channels=3, queue_size=60, pixel_format=None):
+        self.ring = MappedFrameRing(directory, capacity, width, height, channels, pixel_format)
+        self.queue_size = queue_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0  # Frames lost because the writer fell behind
+        self.last_drop_time = 0.0
+        self.bytes_written = 0
+        self.busy_seconds = 0.0  # Time spent copying and flushing
+        self._thread = None
+
+    @property
+    def write_bandwidth(self):
+        """Bytes per second the writer sustains while it is busy."""
+        return self.bytes_written / self.busy_seconds if self.busy_seconds else 0.0
+
+    @property
+    def keeping_up(self):
+        """False if frames were dropped recently or the queue is backing up."""
+        recently_dropped = time.monotonic() - self.last_drop_time < 2.0
+        return not recently_dropped and self.queue.qsize() <= self.queue_size // 2
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="spill-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer and delete the ring file."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self.ring.close()
+
+    def resize(self, capacity):
+        """Change how many frames the file keeps, e.g. when the save length changes."""
+        self.ring.resize(capacity)
+
+    def submit(self, ring, seq):
+        """Queue frame ``seq`` of ``ring`` to be spilled. Never blocks the caller."""
+        try:
+            self.queue.put_nowait((ring, seq))
+        except queue.Full:
+            self.dropped += 1
+            self.last_drop_time = time.monotonic()
+
+    def _run(self):
+        flushed_seq = 0
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            ring, seq = item
+            timestamp = ring.timestamp(seq)
+            frame = ring.get(seq)
+            if frame is None:
+                self.dropped += 1  # Overwritten in RAM before it could be spilled
+                self.last_drop_time = time.monotonic()
+                continue
+
+            started = time.perf_counter()
+            spill = self.ring
+            slot = spill.next_slot()
+            slot[...] = frame
+            spill.commit(timestamp, slot)
+            spill.advance_delay(timestamp, 0.0)  # Spilled frames have already waited out the delay
+            if spill.write_seq - flushed_seq >= self.FLUSH_FRAMES:
+                spill.flush(max(flushed_seq, spill.oldest_seq), spill.write_seq)
+                flushed_seq = spill.write_seq
+            self.busy_seconds += time.perf_counter() - started
+            self.bytes_written += frame.nbytes
@@ -0,0 +1,404 @@
+import html
+import json
+import socket
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+
+# Stream qualities: label -> (JPEG quality, maximum height or None for the tap's own size)
+STREAM_QUALITIES = {"high": (90, None), "medium": (75, 720), "low": (60, 360)}
+BOUNDARY = b"eyewi-frame"
+
+
+class StreamClient:
+    """One viewer connected to a stream, with what it has been sent so far."""
+
+    def __init__(self, address, channel, quality):
+        self.address = address
+        self.channel = channel
+        self.quality = quality
+        self.connected_at = time.monotonic()
+        self.frames_sent = 0
+        self.frames_skipped = 0  # Newer frames arrived while the client was still receiving an older one
+        self.bytes_sent = 0
+        self.send_seconds = 0.0  # Time spent blocked writing to the client
+        self.last_id = 0  # Id of the last frame sent
+
+    def note_sent(self, frame_id, size, seconds):
+        if self.last_id:
+            self.frames_skipped += frame_id - self.last_id - 1
+        self.last_id = frame_id
+        self.frames_sent += 1
+        self.bytes_sent += size
+        self.send_seconds += seconds
+
+    def as_dict(self):
+        elapsed = max(1e-6, time.monotonic() - self.connected_at)
+        return {
+            "address": self.address,
+            "stream": self.channel,
+            "quality": self.quality,
+            "seconds": round(elapsed, 1),
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "fps": round(self.frames_sent / elapsed, 1),
+            "kbps": round(self.bytes_sent * 8 / elapsed / 1e3),
+            "send_ms": round(self.send_seconds / self.frames_sent * 1e3, 2) if self.frames_sent else None,
+        }
+
+
+class StreamChannel:
+    """One published view (a DelayTap), encoded once per quality and fanned out to every client.
+
+    publish() copies the frame into a staging buffer and returns; a worker
+    thread encodes the newest staged frame once for every quality someone is
+    watching. Frames published while the worker is busy replace the staged
+    one, and each client is sent the newest encoding when it is ready for the
+    next frame, so a slow client or a slow encoder only ever skips frames and
+    never holds up the caller.
+    """
+
+    def __init__(self, name, stats=None):
+        self.name = name
+        self.stats = stats
+        self.condition = threading.Condition()
+        self.clients = []
+        self.frame_id = 0  # Id of the newest published frame
+        self.staged = None  # Copy of the newest published frame, waiting for the encoder
+        self.staged_ready = False
+        self.encoded = {}  # quality -> (frame id, JPEG bytes)
+        self.frames_published = 0
+        self.frames_replaced = 0  # Published frames replaced before the encoder got to them
+        self.encodes = 0
+        self._working = None  # The encoder's own buffer, swapped with ``staged``
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name=f"stream-{name}", daemon=True)
+        self._thread.start()
+
+    def publish(self, frame):
+        """Offer a new frame. Costs one copy, and nothing at all while nobody is watching."""
+        with self.condition:
+            if not self.clients:
+                return False
+            if self.staged is None or self.staged.shape != frame.shape:
+                self.staged = np.empty_like(frame)
+            np.copyto(self.staged, frame)
+            if self.staged_ready:
+                self.frames_replaced += 1
+            self.staged_ready = True
+            self.frame_id += 1
+            self.frames_published += 1
+            self.condition.notify_all()
+            return True
+
+    def add_client(self, client):
+        with self.condition:
+            self.clients.append(client)
+
+    def remove_client(self, client):
+        with self.condition:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def wait(self, quality, last_id, timeout=1.0):
+        """The newest (frame id, JPEG) in ``quality`` newer than ``last_id``, or None if none came within ``timeout``."""
+        def ready():
+            return self._closing or self.encoded.get(quality, (0,))[0] > last_id
+
+        with self.condition:
+            if not self.condition.wait_for(ready, timeout) or self._closing:
+                return None
+            return self.encoded[quality]
+
+    @property
+    def closed(self):
+        return self._closing
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.staged_ready or self._closing)
+                if self._closing:
+                    return
+                self.staged, self._working = self._working, self.staged
+                self.staged_ready = False
+                frame_id = self.frame_id
+                qualities = {client.quality for client in self.clients}
+            for quality in qualities:
+                start = self.stats.start() if self.stats else None
+                data = self._encode(self._working, quality)
+                if self.stats:
+                    self.stats.stop("stream encode", start)
+                with self.condition:
+                    self.encoded[quality] = (frame_id, data)
+                    self.encodes += 1
+                    self.condition.notify_all()
+
+    def _encode(self, frame, quality):
+        jpeg_quality, max_height = STREAM_QUALITIES[quality]
+        height, width = frame.shape[:2]
+        if max_height and height > max_height:
+            size = (max(1, round(width * max_height / height)), max_height)
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        return data.tobytes()
+
+    def close(self):
+        with self.condition:
+            self._closing = True
+            self.condition.notify_all()
+        self._thread.join()
+
+
+class StreamServer:
+    """Serves every delay tap as MJPEG over HTTP, for tablets and TVs on the same network.
+
+    ``/`` lists the streams, ``/stream/<tap name>?quality=high|medium|low`` is
+    the MJPEG stream (any browser shows it, as do most smart-TV and tablet
+    viewers), ``/stats`` gives per-client figures as JSON. Each client is
+    served by its own thread, so a stalled client only holds up itself.
+    ``port`` 0 picks a free port (see ``port`` once started).
+    """
+
+    SEND_TIMEOUT = 10.0  # Seconds a client may block a write before it is dropped
+
+    def __init__(self, port=8080, host="", stats=None):
+        self.host = host
+        self.requested_port = port
+        self.stats = stats
+        self.lock = threading.Lock()
+        self.channels = {}  # Tap name -> StreamChannel
+        self.httpd = None
+        self._thread = None
+        self._closing = False
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1] if self.httpd else self.requested_port
+
+    @property
+    def running(self):
+        return self.httpd is not None
+
+    def start(self):
+        self._closing = False
+        self.httpd = ThreadingHTTPServer((self.host, self.requested_port), _StreamHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stream_server = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stream-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Disconnect every client and close the port."""
+        if self.httpd is None:
+            return
+        self._closing = True
+        with self.lock:
+            channels = list(self.channels.values())
+            self.channels = {}
+        for channel in channels:
+            channel.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+        self.httpd = None
+        self._thread = None
+
+    def url(self):
+        """Address to open on another device, using this machine's LAN address."""
+        host = self.host
+        if not host or host == "0.0.0.0":
+            try:
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                    probe.connect(("10.255.255.255", 1))  # Picks the outgoing interface; sends nothing
+                    host = probe.getsockname()[0]
+            except OSError:
+                host = "127.0.0.1"
+        return f"http://{host}:{self.port}/"
+
+    def channel(self, name):
+        """The published stream called ``name``, or None."""
+        with self.lock:
+            return self.channels.get(name)
+
+    def watched(self, name):
+        """Whether anyone is viewing the stream called ``name``."""
+        channel = self.channel(name)
+        if channel is None:
+            return False
+        with channel.condition:
+            return bool(channel.clients)
+
+    def add(self, name):
+        """Offer a stream called ``name`` (a tap), so viewers can connect before its first frame."""
+        with self.lock:
+            channel = self.channels.get(name)
+            if channel is None and not self._closing:
+                channel = self.channels[name] = StreamChannel(name, self.stats)
+            return channel
+
+    def publish(self, name, frame):
+        """Hand a tap's new frame to its viewers (if there are any)."""
+        channel = self.add(name)
+        return channel.publish(frame) if channel is not None else False
+
+    def remove(self, name):
+        """Stop publishing a tap and disconnect its viewers."""
+        with self.lock:
+            channel = self.channels.pop(name, None)
+        if channel is not None:
+            channel.close()
+
+    def clients(self):
+        with self.lock:
+            channels = list(self.channels.values())
+        clients = []
+        for channel in channels:
+            with channel.condition:
+                clients.extend(channel.clients)
+        return clients
+
+    def client_stats(self):
+        return [client.as_dict() for client in self.clients()]
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    """HTTP requests to a StreamServer (``self.server.stream_server``)."""
+
+    protocol_version = "HTTP/1.0"  # One request per connection; the stream ends when the client goes
+
+    def log_message(self, format, *args):
+        pass  # Every MJPEG connection is one long request; don't log them to the console
+
+    def do_GET(self):
+        server = self.server.stream_server
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/":
+            self._send(200, "text/html; charset=utf-8", self._index(server).encode())
+        elif url.path == "/stats":
+            self._send(200, "application/json", json.dumps(server.client_stats()).encode())
+        elif url.path.startswith("/stream/"):
+            name = urllib.parse.unquote(url.path[len("/stream/"):])
+            quality = urllib.parse.parse_qs(url.query).get("quality", ["medium"])[0]
+            if quality not in STREAM_QUALITIES:
+                self._send(400, "text/plain", f"Unknown quality: {quality}".encode())
+                return
+            self._stream(server, name, quality)
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _index(self, server):
+        with server.lock:
+            names = list(server.channels)
+        items = []
+        for name in names:
+            path = "/stream/" + urllib.parse.quote(name)
+            links = " ".join(f'<a href="{path}?quality={quality}">{quality}</a>' for quality in STREAM_QUALITIES)
+            items.append(f'<h2>{html.escape(name)}</h2><p>{links}</p><img src="{path}?quality=medium" style="max-width:100%">')
+        body = "".join(items) or "<p>No delayed views yet; start the webcam.</p>"
+        return f"<!doctype html><title>Eyewi</title><body style=\"font-family:sans-serif\">{body}</body>"
+
+    def _stream(self, server, name, quality):
+        channel = server.channel(name)  # Only taps create streams; a request for any other name is not found
+        if channel is None:
+            self._send(404, "text/plain", f"No stream called {name}".encode())
+            return
+        client = StreamClient(f"{self.client_address[0]}:{self.client_address[1]}", name, quality)
+        channel.add_client(client)
+        self.connection.settimeout(server.SEND_TIMEOUT)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}")
+            self.send_header("Cache-Control", "no-cache, no-store")
+            self.end_headers()
+            while not server._closing and not channel.closed:
+                item = channel.wait(quality, client.last_id)
+                if item is None:
+                    continue
+                frame_id, data = item
+                started = time.perf_counter()
+                self.wfile.write(b"--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % (BOUNDARY, len(data)))
+                self.wfile.write(data)
+                self.wfile.write(b"\r\n")
+                client.note_sent(frame_id, len(data), time.perf_counter() - started)
+        except OSError:
+            pass  # The client went away or stopped reading
+        finally:
+            channel.remove_client(client)
+
+
+class StreamViewer:
+    """A loopback MJPEG client for load tests: reads a stream and counts what arrives.
+
+    ``frame_delay`` seconds of sleep after every frame, together with a small
+    receive buffer, makes it a slow viewer.
+    """
+
+    def __init__(self, url, frame_delay=0.0, receive_buffer=None):
+        self.url = urllib.parse.urlsplit(url)
+        self.frame_delay = frame_delay
+        self.receive_buffer = receive_buffer
+        self.frames = 0
+        self.bytes = 0
+        self.bad_frames = 0  # Sampled frames that didn't decode as JPEG
+        self.error = None
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stream-viewer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            if self.receive_buffer:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+            sock.settimeout(5.0)
+            sock.connect((self.url.hostname, self.url.port))
+            path = self.url.path + (f"?{self.url.query}" if self.url.query else "")
+            sock.sendall(f"GET {path} HTTP/1.0\r\nHost: {self.url.netloc}\r\n\r\n".encode())
+            stream = sock.makefile("rb")
+            while stream.readline() not in (b"\r\n", b""):
+                pass  # Response headers
+            while not self._stopping:
+                length = None
+                while True:
+                    line = stream.readline()
+                    if not line:
+                        return  # Server closed the stream
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                    elif line == b"\r\n" and length is not None:
+                        break
+                data = stream.read(length)
+                stream.readline()
+                if self.frames % 30 == 0 and cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) is None:
+                    self.bad_frames += 1
+                self.frames += 1
+                self.bytes += len(data)
+                if self.frame_delay:
+                    time.sleep(self.frame_delay)
+        except OSError as e:
+            if not self._stopping:
+                self.error = str(e)
+        finally:
+            sock.close()
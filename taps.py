@@ -0,0 +1,152 @@
+import math
+
+import cv2
+import numpy as np
+
+from preview import Preview
+from scheduler import PresentationScheduler
+
+
+class DelayTap:
+    """One delayed view of the cameras, with its own delay and preview (size, fps cap, mirror).
+
+    A tap only reads the shared frame buffers: for every camera it picks the
+    frame captured nearest ``now - delay`` with its own PresentationScheduler,
+    straight from the ring and without copying it. Adding a tap therefore costs
+    display work only, never another capture or more storage beyond what its
+    delay keeps in the ring.
+
+    With several cameras the tap shows a grid of every angle at preview size,
+    in which an angle with no new frame keeps its last one.
+
+    LAN viewers get the same frames before any of the preview's scaling and
+    mirroring (see stream_frame).
+    """
+
+    def __init__(self, name, delay=0.0, preview=None):
+        self.name = name
+        self.delay = delay
+        self.preview = preview or Preview()
+        self.schedulers = []  # One per camera
+        self.last_seqs = []  # Sequence number of the frame last shown per camera
+        self.composite = None  # Grid of the angles' latest frames at preview size
+        self.cell_size = None
+        self.cell_preview_height = None  # Preview height the cell size was computed for
+        self.stream_composite = None  # Grid of the angles at full size, for LAN viewers
+
+    @property
+    def mirror(self):
+        return self.preview.mirror
+
+    def set_delay(self, delay):
+        self.delay = delay
+        for scheduler in self.schedulers:
+            scheduler.reset()
+
+    def reset(self, pipelines):
+        """Start over for a new set of cameras."""
+        self.schedulers = [PresentationScheduler(1.0 / pipeline.fps) for pipeline in pipelines]
+        self.last_seqs = [None] * len(pipelines)
+        self.composite = None
+        self.cell_size = None
+        self.stream_composite = None
+
+    def present(self, cameras, now, stats):
+        """The frame to show at ``now``, already scaled and mirrored, or None if nothing changed."""
+        return self.render(self.select(cameras, now, stats), len(cameras.pipelines), now, stats)
+
+    def select(self, cameras, now, stats):
+        """The angles with a new frame at ``now``, as a list of (camera index, frame) straight from the buffers."""
+        pipelines = cameras.pipelines
+        if len(self.schedulers) != len(pipelines):
+            self.reset(pipelines)
+
+        updates = []
+        for index, pipeline in enumerate(pipelines):
+            latest = pipeline.present(now, self.delay, self.schedulers[index])
+            if latest is None:
+                if self.last_seqs[index] is not None and self.preview.ready(now):
+                    stats.count("frames duplicated")  # The refresh shows the last frame again
+                continue
+            self.last_seqs[index] = latest[0]
+            updates.append((index, latest[1]))
+        return updates
+
+    def stream_frame(self, updates, count):
+        """The frame for LAN viewers from select()'s ``updates`` out of ``count`` cameras, or None if nothing changed.
+
+        That is the buffered frame itself, or with several cameras a grid with
+        cells the size of the first angle; the stream does its own scaling.
+        """
+        if not updates:
+            return None
+        if count == 1:
+            return updates[0][1]
+        columns = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        if self.stream_composite is None:
+            height, width = updates[0][1].shape[:2]
+            self.stream_composite = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+        cell_size = (self.stream_composite.shape[1] // columns, self.stream_composite.shape[0] // rows)
+        for index, frame in updates:
+            draw_cell(self.stream_composite, index, columns, cell_size, frame)
+        return self.stream_composite
+
+    def render(self, updates, count, now, stats):
+        """Scale and mirror new frames for display: ``updates`` is a list of (camera index, frame) out of ``count`` cameras.
+
+        Returns the frame to show, or None if there was nothing new.
+        """
+        if not updates:
+            return None
+        start = stats.start()
+        if count == 1:
+            frame = self.preview.render(updates[0][1], now)
+        else:
+            self.preview.tick(now)
+            for index, cell in updates:
+                self._draw_cell(index, count, cell)
+            frame = self.composite
+        stats.stop("preview", start)
+        return frame
+
+    def _draw_cell(self, index, count, frame):
+        """Scale an angle's frame into its grid cell; the cell size follows the first frame seen."""
+        columns = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        height, width = frame.shape[:2]
+        preview = self.preview
+        if self.cell_size is None or self.cell_preview_height != preview.height_cap:
+            # The whole grid fits in the preview height (or the frame height if the preview is full size)
+            cell_height = max(1, (preview.height_cap or height) // rows)
+            self.cell_size = (max(1, round(width * cell_height / height)), cell_height)
+            self.cell_preview_height = preview.height_cap
+            self.composite = None
+        cell_width, cell_height = self.cell_size
+        if self.composite is None:
+            self.composite = np.zeros((rows * cell_height, columns * cell_width, 3), dtype=np.uint8)
+        draw_cell(self.composite, index, columns, self.cell_size, frame, preview.mirror)
+
+
+def draw_cell(composite, index, columns, cell_size, frame, mirror=False):
+    """Scale ``frame`` into cell ``index`` of a grid ``columns`` wide, keeping its aspect ratio.
+
+    An angle shaped differently from the cell is centred with black bars.
+    """
+    cell_width, cell_height = cell_size
+    height, width = frame.shape[:2]
+    scale = min(cell_width / width, cell_height / height)
+    size = (min(cell_width, max(1, round(width * scale))), min(cell_height, max(1, round(height * scale))))
+    row, column = divmod(index, columns)
+    target = composite[row * cell_height:(row + 1) * cell_height, column * cell_width:(column + 1) * cell_width]
+    if size != cell_size:
+        target[:] = 0  # Clear the bars, which may hold a differently shaped frame shown before
+        top, left = (cell_height - size[1]) // 2, (cell_width - size[0]) // 2
+        target = target[top:top + size[1], left:left + size[0]]
+
+    cell = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+    if cell.ndim == 2:
+        cell = cv2.cvtColor(cell, cv2.COLOR_GRAY2BGR)
+    if mirror:
+        cv2.flip(cell, 1, cell)
+    target[:] = cell
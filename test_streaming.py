@@ -0,0 +1,103 @@
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import cv2
+import numpy as np
+import pytest
+
+from streaming import StreamServer, StreamViewer
+
+
+WIDTH, HEIGHT = 1280, 720
+
+
+@pytest.fixture
+def server():
+    """A loopback StreamServer with one tap, "Main", published at about 30 fps until the test ends."""
+    server = StreamServer(0, host="127.0.0.1")
+    server.start()
+    server.add("Main")
+    stopping = threading.Event()
+    # Noise compresses badly, so frames are large enough to fill a slow viewer's socket buffers quickly
+    background = np.random.default_rng(0).integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+    def publish():
+        number = 0
+        while not stopping.is_set():
+            frame = background.copy()
+            cv2.putText(frame, str(number), (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+            server.publish("Main", frame)
+            number += 1
+            time.sleep(1 / 30)
+
+    publisher = threading.Thread(target=publish, daemon=True)
+    publisher.start()
+    yield server
+    stopping.set()
+    publisher.join()
+    server.stop()
+
+
+def read_frames(port, path, count):
+    """Read ``count`` parts of an MJPEG stream and decode each one."""
+    frames = []
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode())
+        stream = sock.makefile("rb")
+        assert stream.readline().split()[1] == b"200"
+        while stream.readline() not in (b"\r\n", b""):
+            pass
+        while len(frames) < count:
+            length = None
+            while True:
+                line = stream.readline()
+                assert line, "stream ended early"
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+                elif line == b"\r\n" and length is not None:
+                    break
+            data = stream.read(length)
+            stream.readline()
+            frames.append(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+    return frames
+
+
+@pytest.mark.parametrize("quality, size", [("high", (HEIGHT, WIDTH)), ("medium", (720, 1280)), ("low", (360, 640))])
+def test_frames_decode_at_the_quality_size(server, quality, size):
+    frames = read_frames(server.port, f"/stream/Main?quality={quality}", 5)
+    for frame in frames:
+        assert frame is not None
+        assert frame.shape[:2] == size
+
+
+def test_slow_viewer_skips_frames_without_holding_up_a_fast_one(server):
+    url = f"http://127.0.0.1:{server.port}/stream/Main?quality=high"
+    fast = StreamViewer(url)
+    slow = StreamViewer(url, frame_delay=0.3, receive_buffer=4096)
+    fast.start()
+    slow.start()
+    time.sleep(3)
+    stats = {client["address"]: client for client in server.client_stats()}
+    fast.stop()
+    slow.stop()
+
+    assert fast.error is None and slow.error is None
+    assert fast.bad_frames == 0 and slow.bad_frames == 0
+    assert fast.frames > 3 * slow.frames
+    assert sum(client["frames_skipped"] for client in stats.values()) > 0
+
+
+def test_unknown_stream_is_not_found_and_not_created(server):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"http://127.0.0.1:{server.port}/stream/Nobody", timeout=5)
+    assert error.value.code == 404
+    assert list(server.channels) == ["Main"]
+
+
+def test_unknown_quality_is_rejected(server):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"http://127.0.0.1:{server.port}/stream/Main?quality=ultra", timeout=5)
+    assert error.value.code == 400
@@ -0,0 +1,126 @@
+import os
+import time
+
+import pytest
+
+from upload_queue import FakeDriveService, UploadQueue
+
+
+FOLDER_LINK = "https://drive.google.com/drive/folders/testFolder"
+CHUNK_SIZE = 64 * 1024
+
+
+class CountingDriveService(FakeDriveService):
+    """FakeDriveService that counts the upload sessions opened."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sessions_started = 0
+
+    def start_upload(self, name, folder_id, size, content_type):
+        self.sessions_started += 1
+        return super().start_upload(name, folder_id, size, content_type)
+
+
+def make_queue(state, service):
+    queue = UploadQueue(state, service, workers=2, chunk_size=CHUNK_SIZE)
+    queue.BACKOFF_BASE = 0.01  # The fake fails instantly; retry at once
+    queue.BACKOFF_MAX = 0.1
+    return queue
+
+
+def wait_until(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def make_clips(directory, count, size):
+    paths = []
+    for number in range(count):
+        path = os.path.join(directory, f"clip_{number}.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def uploaded(service):
+    return {name: data for name, _, data in service.files.values()}
+
+
+def assert_intact(service, paths):
+    files = uploaded(service)
+    for path in paths:
+        with open(path, "rb") as f:
+            assert files.get(os.path.basename(path)) == f.read(), path
+
+
+def test_uploads_arrive_intact_despite_failures_and_expired_sessions(tmp_path):
+    service = FakeDriveService(failure_rate=0.2, expire_rate=0.05, seed=3)
+    paths = make_clips(tmp_path, 4, 300_000)
+    queue = make_queue(str(tmp_path / "queue.json"), service)
+    for path in paths:
+        queue.add(path, FOLDER_LINK)
+    queue.start()
+    try:
+        wait_until(lambda: queue.summary()["done"] == len(paths))
+    finally:
+        queue.stop()
+
+    assert service.failures > 0
+    assert queue.summary()["failed"] == 0
+    assert_intact(service, paths)
+    assert service.folder_lookups == 1  # The folder link is resolved once and cached
+
+
+def test_upload_resumes_after_restart_in_the_same_session(tmp_path):
+    service = CountingDriveService(bandwidth=512 * 1024, seed=1)
+    paths = make_clips(tmp_path, 1, 1_000_000)
+    state = str(tmp_path / "queue.json")
+    queue = make_queue(state, service)
+    queue.add(paths[0], FOLDER_LINK)
+    queue.start()
+    wait_until(lambda: queue.uploads[0]["sent"] >= 2 * CHUNK_SIZE)
+    queue.stop()
+    assert queue.uploads[0]["status"] != "done"
+    sent_before_restart = queue.uploads[0]["sent"]
+
+    # A new queue from the same state file, as after restarting the app
+    queue = make_queue(state, service)
+    assert queue.uploads[0]["status"] == "pending"
+    assert queue.uploads[0]["sent"] == sent_before_restart
+    queue.start()
+    try:
+        wait_until(lambda: queue.summary()["done"] == 1)
+    finally:
+        queue.stop()
+
+    assert service.sessions_started == 1  # Carried on in the first session instead of starting over
+    assert_intact(service, paths)
+
+
+def test_missing_file_fails_without_retrying(tmp_path):
+    service = FakeDriveService()
+    queue = make_queue(str(tmp_path / "queue.json"), service)
+    queue.add(str(tmp_path / "gone.mp4"), FOLDER_LINK)
+    queue.start()
+    try:
+        wait_until(lambda: queue.summary()["failed"] == 1)
+    finally:
+        queue.stop()
+    assert queue.uploads[0]["retries"] == 1
+    assert not service.files
+
+
+@pytest.mark.parametrize("link", ["", "https://example.com/nothing"])
+def test_invalid_folder_link_fails(tmp_path, link):
+    paths = make_clips(tmp_path, 1, 1000)
+    queue = make_queue(str(tmp_path / "queue.json"), FakeDriveService())
+    queue.add(paths[0], link)
+    queue.start()
+    try:
+        wait_until(lambda: queue.summary()["failed"] == 1)
+    finally:
+        queue.stop()
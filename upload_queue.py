@@ -0,0 +1,337 @@
+import json
+import mimetypes
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from atomic_file import write_json_atomic
+
+
+def extract_folder_id(folder_link):
+    """The folder ID in a shared Google Drive folder link, or None."""
+    match = re.search(r'folders/([a-zA-Z0-9_-]+)', folder_link)
+    return match.group(1) if match else None
+
+
+class UploadError(Exception):
+    """An upload step failed. ``retryable`` errors are retried with backoff, others fail the upload."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class UploadSessionExpired(UploadError):
+    """The resumable session is gone; the upload has to start over."""
+
+
+class UploadQueue:
+    """Uploads saved clips to Drive in the background, surviving restarts.
+
+    Every queued clip is recorded in a JSON file together with its resumable
+    session and how much of it the server has confirmed, so an upload cut off
+    by a crash or a dropped connection carries on where it stopped. Several
+    clips upload at once, each in chunks; failures are retried with
+    exponential backoff, and folder links are resolved to IDs once and cached.
+
+    ``service`` does the talking to Drive: drive.GoogleDriveUploader for the
+    real thing, or FakeDriveService to exercise the queue offline. Uploads wait
+    while the service is not authenticated.
+    ``on_change()`` is called from a worker thread whenever an upload's state changes.
+    """
+
+    CHUNK_SIZE = 32 * 256 * 1024  # 8 MB; Drive wants chunks in multiples of 256 KB
+    BACKOFF_BASE = 2.0  # Seconds before the first retry, doubled on every attempt
+    BACKOFF_MAX = 300.0
+
+    def __init__(self, path="upload_queue.json", service=None, workers=2, chunk_size=CHUNK_SIZE, on_change=None):
+        self.path = path
+        self.service = service
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.on_change = on_change
+        self.condition = threading.Condition()
+        self.folder_lock = threading.Lock()  # One folder lookup at a time, so a link is resolved once
+        self.uploads, self.folders = self._load()
+        for upload in self.uploads:
+            if upload["status"] == "uploading":
+                upload["status"] = "pending"  # Interrupted by a restart; resume it
+        self._threads = []
+        self._stopping = False
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            return state.get("uploads", []), state.get("folders", {})
+        except (OSError, ValueError):
+            return [], {}
+
+    def _write(self):
+        """Save the queue. Needs the lock."""
+        write_json_atomic(self.path, {"uploads": self.uploads, "folders": self.folders})
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def start(self):
+        self._stopping = False
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"upload-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=2.0):
+        """Stop the workers. Uploads in progress are picked up again on the next start."""
+        with self.condition:
+            self._stopping = True
+            self.condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """Look for work again, e.g. after the service was authenticated."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def add(self, file_path, folder_link):
+        """Queue ``file_path`` for upload to the shared folder at ``folder_link``."""
+        with self.condition:
+            self.uploads.append({
+                "id": uuid.uuid4().hex,
+                "path": file_path,
+                "folder_link": folder_link,
+                "status": "pending",
+                "session": None,  # Resumable session URI once one is open
+                "sent": 0,  # Bytes the server has confirmed
+                "size": None,
+                "attempts": 0,  # Failures since the upload last made progress; sets the backoff
+                "retries": 0,
+                "next_attempt": 0.0,
+                "error": None,
+                "file_id": None,
+            })
+            self._write()
+            self.condition.notify()
+        self._changed()
+
+    def retry_failed(self):
+        with self.condition:
+            for upload in self.uploads:
+                if upload["status"] == "failed":
+                    upload.update(status="pending", attempts=0, next_attempt=0.0, error=None)
+            self._write()
+            self.condition.notify_all()
+        self._changed()
+
+    def clear_finished(self):
+        with self.condition:
+            self.uploads = [upload for upload in self.uploads if upload["status"] != "done"]
+            self._write()
+        self._changed()
+
+    def summary(self):
+        """Counts per status, plus the combined progress of uploads in flight as a fraction."""
+        with self.condition:
+            counts = {"pending": 0, "uploading": 0, "done": 0, "failed": 0}
+            sent = total = 0
+            for upload in self.uploads:
+                counts[upload["status"]] += 1
+                if upload["status"] == "uploading" and upload["size"]:
+                    sent += upload["sent"]
+                    total += upload["size"]
+            counts["progress"] = sent / total if total else None
+            return counts
+
+    def _ready(self):
+        return self.service is not None and getattr(self.service, "authenticated", True)
+
+    def _next_upload(self):
+        """Block until an upload is due and claim it, or return None when stopping."""
+        with self.condition:
+            while not self._stopping:
+                wait = None
+                if self._ready():
+                    now = time.time()
+                    for upload in self.uploads:
+                        if upload["status"] != "pending":
+                            continue
+                        if upload["next_attempt"] <= now:
+                            upload["status"] = "uploading"
+                            self._write()
+                            return upload
+                        delay = upload["next_attempt"] - now
+                        wait = delay if wait is None else min(wait, delay)
+                self.condition.wait(wait)
+            return None
+
+    def _run(self):
+        while True:
+            upload = self._next_upload()
+            if upload is None:
+                return
+            self._changed()
+            try:
+                self._upload(upload)
+            except Exception as e:
+                retryable = getattr(e, "retryable", True)
+                with self.condition:
+                    upload["attempts"] += 1
+                    upload["retries"] = upload.get("retries", 0) + 1
+                    upload["error"] = str(e)
+                    if isinstance(e, UploadSessionExpired):
+                        upload["session"] = None
+                        upload["sent"] = 0
+                    if retryable:
+                        backoff = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (upload["attempts"] - 1))
+                        upload["next_attempt"] = time.time() + backoff * random.uniform(0.5, 1.0)
+                        upload["status"] = "pending"
+                    else:
+                        upload["status"] = "failed"
+                    self._write()
+                    self.condition.notify_all()
+                print(f"Upload of {upload['path']} failed: {e}")
+            self._changed()
+
+    def _folder_id(self, folder_link):
+        with self.folder_lock:
+            with self.condition:
+                folder_id = self.folders.get(folder_link)
+            if folder_id is None:
+                folder_id = self.service.resolve_folder(folder_link)
+                with self.condition:
+                    self.folders[folder_link] = folder_id
+                    self._write()
+        return folder_id
+
+    def _record(self, upload, **changes):
+        with self.condition:
+            upload.update(changes)
+            self._write()
+        self._changed()
+
+    def _upload(self, upload):
+        service = self.service
+        path = upload["path"]
+        if not os.path.exists(path):
+            raise UploadError(f"{path} no longer exists", retryable=False)
+        size = os.path.getsize(path)
+        folder_id = self._folder_id(upload["folder_link"])
+
+        file_id = None
+        offset = 0
+        if upload["session"] and upload["size"] == size:
+            # Ask the server how much of the interrupted upload it kept
+            offset, file_id = service.query_upload(upload["session"], size)
+        else:
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            session = service.start_upload(os.path.basename(path), folder_id, size, content_type)
+            self._record(upload, session=session, size=size, sent=0)
+
+        with open(path, "rb") as f:
+            while file_id is None:
+                if self._stopping:
+                    self._record(upload, status="pending")  # Resumed from the session on the next start
+                    return
+                f.seek(offset)
+                data = f.read(self.chunk_size)
+                offset, file_id = service.upload_chunk(upload["session"], data, offset, size)
+                if offset > upload["sent"]:
+                    self._record(upload, sent=offset, attempts=0)
+
+        self._record(upload, status="done", file_id=file_id, session=None, error=None)
+        print(f"File '{os.path.basename(path)}' uploaded successfully with ID: {file_id}")
+
+
+class FakeDriveService:
+    """In-memory stand-in for Drive that throttles and fails on purpose.
+
+    Implements the same resolve_folder/start_upload/upload_chunk/query_upload
+    calls as drive.GoogleDriveUploader. ``bandwidth`` is in bytes per second
+    per connection; each call fails with probability
+    ``failure_rate``, sometimes after the server has kept part of the chunk,
+    and with probability ``expire_rate`` a session is forgotten.
+    """
+
+    def __init__(self, bandwidth=None, failure_rate=0.0, expire_rate=0.0, seed=None):
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.expire_rate = expire_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sessions = {}  # uri -> {"name", "folder_id", "total", "data"}
+        self.files = {}  # file id -> (name, folder_id, bytes)
+        self.authenticated = True
+        self.calls = 0
+        self.failures = 0
+        self.folder_lookups = 0
+
+    def _roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def _maybe_fail(self):
+        with self.lock:
+            self.calls += 1
+        if self._roll(self.failure_rate):
+            with self.lock:
+                self.failures += 1
+            raise UploadError("Simulated server error (503)")
+
+    def resolve_folder(self, folder_link):
+        self.folder_lookups += 1
+        folder_id = extract_folder_id(folder_link)
+        if not folder_id:
+            raise UploadError("Invalid shared folder link", retryable=False)
+        return folder_id
+
+    def start_upload(self, name, folder_id, size, content_type):
+        self._maybe_fail()
+        uri = f"fake://upload/{uuid.uuid4().hex}"
+        with self.lock:
+            self.sessions[uri] = {"name": name, "folder_id": folder_id, "total": size, "data": bytearray()}
+        return uri
+
+    def _session(self, uri):
+        if self._roll(self.expire_rate):
+            with self.lock:
+                self.sessions.pop(uri, None)
+        with self.lock:
+            session = self.sessions.get(uri)
+        if session is None:
+            raise UploadSessionExpired("Upload session not found (404)")
+        return session
+
+    def upload_chunk(self, uri, data, offset, total):
+        self._maybe_fail()
+        session = self._session(uri)
+        if offset != len(session["data"]):
+            return len(session["data"]), None  # Out of step; tell the client where to carry on
+        if self.bandwidth:
+            time.sleep(len(data) / self.bandwidth)
+        if data and self._roll(self.failure_rate):
+            # The connection drops after part of the chunk arrived
+            session["data"] += data[:len(data) // 2]
+            with self.lock:
+                self.failures += 1
+            raise ConnectionError("Simulated dropped connection")
+        session["data"] += data
+        return self._status(uri, session)
+
+    def query_upload(self, uri, total):
+        self._maybe_fail()
+        return self._status(uri, self._session(uri))
+
+    def _status(self, uri, session):
+        if len(session["data"]) < session["total"]:
+            return len(session["data"]), None
+        file_id = uuid.uuid4().hex
+        with self.lock:
+            self.files[file_id] = (session["name"], session["folder_id"], bytes(session["data"]))
+            self.sessions.pop(uri, None)
+        return session["total"], file_id